@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Autocompletado de términos ordenado por frecuencia de documentos (df).
+
+Los completados de un prefijo son los términos que empiezan con él,
+ordenados por df descendente y, ante empates, alfabéticamente. Para los
+prefijos cortos, que son los que más términos abarcan, el índice puede
+guardar las listas ya calculadas (ver `construir_top_k`); así la latencia
+no depende de cuántos términos empiezan con el prefijo.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+TOP_AUTOCOMPLETADO = 10  # Completados guardados por prefijo en la caché
+
+
+def _orden(par: Tuple[str, int]) -> Tuple[int, str]:
+    return -par[1], par[0]
+
+
+def mejores_completados(pares: Iterable[Tuple[str, int]], k: int) -> List[Tuple[str, int]]:
+    """
+    Los `k` pares (término, df) con mayor df, sin ordenar todos los pares.
+
+    Args:
+        pares: Pares (término, df) de los términos con el prefijo
+        k: Cantidad de completados
+
+    Returns:
+        Lista de hasta `k` pares, por df descendente y luego alfabética
+    """
+    return heapq.nsmallest(k, pares, key=_orden)
+
+
+def construir_top_k(
+    pares: Iterable[Tuple[str, int]], largo_maximo: int, k: int = TOP_AUTOCOMPLETADO
+) -> Dict[str, Tuple[Tuple[str, int], ...]]:
+    """
+    Calcula en una pasada los mejores completados de cada prefijo corto.
+
+    Cada término aporta a sus prefijos de largo 0 a `largo_maximo`; por
+    prefijo se mantiene un montículo de tamaño `k`.
+
+    Args:
+        pares: Pares (término, df) en orden alfabético de término
+        largo_maximo: Largo máximo de los prefijos a calcular
+        k: Completados por prefijo
+
+    Returns:
+        Diccionario {prefijo -> tupla de pares (término, df) ordenados}
+    """
+    monticulos: Dict[str, list] = {}
+
+    for orden, (termino, df) in enumerate(pares):
+        # Ante igual df gana el término anterior en orden alfabético
+        entrada = (df, -orden, termino)
+        for largo in range(min(largo_maximo, len(termino)) + 1):
+            monticulo = monticulos.setdefault(termino[:largo], [])
+            if len(monticulo) < k:
+                heapq.heappush(monticulo, entrada)
+            elif entrada > monticulo[0]:
+                heapq.heapreplace(monticulo, entrada)
+
+    return {
+        prefijo: tuple((termino, df) for df, _, termino in sorted(monticulo, reverse=True))
+        for prefijo, monticulo in monticulos.items()
+    }
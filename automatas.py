@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Recorrido de un árbol B+ con claves str guiado por un autómata.
+
+El autómata lee las claves carácter a carácter. Cuando el estado tras
+leer un prefijo está muerto (ninguna continuación puede ser aceptada), el
+recorrido calcula el menor prefijo vivo posterior y salta hasta él con
+`minKey`, sin visitar las claves intermedias. Los estados del prefijo
+común con la clave anterior se reutilizan.
+
+Un autómata es cualquier objeto con estos métodos:
+
+- inicial() -> estado
+- avanzar(estado, carácter) -> estado
+- vivo(estado) -> bool: alguna continuación puede ser aceptada
+- acepta(estado) -> bool
+- siguiente_caracter(estado, después_de) -> menor carácter mayor que
+  `después_de` que deja el estado vivo, o None
+
+Opcionalmente, sin_poda(estado) -> bool indica que toda continuación del
+estado sigue viva (ej: tras un `.*`). Debajo de ese prefijo no hay nada que
+saltar, así que las claves se generan sin pasar por el autómata y quien
+las recibe debe confirmarlas.
+
+Lo usan la búsqueda difusa (difuso.py) y la búsqueda por regex
+(expresiones.py).
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def clave_desde(arbol, minimo: str) -> Optional[str]:
+    """Menor clave del árbol mayor o igual que `minimo`, o None."""
+    try:
+        return arbol.minKey(minimo)
+    except ValueError:
+        return None
+
+
+def siguiente_prefijo(automata, clave: str, estados: List) -> Optional[str]:
+    """
+    Menor prefijo vivo mayor que todas las cadenas que empiezan con
+    `clave[:len(estados)]`.
+
+    Args:
+        automata: Autómata del recorrido
+        clave: Clave cuyo prefijo de largo len(estados) está muerto
+        estados: estados[j] es el estado tras leer clave[:j] (todos vivos)
+
+    Returns:
+        Prefijo desde el cual seguir buscando, o None si no quedan candidatos
+    """
+    # Primero se prueba cambiar el último carácter, después los anteriores
+    for i in range(len(estados) - 1, -1, -1):
+        caracter = automata.siguiente_caracter(estados[i], clave[i])
+        if caracter is not None:
+            return clave[:i] + caracter
+    return None
+
+
+def recorrer_automata(
+    arbol, automata, estadisticas: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[str, object]]:
+    """
+    Genera las claves de `arbol` aceptadas por el autómata, en orden.
+
+    Args:
+        arbol: Árbol B+ con claves str (ej: el índice de términos)
+        automata: Autómata que decide qué claves se aceptan
+        estadisticas: Diccionario opcional donde se acumulan las claves
+            visitadas ("visitadas") y los saltos sobre prefijos muertos ("saltos")
+
+    Returns:
+        Iterador de pares (clave, estado final del autómata). El estado es
+        None para las claves generadas sin el autómata (ver `sin_poda`), que
+        pueden no ser aceptadas
+    """
+    sin_poda = getattr(automata, "sin_poda", None)
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas.setdefault("visitadas", 0)
+    estadisticas.setdefault("saltos", 0)
+
+    estados = [automata.inicial()]
+    anterior = ""
+    clave = clave_desde(arbol, "") if automata.vivo(estados[0]) else None
+
+    while clave is not None:
+        estadisticas["visitadas"] += 1
+
+        # Reutilizar los estados del prefijo común con la clave anterior
+        comun = 0
+        limite = min(len(anterior), len(clave), len(estados) - 1)
+        while comun < limite and anterior[comun] == clave[comun]:
+            comun += 1
+        del estados[comun + 1 :]
+
+        muerto = False
+        libre = None  # Prefijo cuyas continuaciones están todas vivas
+        if sin_poda is not None and sin_poda(estados[-1]):
+            libre = clave[:comun]
+        else:
+            for caracter in clave[comun:]:
+                estado = automata.avanzar(estados[-1], caracter)
+                if not automata.vivo(estado):
+                    muerto = True
+                    break
+                estados.append(estado)
+                if sin_poda is not None and sin_poda(estado):
+                    libre = clave[: len(estados) - 1]
+                    break
+        anterior = clave
+
+        if libre is not None:
+            # Recorrer el rango del prefijo entero, sin avanzar el autómata
+            clave = None
+            for candidata in arbol.keys(min=anterior):
+                if not candidata.startswith(libre):
+                    clave = candidata
+                    break
+                if candidata != anterior:
+                    estadisticas["visitadas"] += 1
+                yield candidata, None
+            continue
+
+        if muerto:
+            # Todas las claves con este prefijo están muertas: saltar
+            estadisticas["saltos"] += 1
+            prefijo = siguiente_prefijo(automata, clave, estados)
+            clave = None if prefijo is None else clave_desde(arbol, prefijo)
+            continue
+
+        if automata.acepta(estados[-1]):
+            yield clave, estados[-1]
+        # La cadena más chica mayor que `clave` es su extensión con "\0"
+        clave = clave_desde(arbol, clave + "\0")
@@ -0,0 +1,882 @@
+#!/usr/bin/env python3
+"""
+Mediciones de rendimiento del índice ordenado.
+
+Cada subcomando construye los índices que necesita en tmp/ y los borra al
+terminar. Ejemplos:
+
+    python benchmark.py tokenizador --plegar-acentos --largo-minimo 3
+    python benchmark.py posiciones
+    python benchmark.py posiciones --documentos 2000
+    python benchmark.py autocompletado
+    python benchmark.py lote --consultas 5000
+    python benchmark.py difuso --tamanos 10000 100000
+    python benchmark.py regex --tamanos 100000
+    python benchmark.py instantanea --documentos 2000
+    python benchmark.py vocabulario --tamanos 100000 --bloques 8 16 32
+    python benchmark.py cache --objetos 400 5000 50000
+    python benchmark.py servidor --trabajadores 1 4 --concurrencias 1 8 32
+    python benchmark.py particiones --particiones 2 4 8
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import random
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+from functools import partial
+import ZODB
+import ZODB.FileStorage
+import transaction
+from BTrees.IIBTree import IITreeSet
+from BTrees.OOBTree import OOBTree
+from automatas import recorrer_automata
+from cache_zodb import ContadorCache, abrir_db, aplicar_limites, precalentar
+from comodines import limite_prefijo
+from difuso import AutomataLevenshtein, distancia_levenshtein, recorrer_difuso
+from expresiones import AutomataRegex
+from indexar import IndiceOrdenado, crear_indice, exportar_instantanea
+from instantanea import IndiceInstantanea
+from particiones import IndiceParticionado, borrar_particiones, particionar_indice, ruta_mapa
+from tokenizador import TOKENIZADOR_POR_DEFECTO, Tokenizador, terminos_por_palabra
+from vocabulario import VocabularioComprimido, VocabularioPlano
+
+
+def generar_corpus_sintetico(
+    directorio: str, documentos: int, palabras_por_documento: int = 2000, semilla: int = 42
+) -> str:
+    """
+    Genera un corpus sintético con distribución de frecuencias tipo Zipf.
+
+    El vocabulario se toma del corpus real si existe, para que los términos
+    tengan longitudes y prefijos realistas.
+
+    Args:
+        directorio: Directorio padre donde crear el corpus
+        documentos: Cantidad de documentos
+        palabras_por_documento: Palabras por documento
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        Ruta del directorio del corpus generado
+    """
+    azar = random.Random(semilla)
+
+    vocabulario = set()
+    for archivo in sorted(Path("corpus").glob("*.txt")):
+        vocabulario |= TOKENIZADOR_POR_DEFECTO.terminos(archivo.read_text(encoding="utf-8"))
+    vocabulario = sorted(vocabulario) or [f"termino{i}" for i in range(20000)]
+    azar.shuffle(vocabulario)
+    pesos = [1 / rango for rango in range(1, len(vocabulario) + 1)]
+
+    salida = tempfile.mkdtemp(prefix="sintetico_", dir=directorio)
+    for numero in range(documentos):
+        palabras = azar.choices(vocabulario, weights=pesos, k=palabras_por_documento)
+        with open(os.path.join(salida, f"doc{numero:06d}.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(palabras))
+
+    return salida
+
+
+def muestrear_frases(directorio: str, cantidad: int, largo: int = 3, semilla: int = 7) -> List[str]:
+    """Toma `cantidad` secuencias de `largo` palabras consecutivas del corpus."""
+    azar = random.Random(semilla)
+    archivos = sorted(Path(directorio).glob("*.txt"))
+    frases = []
+
+    while archivos and len(frases) < cantidad:
+        archivo = azar.choice(archivos)
+        tokens = TOKENIZADOR_POR_DEFECTO.tokens(archivo.read_text(encoding="utf-8"))
+        if len(tokens) > largo:
+            inicio = azar.randrange(len(tokens) - largo)
+            frases.append(" ".join(tokens[inicio : inicio + largo]))
+
+    return frases
+
+
+def tamano_db(archivo_db: str) -> int:
+    """Tamaño en bytes del archivo principal de la base ZODB."""
+    return os.path.getsize(archivo_db) if os.path.exists(archivo_db) else 0
+
+
+def borrar_db(archivo_db: str):
+    """Elimina el archivo ZODB y sus auxiliares."""
+    for ext in ["", ".index", ".tmp", ".lock"]:
+        if os.path.exists(archivo_db + ext):
+            os.remove(archivo_db + ext)
+
+
+def crear_indice_silencioso(*args, **kwargs):
+    """Llama a crear_indice descartando su salida por consola."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return crear_indice(*args, **kwargs)
+
+
+def medir_ms(funcion: Callable, argumentos: List, repeticiones: int = 3) -> List[float]:
+    """
+    Mide la latencia de `funcion` sobre cada argumento.
+
+    Returns:
+        Latencias en milisegundos (la mejor de `repeticiones` por argumento)
+    """
+    latencias = []
+    for argumento in argumentos:
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion(argumento)
+            mejor = min(mejor, time.perf_counter() - inicio)
+        latencias.append(mejor * 1000)
+    return latencias
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil `p` (0-100) por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def benchmark_tokenizador(args):
+    """Velocidad y vocabulario de la tokenización por palabra frente a la de una sola pasada."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+
+    try:
+        textos = [
+            archivo.read_text(encoding="utf-8") for archivo in sorted(Path(sintetico).iterdir())
+        ]
+        if os.path.exists("corpus"):
+            textos += [a.read_text(encoding="utf-8") for a in sorted(Path("corpus").glob("*.txt"))]
+        megabytes = sum(len(texto.encode("utf-8")) for texto in textos) / (1024 * 1024)
+
+        variantes = [
+            ("Por palabra (anterior)", terminos_por_palabra),
+            ("Una sola pasada", Tokenizador().terminos),
+        ]
+        if args.plegar_acentos or args.largo_minimo > 1 or args.largo_maximo:
+            opciones = Tokenizador(args.plegar_acentos, args.largo_minimo, args.largo_maximo)
+            variantes.append(
+                (
+                    f"Una pasada, acentos {'plegados' if args.plegar_acentos else 'intactos'}, "
+                    f"largo {args.largo_minimo}-{args.largo_maximo or '∞'}",
+                    opciones.terminos,
+                )
+            )
+
+        print(f"\n📊 {len(textos):,} documentos, {megabytes:.1f} MB")
+        vocabularios = []
+        for nombre, terminos in variantes:
+            inicio = time.perf_counter()
+            vocabulario = set()
+            for texto in textos:
+                vocabulario |= terminos(texto)
+            segundos = time.perf_counter() - inicio
+            vocabularios.append(vocabulario)
+            print(
+                f"   • {nombre:<48} {megabytes / segundos:7.1f} MB/s, "
+                f"{len(vocabulario):>8,} términos"
+            )
+        distintos = len(vocabularios[0] ^ vocabularios[1])
+        print(f"   • Términos distintos entre la tokenización anterior y la nueva: {distintos}")
+    finally:
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def benchmark_posiciones(args):
+    """Sobrecarga de tamaño del modo posicional y latencia de búsqueda de frases."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+
+    try:
+        for nombre, directorio in (("corpus/", "corpus"), ("sintético", sintetico)):
+            archivo_simple = "tmp/bench_simple.fs"
+            archivo_posicional = "tmp/bench_posicional.fs"
+
+            crear_indice_silencioso(directorio, archivo_simple)
+            crear_indice_silencioso(directorio, archivo_posicional, posicional=True)
+
+            simple = tamano_db(archivo_simple)
+            posicional = tamano_db(archivo_posicional)
+
+            storage = ZODB.FileStorage.FileStorage(archivo_posicional, read_only=True)
+            db = ZODB.DB(storage)
+            indice = db.open().root().indice
+            frases = muestrear_frases(directorio, args.consultas)
+            latencias = medir_ms(indice.buscar_frase, frases)
+            db.close()
+
+            print(f"\n📊 {nombre} ({len(list(Path(directorio).glob('*.txt')))} documentos)")
+            print(f"   • Índice simple:     {simple / 1024:,.0f} KB")
+            print(f"   • Índice posicional: {posicional / 1024:,.0f} KB")
+            print(f"   • Sobrecarga:        {(posicional / simple - 1) * 100 if simple else 0:.0f}%")
+            print(
+                f"   • Frases ({len(frases)} de 3 palabras): "
+                f"p50 {percentil(latencias, 50):.2f} ms, p99 {percentil(latencias, 99):.2f} ms"
+            )
+
+            borrar_db(archivo_simple)
+            borrar_db(archivo_posicional)
+    finally:
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def benchmark_autocompletado(args):
+    """Latencia del top-k de completados según el largo del prefijo, con y sin caché."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+    archivo_db = "tmp/bench_autocompletado.fs"
+
+    try:
+        crear_indice_silencioso(sintetico, archivo_db, autocompletado=args.largo)
+        storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+        db = ZODB.DB(storage)
+        indice = db.open().root().indice
+
+        azar = random.Random(3)
+        terminos = list(indice.indice.keys())
+        print(f"\n📊 {len(terminos):,} términos, caché de prefijos de hasta {args.largo} letras")
+
+        for largo in range(1, args.largo + 3):
+            candidatos = sorted({t[:largo] for t in terminos if len(t) >= largo})
+            prefijos = azar.sample(candidatos, min(args.consultas, len(candidatos)))
+            abarcados = max(indice._contar_prefijo(indice.indice, p) for p in prefijos)
+
+            con_cache = medir_ms(indice.autocompletar, prefijos)
+            indice.autocompletado_vigente = False  # Solo en memoria: la base es de lectura
+            sin_cache = medir_ms(indice.autocompletar, prefijos)
+            indice._p_invalidate()
+
+            print(
+                f"   • {largo} letra(s), hasta {abarcados:,} términos por prefijo: "
+                f"p99 {percentil(con_cache, 99):.3f} ms con caché, "
+                f"{percentil(sin_cache, 99):.3f} ms recorriendo el rango"
+            )
+
+        db.close()
+    finally:
+        borrar_db(archivo_db)
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def benchmark_lote(args):
+    """Consultas por segundo de buscar_lote frente a una llamada por patrón."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+    archivo_db = "tmp/bench_lote.fs"
+
+    try:
+        crear_indice_silencioso(sintetico, archivo_db)
+        storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+        db = ZODB.DB(storage)
+        indice = db.open().root().indice
+        indice.configurar_cache(0)  # Medir los árboles, no la caché
+
+        azar = random.Random(5)
+        terminos = list(indice.indice.keys())
+        print(f"\n📊 {len(terminos):,} términos, {args.consultas:,} consultas por lote")
+
+        tipos = (
+            ("exactas", indice.buscar_exacto),
+            ("prefijos", indice.buscar_prefijo),
+            ("sufijos", indice.buscar_sufijo),
+        )
+        for nombre, buscar in tipos:
+            patrones = []
+            for _ in range(args.consultas):
+                termino = azar.choice(terminos)
+                if buscar == indice.buscar_prefijo:
+                    patrones.append(termino[:4] + "*")
+                elif buscar == indice.buscar_sufijo:
+                    patrones.append("*" + termino[-4:])
+                else:
+                    # Un tercio de términos inexistentes, como en un diccionario externo
+                    patrones.append(termino if azar.random() < 0.66 else termino + "x")
+
+            argumentos = [patron.strip("*") for patron in patrones]
+
+            inicio = time.perf_counter()
+            for argumento in argumentos:
+                buscar(argumento)
+            uno_por_uno = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            indice.buscar_lote(patrones)
+            en_lote = time.perf_counter() - inicio
+
+            print(
+                f"   • {nombre}: {len(patrones) / uno_por_uno:,.0f} consultas/s una por una, "
+                f"{len(patrones) / en_lote:,.0f} consultas/s en lote"
+            )
+
+        db.close()
+    finally:
+        borrar_db(archivo_db)
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def vocabulario_sintetico(cantidad: int, semilla: int = 11) -> List[str]:
+    """
+    Vocabulario de `cantidad` términos: los del corpus real más variantes
+    con una edición al azar, para que crezca con términos realistas.
+    """
+    azar = random.Random(semilla)
+    base = set()
+    for archivo in sorted(Path("corpus").glob("*.txt")):
+        base |= TOKENIZADOR_POR_DEFECTO.terminos(archivo.read_text(encoding="utf-8"))
+    base = sorted(base) or ["termino"]
+    letras = "abcdefghijklmnopqrstuvwxyzáéíóúñ"
+
+    vocabulario = set(base[:cantidad])
+    while len(vocabulario) < cantidad:
+        termino = azar.choice(base)
+        pos = azar.randrange(len(termino) + 1)
+        termino = termino[:pos] + azar.choice(letras) + termino[pos + 1 :]
+        vocabulario.add(termino + azar.choice(letras))
+    return sorted(vocabulario)
+
+
+def con_errores(termino: str, azar: random.Random) -> str:
+    """Aplica una sustitución al azar, como un error de tipeo."""
+    pos = azar.randrange(len(termino))
+    return termino[:pos] + azar.choice("aeiourstln") + termino[pos + 1 :]
+
+
+def benchmark_difuso(args):
+    """Autómata de Levenshtein con saltos frente a comparar contra todo el vocabulario."""
+    azar = random.Random(13)
+
+    for tamano in args.tamanos:
+        vocabulario = vocabulario_sintetico(tamano)
+        arbol = OOBTree()
+        arbol.update([(termino, None) for termino in vocabulario])
+        consultas = [
+            con_errores(termino, azar)
+            for termino in azar.sample(vocabulario, args.consultas)
+            if len(termino) > 3
+        ]
+
+        def automata(consulta):
+            return list(recorrer_difuso(arbol, AutomataLevenshtein(consulta, args.ediciones)))
+
+        def fuerza_bruta(consulta):
+            return [
+                (termino, distancia)
+                for termino, distancia in (
+                    (termino, distancia_levenshtein(termino, consulta)) for termino in arbol.keys()
+                )
+                if distancia <= args.ediciones
+            ]
+
+        latencias_automata = medir_ms(automata, consultas, repeticiones=1)
+        latencias_fuerza = medir_ms(fuerza_bruta, consultas[: args.consultas_fuerza], repeticiones=1)
+        assert automata(consultas[0]) == fuerza_bruta(consultas[0])
+
+        print(f"\n📊 {tamano:,} términos, hasta {args.ediciones} ediciones")
+        print(
+            f"   • Autómata con saltos: p50 {percentil(latencias_automata, 50):.2f} ms, "
+            f"p99 {percentil(latencias_automata, 99):.2f} ms"
+        )
+        print(
+            f"   • Fuerza bruta:        p50 {percentil(latencias_fuerza, 50):.2f} ms, "
+            f"p99 {percentil(latencias_fuerza, 99):.2f} ms"
+        )
+
+
+EXPRESIONES_BENCHMARK = [
+    "cas[ao]s?",
+    "(des|re)[a-z]+",
+    "[aeiou]{2}.*",
+    "h.b+it.*",
+    ".*ción",
+    "[^aeiou]*",
+    "ca.{2,4}do",
+]
+
+
+def benchmark_regex(args):
+    """Regex con autómata determinista y saltos frente a `re.fullmatch` sobre todo el vocabulario."""
+    for tamano in args.tamanos:
+        vocabulario = vocabulario_sintetico(tamano)
+        arbol = OOBTree()
+        arbol.update([(termino, None) for termino in vocabulario])
+
+        print(f"\n📊 {tamano:,} términos")
+        for expresion in args.expresiones:
+            recorrido = {}
+            inicio = time.perf_counter()
+            automata = AutomataRegex(expresion)
+            coincidencias = [
+                clave
+                for clave, _ in recorrer_automata(arbol, automata, recorrido)
+                if automata.coincide(clave)
+            ]
+            ms_automata = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            regex = re.compile(expresion)
+            esperado = [termino for termino in arbol.keys() if regex.fullmatch(termino)]
+            ms_completo = (time.perf_counter() - inicio) * 1000
+            assert coincidencias == esperado, expresion
+
+            print(
+                f"   • {expresion:<16} {len(coincidencias):>7,} coincidencias, "
+                f"{recorrido['visitadas']:>8,} claves visitadas "
+                f"({recorrido['visitadas'] / tamano:6.1%}), {recorrido['saltos']:,} saltos: "
+                f"{ms_automata:8.2f} ms frente a {ms_completo:8.2f} ms recorriendo todo"
+            )
+
+
+# Abre el índice en un proceso nuevo y hace una consulta; imprime los ms
+_ARRANQUE_ZODB = """
+import sys, time
+import ZODB, ZODB.FileStorage
+from indexar import IndiceOrdenado
+inicio = time.perf_counter()
+db = ZODB.DB(ZODB.FileStorage.FileStorage(sys.argv[1], read_only=True))
+indice = db.open().root().indice
+indice.__class__ = IndiceOrdenado
+indice.buscar_prefijo(sys.argv[2])
+print((time.perf_counter() - inicio) * 1000)
+"""
+_ARRANQUE_INSTANTANEA = """
+import sys, time
+from instantanea import IndiceInstantanea
+inicio = time.perf_counter()
+indice = IndiceInstantanea(sys.argv[1])
+indice.buscar_prefijo(sys.argv[2])
+print((time.perf_counter() - inicio) * 1000)
+"""
+
+
+def arranque_ms(codigo: str, ruta: str, prefijo: str) -> float:
+    """Milisegundos hasta la primera respuesta en un proceso nuevo (sin contar imports)."""
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo, ruta, prefijo], capture_output=True, text=True, check=True
+    )
+    return float(salida.stdout.strip())
+
+
+def benchmark_instantanea(args):
+    """Arranque y latencia de la instantánea con mmap frente a ZODB FileStorage."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+    archivo_db = "tmp/bench_instantanea.fs"
+    ruta = "tmp/bench_instantanea.snap"
+
+    try:
+        crear_indice_silencioso(sintetico, archivo_db)
+        with contextlib.redirect_stdout(io.StringIO()):
+            exportar_instantanea(archivo_db, ruta)
+
+        storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+        db = ZODB.DB(storage)
+        indice = db.open().root().indice
+        indice.configurar_cache(0)  # Medir los árboles, no la caché
+        instantanea = IndiceInstantanea(ruta)
+
+        azar = random.Random(9)
+        terminos = list(indice.indice.keys())
+        prefijos = [azar.choice(terminos)[:3] for _ in range(args.consultas)]
+        exactos = [azar.choice(terminos) for _ in range(args.consultas)]
+
+        print(f"\n📊 {len(terminos):,} términos, {args.documentos:,} documentos")
+        print(
+            f"   • Tamaño: ZODB {tamano_db(archivo_db) / 1024:,.0f} KB, "
+            f"instantánea {os.path.getsize(ruta) / 1024:,.0f} KB"
+        )
+        arranques = [
+            ("ZODB", _ARRANQUE_ZODB, archivo_db),
+            ("instantánea", _ARRANQUE_INSTANTANEA, ruta),
+        ]
+        for nombre, codigo, archivo in arranques:
+            tiempos = [arranque_ms(codigo, archivo, prefijo) for prefijo in prefijos[:5]]
+            print(f"   • Arranque + primera consulta ({nombre}): {percentil(tiempos, 50):.2f} ms")
+
+        for nombre, fuente in (("ZODB", indice), ("instantánea", instantanea)):
+            for tipo, buscar, argumentos in (
+                ("exacta", fuente.buscar_exacto, exactos),
+                ("prefijo", fuente.buscar_prefijo, prefijos),
+            ):
+                latencias = medir_ms(buscar, argumentos)
+                print(
+                    f"   • {tipo} ({nombre}): p50 {percentil(latencias, 50):.3f} ms, "
+                    f"p99 {percentil(latencias, 99):.3f} ms"
+                )
+
+        instantanea.cerrar()
+        db.close()
+    finally:
+        borrar_db(archivo_db)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def memoria_retenida(construir: Callable) -> Tuple[object, int]:
+    """Construye un objeto y devuelve (objeto, bytes que sigue ocupando)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        objeto = construir()
+        gc.collect()
+        return objeto, tracemalloc.get_traced_memory()[0] - antes
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_vocabulario(args):
+    """Memoria por término y latencia del vocabulario con front-coding frente a OOBTree."""
+    azar = random.Random(5)
+    for tamano in args.tamanos:
+        vocabulario = vocabulario_sintetico(tamano)
+        invertidos = sorted(termino[::-1] for termino in vocabulario)
+        # Consultas mezcladas: la mitad están en el vocabulario y la mitad no
+        exactos = [azar.choice(vocabulario) for _ in range(args.consultas)]
+        exactos += [termino + "x" for termino in exactos[: args.consultas // 2]]
+        azar.shuffle(exactos)
+        prefijos = [azar.choice(vocabulario)[:3] for _ in range(args.consultas)]
+
+        def arboles():
+            # Cadenas nuevas: el árbol de un índice cargado es dueño de sus claves
+            resultado = []
+            for claves in (vocabulario, invertidos):
+                arbol = OOBTree()
+                arbol.update([(clave.encode("utf-8").decode("utf-8"), None) for clave in claves])
+                resultado.append(arbol)
+            return resultado
+
+        def vocabularios(clase, *parametros):
+            def construir():
+                resultado = [
+                    clase.desde_terminos(claves, *parametros) for claves in (vocabulario, invertidos)
+                ]
+                for armado in resultado:
+                    armado.posicion("")  # Armar el índice de bloques
+                return resultado
+
+            return construir
+
+        variantes = [("OOBTree", arboles), ("plano", vocabularios(VocabularioPlano))]
+        variantes += [
+            (f"bloques de {bloque}", vocabularios(VocabularioComprimido, bloque))
+            for bloque in args.bloques
+        ]
+
+        print(f"\n📊 {tamano:,} términos (directo + invertido)")
+        for nombre, construir in variantes:
+            (directo, _), memoria = memoria_retenida(construir)
+            exacta = directo.__contains__
+            if isinstance(directo, OOBTree):
+                prefijo = lambda p, arbol=directo: sum(1 for _ in arbol.keys(p, limite_prefijo(p)))
+            else:
+                prefijo = lambda p, claves=directo: len(claves.rango_prefijo(p))
+            assert [exacta(termino) for termino in exactos[:50]] == [
+                termino in vocabulario for termino in exactos[:50]
+            ]
+
+            latencias_exacta = medir_ms(exacta, exactos, repeticiones=1)
+            latencias_prefijo = medir_ms(prefijo, prefijos, repeticiones=1)
+            print(
+                f"   • {nombre:<15} {memoria / tamano:6.1f} B/término | "
+                f"exacta p50 {percentil(latencias_exacta, 50) * 1000:6.2f} µs, "
+                f"p99 {percentil(latencias_exacta, 99) * 1000:6.2f} µs | "
+                f"prefijo p50 {percentil(latencias_prefijo, 50) * 1000:7.2f} µs, "
+                f"p99 {percentil(latencias_prefijo, 99) * 1000:7.2f} µs"
+            )
+
+
+def benchmark_cache(args):
+    """Aciertos, cargas y latencia según el tamaño de la caché de ZODB, con y sin precalentar."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+    archivo_db = "tmp/bench_cache.fs"
+
+    try:
+        crear_indice_silencioso(sintetico, archivo_db, autocompletado=1)
+        db = abrir_db(archivo_db)
+        indice = db.open().root().indice
+        # Consultas con la frecuencia de los términos: los comunes se buscan más
+        frecuencias = {termino: len(postings) for termino, postings in indice.indice.items()}
+        db.close()
+
+        azar = random.Random(17)
+        terminos = azar.choices(
+            list(frecuencias), weights=list(frecuencias.values()), k=args.consultas
+        )
+        consultas = [
+            ("buscar_prefijo", termino[:3]) if azar.random() < 0.3 else ("buscar_exacto", termino)
+            for termino in terminos
+        ]
+
+        print(
+            f"\n📊 {len(frecuencias):,} términos, {args.documentos:,} documentos, "
+            f"{len(consultas):,} consultas (70% exactas, 30% prefijos de 3 letras)"
+        )
+        for objetos in args.objetos:
+            for precalentado in (False, True):
+                db = abrir_db(archivo_db, cache_objetos=objetos)
+                conexion = db.open()
+                indice = conexion.root().indice
+                indice.configurar_cache(0)  # Medir la caché de objetos, no la de resultados
+                contador = ContadorCache(conexion)
+
+                inicio = time.perf_counter()
+                if precalentado:
+                    precalentar(indice)
+                ms_precalentar = (time.perf_counter() - inicio) * 1000
+
+                latencias = []
+                for metodo, argumento in consultas:
+                    with contador.medir():
+                        inicio = time.perf_counter()
+                        getattr(indice, metodo)(argumento)
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                    aplicar_limites(conexion, [indice])
+
+                totales = contador.estadisticas()
+                usados = totales["aciertos"] + totales["cargas"]
+                print(
+                    f"   • {objetos:>7,} objetos{' + precalentar' if precalentado else '':<14} "
+                    f"aciertos {totales['aciertos'] / max(usados, 1):6.1%}, "
+                    f"{totales['cargas'] / len(consultas):6.2f} cargas/consulta | "
+                    f"primeras 20 p50 {percentil(latencias[:20], 50):6.3f} ms, "
+                    f"todas p50 {percentil(latencias, 50):6.3f} ms, "
+                    f"p99 {percentil(latencias, 99):6.3f} ms"
+                    + (f" | precalentar {ms_precalentar:.0f} ms" if precalentado else "")
+                )
+                db.close()
+    finally:
+        borrar_db(archivo_db)
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def esperar_socket(ruta: str, proceso: subprocess.Popen, segundos: float = 30.0):
+    """Espera a que el servidor cree su socket Unix (falla si el proceso termina antes)."""
+    limite = time.monotonic() + segundos
+    while not os.path.exists(ruta):
+        if proceso.poll() is not None or time.monotonic() > limite:
+            raise RuntimeError("El servidor no arrancó")
+        time.sleep(0.05)
+
+
+def benchmark_servidor(args):
+    """Consultas por segundo y latencias del servidor HTTP según trabajadores y conexiones."""
+    os.makedirs("tmp", exist_ok=True)
+    sintetico = generar_corpus_sintetico("tmp", args.documentos)
+    archivo_db = "tmp/bench_servidor.fs"
+    socket_unix = "tmp/bench_servidor.sock"
+
+    try:
+        crear_indice_silencioso(sintetico, archivo_db)
+        print(f"\n📊 {args.documentos:,} documentos, {args.total:,} consultas por medición")
+        for trabajadores in args.trabajadores:
+            proceso = subprocess.Popen(
+                [sys.executable, "servidor.py", "--db", archivo_db, "--unix", socket_unix]
+                + ["--trabajadores", str(trabajadores)],
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                esperar_socket(socket_unix, proceso)
+                for concurrencia in args.concurrencias:
+                    mensaje = f"\n   {trabajadores} trabajador(es), {concurrencia} conexión(es):"
+                    print(mensaje, end="", flush=True)
+                    subprocess.run(
+                        [sys.executable, "carga.py", "--unix", socket_unix]
+                        + ["--concurrencia", str(concurrencia), "--total", str(args.total)],
+                        check=True,
+                    )
+            finally:
+                proceso.send_signal(signal.SIGINT)
+                proceso.wait()
+    finally:
+        borrar_db(archivo_db)
+        if os.path.exists(socket_unix):
+            os.remove(socket_unix)
+        shutil.rmtree(sintetico, ignore_errors=True)
+
+
+def benchmark_particiones(args):
+    """Consultas enrutadas y comodines en paralelo del índice particionado frente a uno solo."""
+    os.makedirs("tmp", exist_ok=True)
+    archivo_db = "tmp/bench_particiones.fs"
+    patrones = ["*ll*", "*e?o*", "*ñ*", "?a?a*"]  # Sin partes literales: recorren todo
+
+    for tamano in args.tamanos:
+        try:
+            # Índice con un vocabulario sintético grande y postings chicos
+            azar = random.Random(31)
+            vocabulario = vocabulario_sintetico(tamano)
+            db = ZODB.DB(ZODB.FileStorage.FileStorage(archivo_db))
+            conexion = db.open()
+            indice = conexion.root().indice = IndiceOrdenado()
+            for doc_id in range(100):
+                indice.documentos[doc_id] = f"doc{doc_id:03d}"
+            for numero, termino in enumerate(vocabulario, 1):
+                docs = azar.sample(range(100), azar.randint(1, 3))
+                indice.indice[termino] = IITreeSet(docs)
+                indice.indice_invertido[termino[::-1]] = IITreeSet(docs)
+                if numero % 10000 == 0:
+                    transaction.savepoint(True)
+            transaction.commit()
+            indice.configurar_cache(0)  # Medir los recorridos, no la caché de resultados
+
+            terminos = azar.sample(vocabulario, args.consultas)
+            prefijos = [termino[:3] for termino in terminos]
+
+            def medir(buscador) -> Tuple[float, float, float]:
+                buscador.buscar_prefijo("")  # Cargar todo en la caché
+                for patron in patrones:
+                    buscador.buscar_comodin(patron, ids=True)
+                exactos = medir_ms(partial(buscador.buscar_exacto, ids=True), terminos, 1)
+                rangos = medir_ms(partial(buscador.buscar_prefijo, ids=True), prefijos, 1)
+                comodines = medir_ms(partial(buscador.buscar_comodin, ids=True), patrones)
+                return percentil(exactos, 50), percentil(rangos, 50), sum(comodines) / len(patrones)
+
+            print(
+                f"\n📊 {tamano:,} términos: p50 de {len(terminos):,} exactas y prefijos de 3 "
+                f"letras, media de los comodines {patrones}"
+            )
+            exacto, prefijo, comodin = medir(indice)
+            print(
+                f"   • Un solo archivo:          exacto {exacto:.3f} ms, "
+                f"prefijo {prefijo:.3f} ms, comodín {comodin:7.1f} ms"
+            )
+            for particiones in args.particiones:
+                particionar_indice(indice, archivo_db, particiones)
+                for procesos in (1, particiones):
+                    with IndiceParticionado(
+                        ruta_mapa(archivo_db), procesos=procesos, cache_objetos=1_000_000
+                    ) as particionado:
+                        exacto, prefijo, comodin = medir(particionado)
+                    print(
+                        f"   • {particiones:>2} particiones, {procesos:>2} proceso(s): "
+                        f"exacto {exacto:.3f} ms, prefijo {prefijo:.3f} ms, "
+                        f"comodín {comodin:7.1f} ms"
+                    )
+            db.close()
+        finally:
+            borrar_particiones(archivo_db)
+            borrar_db(archivo_db)
+
+
+def main():
+    """Función principal."""
+    parser = argparse.ArgumentParser(description="Mediciones de rendimiento del índice.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    tokenizador = subparsers.add_parser(
+        "tokenizador", help="Tokenización anterior frente a la de una sola pasada"
+    )
+    tokenizador.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    tokenizador.add_argument(
+        "--plegar-acentos", action="store_true", help="Medir también con acentos plegados"
+    )
+    tokenizador.add_argument(
+        "--largo-minimo", type=int, default=1, help="Largo mínimo de término"
+    )
+    tokenizador.add_argument(
+        "--largo-maximo", type=int, default=0, help="Largo máximo de término (0 = sin límite)"
+    )
+    tokenizador.set_defaults(funcion=benchmark_tokenizador)
+
+    posiciones = subparsers.add_parser("posiciones", help="Índice posicional y frases")
+    posiciones.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    posiciones.add_argument("--consultas", type=int, default=200, help="Frases a consultar")
+    posiciones.set_defaults(funcion=benchmark_posiciones)
+
+    autocompletado = subparsers.add_parser("autocompletado", help="Top-k de completados")
+    autocompletado.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    autocompletado.add_argument("--consultas", type=int, default=200, help="Prefijos por largo")
+    autocompletado.add_argument("--largo", type=int, default=2, help="Largo máximo en caché")
+    autocompletado.set_defaults(funcion=benchmark_autocompletado)
+
+    lote = subparsers.add_parser("lote", help="Búsquedas en lote con un solo recorrido")
+    lote.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    lote.add_argument("--consultas", type=int, default=5000, help="Patrones por lote")
+    lote.set_defaults(funcion=benchmark_lote)
+
+    difuso = subparsers.add_parser("difuso", help="Búsqueda difusa con autómata de Levenshtein")
+    difuso.add_argument(
+        "--tamanos", type=int, nargs="+", default=[10_000, 50_000, 200_000], help="Vocabularios"
+    )
+    difuso.add_argument("--ediciones", type=int, default=2, help="Máximo de ediciones")
+    difuso.add_argument("--consultas", type=int, default=100, help="Consultas con el autómata")
+    difuso.add_argument(
+        "--consultas-fuerza", type=int, default=10, help="Consultas por fuerza bruta (lentas)"
+    )
+    difuso.set_defaults(funcion=benchmark_difuso)
+
+    regex = subparsers.add_parser("regex", help="Expresiones regulares con autómata determinista")
+    regex.add_argument(
+        "--tamanos", type=int, nargs="+", default=[10_000, 100_000], help="Vocabularios"
+    )
+    regex.add_argument(
+        "--expresiones", nargs="+", default=EXPRESIONES_BENCHMARK, help="Expresiones a medir"
+    )
+    regex.set_defaults(funcion=benchmark_regex)
+
+    instantanea = subparsers.add_parser("instantanea", help="Instantánea con mmap frente a ZODB")
+    instantanea.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    instantanea.add_argument("--consultas", type=int, default=500, help="Consultas por tipo")
+    instantanea.set_defaults(funcion=benchmark_instantanea)
+
+    vocabulario = subparsers.add_parser("vocabulario", help="Vocabulario con front-coding")
+    vocabulario.add_argument(
+        "--tamanos", type=int, nargs="+", default=[10_000, 100_000], help="Vocabularios"
+    )
+    vocabulario.add_argument(
+        "--bloques", type=int, nargs="+", default=[4, 16, 64], help="Términos por bloque"
+    )
+    vocabulario.add_argument("--consultas", type=int, default=2000, help="Consultas por tipo")
+    vocabulario.set_defaults(funcion=benchmark_vocabulario)
+
+    cache = subparsers.add_parser("cache", help="Tamaño y precalentamiento de la caché de ZODB")
+    cache.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    cache.add_argument("--consultas", type=int, default=2000, help="Consultas a medir")
+    cache.add_argument(
+        "--objetos", type=int, nargs="+", default=[400, 5_000, 50_000], help="Límites de la caché"
+    )
+    cache.set_defaults(funcion=benchmark_cache)
+
+    servidor = subparsers.add_parser("servidor", help="Servidor HTTP bajo carga concurrente")
+    servidor.add_argument("--documentos", type=int, default=300, help="Documentos sintéticos")
+    servidor.add_argument("--total", type=int, default=5000, help="Consultas por medición")
+    servidor.add_argument(
+        "--trabajadores", type=int, nargs="+", default=[1, 4], help="Hilos del servidor"
+    )
+    servidor.add_argument(
+        "--concurrencias", type=int, nargs="+", default=[1, 8, 32], help="Conexiones del cliente"
+    )
+    servidor.set_defaults(funcion=benchmark_servidor)
+
+    particiones = subparsers.add_parser("particiones", help="Índice particionado por rangos")
+    particiones.add_argument(
+        "--tamanos", type=int, nargs="+", default=[100_000, 400_000], help="Vocabularios"
+    )
+    particiones.add_argument("--consultas", type=int, default=500, help="Términos a consultar")
+    particiones.add_argument(
+        "--particiones", type=int, nargs="+", default=[2, 4], help="Cantidades de particiones"
+    )
+    particiones.set_defaults(funcion=benchmark_particiones)
+
+    args = parser.parse_args()
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
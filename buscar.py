@@ -2,34 +2,76 @@
 """
 Interfaz CLI para búsquedas con comodines en el índice ordenado.
 Soporta búsquedas exactas, prefijos, sufijos y patrones con comodines.
+
+Con --instantanea RUTA consulta una instantánea de solo lectura (ver
+instantanea.py) en lugar de abrir la base de datos ZODB. Con ZODB, los
+límites de la caché de objetos y el precalentamiento se configuran con
+--cache-objetos, --cache-mb y --precalentar (ver cache_zodb.py).
 """
 
+import argparse
 import os
 import sys
-from typing import Dict, List
-import ZODB
-import ZODB.FileStorage
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List
+from BTrees.IIBTree import multiunion
+from cache_zodb import (
+    CACHE_MB_POR_DEFECTO,
+    CACHE_OBJETOS_POR_DEFECTO,
+    ContadorCache,
+    abrir_db,
+    aplicar_limites,
+    precalentar,
+)
 from indexar import IndiceOrdenado  # Importar la clase actualizada
+from instantanea import IndiceInstantanea
 
 
 class BuscadorCLI:
     """Interfaz de línea de comandos para búsquedas."""
 
-    def __init__(self, archivo_db: str = "index/indice.fs"):
+    def __init__(
+        self,
+        archivo_db: str = "index/indice.fs",
+        instantanea: str = None,
+        cache_objetos: int = CACHE_OBJETOS_POR_DEFECTO,
+        cache_mb: float = CACHE_MB_POR_DEFECTO,
+        precalentado: bool = False,
+        terminos_calientes: List[str] = None,
+        estadisticas_cache: bool = False,
+    ):
         """
-        Inicializa el buscador con la base de datos ZODB.
+        Inicializa el buscador con la base de datos ZODB o con una instantánea.
 
         Args:
             archivo_db: Archivo de base de datos ZODB
+            instantanea: Archivo de instantánea a usar en lugar de la base de datos
+            cache_objetos: Límite de objetos de la caché de ZODB
+            cache_mb: Límite en MB de la caché de ZODB (0 = sin límite)
+            precalentado: Cargar los niveles superiores y los términos calientes al abrir
+            terminos_calientes: Términos a precalentar (por defecto, los más frecuentes)
+            estadisticas_cache: Contar aciertos y cargas de la caché de ZODB en
+                cada búsqueda (recorre la lista LRU: solo para dimensionarla)
         """
+        self.db = None
+        self.contador = None
+        self.estadisticas_cache = estadisticas_cache
+        if instantanea is not None:
+            if not os.path.exists(instantanea):
+                print(f"Error: No existe la instantánea '{instantanea}'")
+                print("Ejecuta 'python indexar.py --exportar RUTA' para crearla.")
+                sys.exit(1)
+            self.indice = IndiceInstantanea(instantanea)
+            return
+
         if not os.path.exists(archivo_db):
             print(f"Error: No existe el índice '{archivo_db}'")
             print("Ejecuta 'python indexar.py' o 'make index' primero para crear el índice.")
             sys.exit(1)
 
         # Abrir la base de datos ZODB
-        self.storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
-        self.db = ZODB.DB(self.storage)
+        self.db = abrir_db(archivo_db, cache_objetos=cache_objetos, cache_mb=cache_mb)
         self.connection = self.db.open()
         self.root = self.connection.root()
 
@@ -40,9 +82,41 @@ class BuscadorCLI:
         self.indice = self.root.indice
         # Forzar que use la clase actualizada
         self.indice.__class__ = IndiceOrdenado
+        self.contador = ContadorCache(self.connection)
+
+        if precalentado:
+            resumen = precalentar(self.indice, terminos_calientes)
+            print(
+                f"🔥 Precalentado: {resumen['nodos']} nodos internos, "
+                f"{resumen['terminos']} términos calientes ({resumen['cargas']} objetos cargados)"
+            )
+            aplicar_limites(self.connection, [self.indice])
+
+    @contextmanager
+    def medir_cache(self):
+        """
+        Aplica los límites de la caché de ZODB después de una búsqueda y, con
+        `estadisticas_cache`, muestra sus aciertos y cargas.
+        """
+        if self.contador is None:
+            yield
+            return
+        if not self.estadisticas_cache:
+            yield
+        else:
+            with self.contador.medir() as consulta:
+                yield
+            print(
+                f"   (caché ZODB: {consulta['aciertos']:,} aciertos, "
+                f"{consulta['cargas']:,} cargas)"
+            )
+        aplicar_limites(self.connection, [self.indice])
 
     def cerrar(self):
-        """Cierra la conexión a la base de datos."""
+        """Cierra la conexión a la base de datos (o la instantánea)."""
+        if self.db is None:
+            self.indice.cerrar()
+            return
         try:
             self.connection.close()
         except Exception:
@@ -60,14 +134,42 @@ class BuscadorCLI:
         print(f"\nDocumentos indexados:")
         for doc in sorted(stats["documentos"]):
             print(f"  • {doc}")
+        if isinstance(self.indice, IndiceInstantanea):
+            print(f"\nInstantánea de solo lectura: {self.indice.ruta}")
+            print("=" * 60)
+            return
+        cache = self.indice.estadisticas_cache()
+        print(
+            f"\nCaché de resultados: {cache['aciertos']} aciertos, {cache['fallos']} fallos, "
+            f"{cache['desalojos']} desalojos ({cache['entradas']} entradas)"
+        )
+        objetos = self.contador.estadisticas()
+        limite_bytes = objetos["limite_bytes"]
+        print(
+            f"Caché de ZODB: {objetos['objetos']:,} de {objetos['limite_objetos']:,} objetos, "
+            f"{objetos['bytes'] / 1024:,.0f} KB"
+            + (f" de {limite_bytes / 1024:,.0f} KB" if limite_bytes else "")
+            + (
+                f"; {objetos['aciertos']:,} aciertos y {objetos['cargas']:,} cargas "
+                f"en {objetos['consultas']} búsquedas"
+                if self.estadisticas_cache
+                else " (aciertos por búsqueda con --estadisticas-cache)"
+            )
+        )
         print("=" * 60)
 
-    def formatear_resultados(self, resultados: Dict[str, List[str]], titulo: str = "RESULTADOS"):
+    def formatear_resultados(
+        self, resultados: Dict[str, Iterable[int]], titulo: str = "RESULTADOS"
+    ):
         """
         Formatea y muestra los resultados de búsqueda.
 
+        Los documentos de cada término llegan como doc_ids ordenados; los
+        nombres se resuelven con la tabla de documentos del índice, sin
+        volver a ordenar ni deduplicar.
+
         Args:
-            resultados: Diccionario {término -> lista de documentos}
+            resultados: Diccionario {término -> doc_ids}
             titulo: Título a mostrar
         """
         if not resultados:
@@ -79,9 +181,7 @@ class BuscadorCLI:
         print("=" * 60)
 
         # Contar documentos únicos
-        docs_unicos = set()
-        for docs in resultados.values():
-            docs_unicos.update(docs)
+        docs_unicos = multiunion(list(resultados.values()))
 
         print(f"Términos encontrados: {len(resultados)}")
         print(f"Documentos únicos: {len(docs_unicos)}")
@@ -89,8 +189,7 @@ class BuscadorCLI:
 
         # Mostrar resultados por término
         for termino in sorted(resultados.keys()):
-            docs = resultados[termino]
-            docs_str = ", ".join(sorted(set(docs)))
+            docs_str = ", ".join(self.indice.nombres_documentos(resultados[termino]))
             print(f"  📖 '{termino}' → [{docs_str}]")
 
         print("=" * 60 + "\n")
@@ -104,29 +203,31 @@ class BuscadorCLI:
         if not docs:
             print(f"\n❌ El término '{termino}' no se encuentra en el índice.\n")
         else:
-            docs_str = ", ".join(sorted(set(docs)))
+            docs_str = ", ".join(docs)
             print(f"\n✅ Encontrado en: [{docs_str}]\n")
 
     def buscar_prefijo(self, prefijo: str):
         """Búsqueda por prefijo."""
         print(f"\n🔍 Buscando términos que empiecen con: '{prefijo}'")
 
-        resultados = self.indice.buscar_prefijo(prefijo)
+        resultados = self.indice.buscar_prefijo(prefijo, ids=True)
         self.formatear_resultados(resultados, f"TÉRMINOS QUE EMPIEZAN CON '{prefijo}'")
 
     def buscar_sufijo(self, sufijo: str):
         """Búsqueda por sufijo."""
         print(f"\n🔍 Buscando términos que terminen con: '{sufijo}'")
 
-        resultados = self.indice.buscar_sufijo(sufijo)
+        resultados = self.indice.buscar_sufijo(sufijo, ids=True)
         self.formatear_resultados(resultados, f"TÉRMINOS QUE TERMINAN CON '{sufijo}'")
 
     def buscar_comodin(self, patron: str):
         """Búsqueda con comodines."""
         print(f"\n🔍 Buscando patrón: '{patron}'")
         print("   (usa * para cualquier secuencia, ? para un carácter)")
+        if isinstance(self.indice, IndiceOrdenado):
+            print(f"   (plan: {self.indice.planificar_comodin(patron)})")
 
-        resultados = self.indice.buscar_comodin(patron)
+        resultados = self.indice.buscar_comodin(patron, ids=True)
         self.formatear_resultados(resultados, f"TÉRMINOS QUE COINCIDEN CON '{patron}'")
 
     def buscar_comodin_medio(self, patron: str):
@@ -134,9 +235,62 @@ class BuscadorCLI:
         print(f"\n🔍 Buscando patrón con * en el medio: '{patron}'")
         print("   (Usando ambos árboles B+ con intersección AND)")
 
-        resultados = self.indice.buscar_comodin_medio(patron)
+        resultados = self.indice.buscar_comodin_medio(patron, ids=True)
         self.formatear_resultados(resultados, f"TÉRMINOS QUE COINCIDEN CON '{patron}'")
 
+    def buscar_booleana(self, consulta: str):
+        """Búsqueda booleana con AND, OR, NOT y paréntesis."""
+        print(f"\n🔍 Evaluando consulta: '{consulta}'")
+
+        try:
+            docs = self.indice.buscar_booleana(consulta)
+        except ValueError as e:
+            print(f"\n❌ Consulta inválida: {e}\n")
+            return
+
+        if not docs:
+            print("\n❌ No se encontraron resultados.\n")
+        else:
+            print(f"\n✅ {len(docs)} documento(s): [{', '.join(docs)}]\n")
+
+    def autocompletar(self, prefijo: str):
+        """Completados más frecuentes de un prefijo."""
+        print(f"\n🔍 Autocompletando: '{prefijo}'")
+
+        completados = self.indice.autocompletar(prefijo)
+        if not completados:
+            print("\n❌ No hay términos con ese prefijo.\n")
+            return
+
+        print()
+        for termino, df in completados:
+            print(f"  📖 {termino} ({df} documento{'s' if df != 1 else ''})")
+        print()
+
+    def buscar_rango(self, minimo: str, maximo: str, limite: int = 50):
+        """Términos entre dos cotas, en orden lexicográfico."""
+        print(f"\n🔍 Términos entre '{minimo}' y '{maximo}' (máximo {limite})")
+
+        resultados = dict(self.indice.buscar_rango(minimo, maximo, limite=limite))
+        self.formatear_resultados(resultados, f"TÉRMINOS ENTRE '{minimo}' Y '{maximo}'")
+
+    def buscar_regex(self, expresion: str):
+        """Búsqueda por expresión regular sobre los términos."""
+        print(f"\n🔍 Buscando términos que coincidan con la regex: '{expresion}'")
+
+        recorrido = {}
+        try:
+            resultados = self.indice.buscar_regex(expresion, ids=True, estadisticas=recorrido)
+        except ValueError as e:
+            print(f"\n❌ Expresión inválida: {e}\n")
+            return
+
+        print(
+            f"   (claves visitadas: {recorrido['visitadas']:,} de "
+            f"{recorrido['vocabulario']:,}, saltos: {recorrido['saltos']:,})"
+        )
+        self.formatear_resultados(resultados, f"TÉRMINOS QUE COINCIDEN CON /{expresion}/")
+
     def mostrar_menu(self):
         """Muestra el menú principal."""
         print("\n" + "=" * 60)
@@ -148,6 +302,10 @@ class BuscadorCLI:
         print("  2 - Búsqueda por sufijo (ej: '*ción')")
         print("  3 - Búsqueda con comodines (ej: 'h?bbit', 'ho*')")
         print("  4 - Búsqueda con * en medio (ej: 'ca*do', 'ho*bit')")
+        print("  7 - Búsqueda booleana (ej: 'hobbit AND (anillo OR drag*)')")
+        print("  8 - Autocompletar (términos más frecuentes con un prefijo)")
+        print("  9 - Rango de términos (ej: entre 'ma' y 'me')")
+        print("  10 - Expresión regular (ej: 'cas[ao]s?', '(des|re)hac.+')")
         print("  5 - Ver estadísticas del índice")
         print("  6 - Salir")
         print("=" * 60)
@@ -159,7 +317,7 @@ class BuscadorCLI:
         while True:
             try:
                 self.mostrar_menu()
-                opcion = input("\nSelecciona una opción (0-6): ").strip()
+                opcion = input("\nSelecciona una opción (0-10): ").strip()
 
                 if opcion == "6":
                     print("\n👋 ¡Hasta luego!\n")
@@ -171,31 +329,62 @@ class BuscadorCLI:
                 elif opcion == "0":
                     termino = input("\nIngresa el término a buscar: ").strip()
                     if termino:
-                        self.buscar_exacto(termino)
+                        with self.medir_cache():
+                            self.buscar_exacto(termino)
 
                 elif opcion == "1":
                     prefijo = input("\nIngresa el prefijo (sin *): ").strip()
                     if prefijo:
-                        self.buscar_prefijo(prefijo)
+                        with self.medir_cache():
+                            self.buscar_prefijo(prefijo)
 
                 elif opcion == "2":
                     sufijo = input("\nIngresa el sufijo (sin *): ").strip()
                     if sufijo:
-                        self.buscar_sufijo(sufijo)
+                        with self.medir_cache():
+                            self.buscar_sufijo(sufijo)
 
                 elif opcion == "3":
                     prompt = "\nIngresa el patrón "
                     prompt += "(* = cualquier secuencia, ? = un carácter): "
                     patron = input(prompt).strip()
                     if patron:
-                        self.buscar_comodin(patron)
+                        with self.medir_cache():
+                            self.buscar_comodin(patron)
 
                 elif opcion == "4":
                     prompt = "\nIngresa el patrón con * en medio "
                     prompt += "(ej: ca*do): "
                     patron = input(prompt).strip()
                     if patron:
-                        self.buscar_comodin_medio(patron)
+                        with self.medir_cache():
+                            self.buscar_comodin_medio(patron)
+
+                elif opcion == "7":
+                    prompt = "\nIngresa la consulta (AND, OR, NOT, paréntesis): "
+                    consulta = input(prompt).strip()
+                    if consulta:
+                        with self.medir_cache():
+                            self.buscar_booleana(consulta)
+
+                elif opcion == "8":
+                    prefijo = input("\nIngresa el prefijo a completar: ").strip()
+                    if prefijo:
+                        with self.medir_cache():
+                            self.autocompletar(prefijo)
+
+                elif opcion == "9":
+                    minimo = input("\nDesde el término: ").strip()
+                    maximo = input("Hasta el término: ").strip()
+                    if minimo and maximo:
+                        with self.medir_cache():
+                            self.buscar_rango(minimo, maximo)
+
+                elif opcion == "10":
+                    expresion = input("\nIngresa la expresión regular: ").strip()
+                    if expresion:
+                        with self.medir_cache():
+                            self.buscar_regex(expresion)
 
                 else:
                     print("\n❌ Opción no válida. Intenta de nuevo.\n")
@@ -212,9 +401,54 @@ class BuscadorCLI:
 
 def main():
     """Función principal."""
-    archivo_db = "index/indice.fs"
-
-    buscador = BuscadorCLI(archivo_db)
+    parser = argparse.ArgumentParser(description="Buscador interactivo del índice ordenado.")
+    parser.add_argument("--db", default="index/indice.fs", help="Archivo de base de datos ZODB")
+    parser.add_argument(
+        "--instantanea", metavar="RUTA", help="Consultar una instantánea de solo lectura"
+    )
+    parser.add_argument(
+        "--cache-objetos",
+        type=int,
+        default=CACHE_OBJETOS_POR_DEFECTO,
+        metavar="N",
+        help="Objetos en la caché de ZODB (nodos, buckets y postings)",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=CACHE_MB_POR_DEFECTO,
+        metavar="MB",
+        help="Tamaño estimado máximo de la caché de ZODB (0 = sin límite)",
+    )
+    parser.add_argument(
+        "--precalentar",
+        nargs="?",
+        const="",
+        metavar="ARCHIVO",
+        help="Precargar los niveles superiores de los árboles y los términos calientes "
+        "(del ARCHIVO, uno por línea, o los más frecuentes)",
+    )
+    parser.add_argument(
+        "--estadisticas-cache",
+        action="store_true",
+        help="Mostrar aciertos y cargas de la caché de ZODB en cada búsqueda "
+        "(recorre la caché entera: para dimensionarla, no para uso normal)",
+    )
+    args = parser.parse_args()
+
+    terminos_calientes = None
+    if args.precalentar:
+        terminos_calientes = Path(args.precalentar).read_text(encoding="utf-8").split()
+
+    buscador = BuscadorCLI(
+        args.db,
+        instantanea=args.instantanea,
+        cache_objetos=args.cache_objetos,
+        cache_mb=args.cache_mb,
+        precalentado=args.precalentar is not None,
+        terminos_calientes=terminos_calientes,
+        estadisticas_cache=args.estadisticas_cache,
+    )
 
     try:
         buscador.ejecutar()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Caché en memoria de resultados de búsqueda con desalojo LRU.
+
+Cada entrada se guarda junto con la generación del índice en la que se
+calculó: el índice incrementa su generación cada vez que cambia, y una
+consulta con otra generación vacía la caché antes de seguir. El tamaño se
+acota por peso (referencias término/documento guardadas), no por entradas,
+para que unos pocos prefijos muy amplios no ocupen memoria sin límite.
+
+Cada llamada recibe su propia copia del resultado guardado: quien lo
+modifica no altera los aciertos siguientes.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+from BTrees.IIBTree import IISet
+
+CAPACIDAD_POR_DEFECTO = 100_000  # Referencias término/documento en caché
+
+
+def peso_resultado(resultado: Any) -> int:
+    """Peso aproximado de un resultado: 1 + cantidad de referencias que guarda."""
+    if isinstance(resultado, dict):
+        return 1 + sum(1 + len(docs) for docs in resultado.values())
+    if isinstance(resultado, (list, tuple)):
+        return 1 + len(resultado)
+    return 1
+
+
+def copiar_resultado(resultado: Any) -> Any:
+    """
+    Copia los contenedores que arma una consulta (diccionario, listas y conjuntos).
+
+    Los postings persistentes del índice (resultados con `ids`) se devuelven
+    tal cual: son del índice, no de la caché.
+    """
+    if isinstance(resultado, dict):
+        return {clave: copiar_resultado(valor) for clave, valor in resultado.items()}
+    if isinstance(resultado, (list, set, IISet)):
+        return type(resultado)(resultado)
+    return resultado
+
+
+class CacheResultados:
+    """Caché LRU de resultados invalidada por generación del índice."""
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        """
+        Args:
+            capacidad: Peso máximo total de los resultados guardados (0 = no guardar)
+        """
+        self.capacidad = capacidad
+        self.entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()  # clave -> (resultado, peso)
+        self.peso = 0
+        self.generacion = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def limpiar(self):
+        """Descarta todas las entradas (los contadores se conservan)."""
+        self.entradas.clear()
+        self.peso = 0
+
+    def obtener(self, clave: Hashable, generacion: int, calcular: Callable[[], Any]) -> Any:
+        """
+        Devuelve el resultado guardado para `clave` o lo calcula y lo guarda.
+
+        El resultado guardado no se entrega: cada llamada recibe una copia.
+
+        Args:
+            clave: Tipo de consulta y patrón normalizado
+            generacion: Generación actual del índice
+            calcular: Función sin argumentos que calcula el resultado
+
+        Returns:
+            Resultado de la consulta
+        """
+        if generacion != self.generacion:
+            if self.entradas:
+                self.invalidaciones += 1
+            self.limpiar()
+            self.generacion = generacion
+
+        entrada = self.entradas.get(clave)
+        if entrada is not None:
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return copiar_resultado(entrada[0])
+
+        self.fallos += 1
+        resultado = calcular()
+        peso = peso_resultado(resultado)
+
+        if peso <= self.capacidad:
+            self.entradas[clave] = (resultado, peso)
+            self.peso += peso
+            while self.peso > self.capacidad:
+                _, (_, peso_desalojado) = self.entradas.popitem(last=False)
+                self.peso -= peso_desalojado
+                self.desalojos += 1
+            return copiar_resultado(resultado)
+
+        return resultado
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores de aciertos, fallos, desalojos e invalidaciones, y ocupación."""
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "invalidaciones": self.invalidaciones,
+            "entradas": len(self.entradas),
+            "peso": self.peso,
+            "capacidad": self.capacidad,
+        }
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Caché de objetos de ZODB: tamaño, precalentamiento y contadores por consulta.
+
+Cada conexión de ZODB guarda en memoria los objetos persistentes que cargó
+(los nodos y buckets de los árboles B+, los postings). Los que no están se
+cargan del storage la primera vez que se tocan; por eso las primeras
+consultas después de abrir el índice son lentas, y un barrido de prefijo
+grande puede desalojar los buckets que usan las demás consultas.
+
+- `abrir_db` abre la base con límites de objetos y de bytes para la caché.
+- `precalentar` carga los niveles superiores de `indice` e
+  `indice_invertido` y los buckets y postings de los términos calientes.
+- `ContadorCache` cuenta, por consulta, los objetos que ya estaban en la
+  caché (aciertos) y los que hubo que cargar del storage (cargas).
+
+ZODB solo recorta la caché al terminar una transacción; una conexión de
+solo lectura que no hace commits debe llamar a `aplicar_limites` entre
+consultas para que los límites tengan efecto.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+import ZODB
+import ZODB.FileStorage
+
+CACHE_OBJETOS_POR_DEFECTO = 400  # El valor por defecto de ZODB.DB
+CACHE_MB_POR_DEFECTO = 0  # Sin límite de bytes
+TERMINOS_CALIENTES = 200  # Términos a precalentar si no se indican
+
+
+def abrir_db(
+    archivo_db: str,
+    solo_lectura: bool = True,
+    cache_objetos: int = CACHE_OBJETOS_POR_DEFECTO,
+    cache_mb: float = CACHE_MB_POR_DEFECTO,
+) -> ZODB.DB:
+    """
+    Abre una base ZODB con los límites de caché dados.
+
+    Args:
+        archivo_db: Archivo de base de datos ZODB
+        solo_lectura: Abrir el storage en modo de solo lectura
+        cache_objetos: Objetos no fantasma por conexión
+        cache_mb: Tamaño estimado máximo de la caché por conexión (0 = sin límite)
+
+    Returns:
+        Base de datos abierta
+    """
+    if cache_objetos < 1 or cache_mb < 0:
+        raise ValueError("Los límites de la caché deben ser positivos")
+    storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=solo_lectura)
+    return ZODB.DB(
+        storage, cache_size=cache_objetos, cache_size_bytes=int(cache_mb * 1024 * 1024)
+    )
+
+
+def nodos_internos(arbol) -> Iterator:
+    """
+    Nodos internos de un árbol B+ por niveles, desde la raíz.
+
+    Cargarlos es cargar todo salvo los buckets: el estado de un nodo
+    interno es (hijo, clave, hijo, ..., hijo) y los hijos del último nivel
+    interno son buckets.
+    """
+    nivel = [arbol]
+    while nivel:
+        siguiente = []
+        for nodo in nivel:
+            yield nodo
+            estado = nodo.__getstate__()  # Carga el nodo si es un fantasma
+            if not estado or not isinstance(estado[0], tuple):
+                continue  # Árbol vacío o sin nodos internos (un solo bucket)
+            siguiente.extend(hijo for hijo in estado[0][::2] if isinstance(hijo, type(arbol)))
+        nivel = siguiente
+
+
+def terminos_frecuentes(indice, cantidad: int = TERMINOS_CALIENTES) -> List[str]:
+    """
+    Los términos en más documentos según el top-k de autocompletado.
+
+    Usa los completados de los prefijos de una letra, así que solo hay
+    términos si el índice tiene el top-k precalculado y vigente.
+    """
+    autocompletado = getattr(indice, "autocompletado", None)
+    if autocompletado is None or not indice.autocompletado_vigente:
+        return []
+    frecuencias: Dict[str, int] = {}
+    for prefijo, completados in autocompletado.items():
+        if len(prefijo) == 1:
+            frecuencias.update(completados)
+    return sorted(frecuencias, key=lambda termino: (-frecuencias[termino], termino))[:cantidad]
+
+
+def precalentar(indice, terminos: Iterable[str] = None) -> Dict[str, int]:
+    """
+    Carga en la caché los niveles superiores de los árboles y los términos calientes.
+
+    De `indice.indice` e `indice.indice_invertido` se cargan todos los
+    nodos internos (todas las búsquedas pasan por ellos); de cada término
+    caliente, el bucket que lo contiene en los dos árboles y sus postings.
+
+    Args:
+        indice: IndiceOrdenado abierto en una conexión
+        terminos: Términos calientes (por defecto, `terminos_frecuentes`)
+
+    Returns:
+        Diccionario con nodos internos, términos y objetos cargados
+    """
+    conexion = indice._p_jar
+    cargas = conexion.getTransferCounts()[0] if conexion is not None else 0
+    nodos = 0
+    for arbol in (indice.indice, indice.indice_invertido):
+        for _ in nodos_internos(arbol):
+            nodos += 1
+
+    if terminos is None:
+        terminos = terminos_frecuentes(indice)
+    calientes = 0
+    for termino in terminos:
+        postings = indice.indice.get(termino)
+        if postings is None:
+            continue
+        len(postings)  # Recorre y carga todos sus buckets
+        indice.indice_invertido.get(termino[::-1])
+        calientes += 1
+
+    if conexion is not None:
+        cargas = conexion.getTransferCounts()[0] - cargas
+    return {"nodos": nodos, "terminos": calientes, "cargas": cargas}
+
+
+def marcar_usado(objeto):
+    """
+    Pasa un objeto persistente al final de la lista LRU de su caché.
+
+    `_p_activate` no alcanza: a un objeto ya cargado no lo mueve. Un acceso
+    a un atributo común sí (`_p_getattr` es ese acceso, sin el atributo).
+    """
+    objeto._p_getattr("marcar_usado")
+
+
+def aplicar_limites(conexion, conservar: Iterable = ()):
+    """
+    Recorta la caché de la conexión a sus límites, desalojando lo menos usado.
+
+    Args:
+        conexion: Conexión de ZODB
+        conservar: Objetos persistentes a marcar como usados antes de
+            recortar (los objetos desalojados pierden sus atributos `_v_`)
+    """
+    for objeto in conservar:
+        marcar_usado(objeto)
+    conexion.cacheGC()
+
+
+class ContadorCache:
+    """
+    Aciertos y cargas de la caché de una conexión, por consulta y acumulados.
+
+    Cada objeto persistente que se toca pasa al final de la lista LRU de la
+    caché. Antes de la consulta se toca un centinela (la raíz de la base,
+    que las consultas no usan): los objetos que quedan después de él son
+    los que usó la consulta, y los que no son cargas son aciertos. Recorrer
+    la lista cuesta O(objetos en caché), así que es para dimensionar la
+    caché, no para cada consulta en producción.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.consultas = 0
+        self.aciertos = 0
+        self.cargas = 0
+
+    @contextmanager
+    def medir(self) -> Iterator[Dict[str, int]]:
+        """
+        Mide el bloque y llena el diccionario devuelto al terminar.
+
+        Uso:
+            with contador.medir() as consulta:
+                indice.buscar_prefijo("ca")
+            print(consulta["aciertos"], consulta["cargas"])
+        """
+        resultado: Dict[str, int] = {}
+        centinela = self.conexion.root()
+        marcar_usado(centinela)
+        cargas = self.conexion.getTransferCounts()[0]
+        yield resultado
+
+        oid = centinela._p_oid
+        usados = 0
+        for clave, _ in reversed(self.conexion._cache.lru_items()):
+            if clave == oid:
+                break
+            usados += 1
+        resultado["cargas"] = self.conexion.getTransferCounts()[0] - cargas
+        resultado["aciertos"] = max(0, usados - resultado["cargas"])
+        self.consultas += 1
+        self.aciertos += resultado["aciertos"]
+        self.cargas += resultado["cargas"]
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Totales de las consultas medidas y ocupación actual de la caché."""
+        cache = self.conexion._cache
+        return {
+            "consultas": self.consultas,
+            "aciertos": self.aciertos,
+            "cargas": self.cargas,
+            "objetos": cache.cache_non_ghost_count,
+            "bytes": cache.total_estimated_size,
+            "limite_objetos": cache.cache_size,
+            "limite_bytes": cache.cache_size_bytes,
+        }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Generador de carga para el servidor de consultas (ver servidor.py).
+
+Abre `concurrencia` conexiones keep-alive y cada una envía consultas sin
+pausa, tomando la siguiente de una lista compartida, hasta completar el
+total. Informa consultas por segundo, percentiles de latencia y respuestas
+por estado HTTP. Ejemplo:
+
+    python servidor.py --unix tmp/indice.sock &
+    python carga.py --unix tmp/indice.sock --concurrencia 16 --total 20000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from itertools import cycle
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from benchmark import percentil
+from tokenizador import TOKENIZADOR_POR_DEFECTO
+
+CONCURRENCIA_POR_DEFECTO = 8
+TOTAL_POR_DEFECTO = 5000
+
+
+def consultas_de_corpus(
+    directorio: str = "corpus", cantidad: int = 1000, semilla: int = 23
+) -> List[Tuple[str, str]]:
+    """
+    Consultas variadas armadas con los términos de un corpus.
+
+    Mezcla 40% exactas, 30% prefijos, 10% sufijos, 10% comodines y 10%
+    comodines en el medio.
+
+    Returns:
+        Lista de (tipo, consulta)
+    """
+    azar = random.Random(semilla)
+    terminos = set()
+    for archivo in sorted(Path(directorio).glob("*.txt")):
+        terminos |= TOKENIZADOR_POR_DEFECTO.terminos(archivo.read_text(encoding="utf-8"))
+    terminos = sorted(termino for termino in terminos if len(termino) >= 4) or ["hobbit"]
+
+    consultas = []
+    for _ in range(cantidad):
+        termino = azar.choice(terminos)
+        tipo = azar.choices(
+            ["exacto", "prefijo", "sufijo", "comodin", "comodin_medio"], [4, 3, 1, 1, 1]
+        )[0]
+        if tipo == "prefijo":
+            consulta = termino[:3]
+        elif tipo == "sufijo":
+            consulta = termino[-3:]
+        elif tipo == "comodin":
+            pos = azar.randrange(len(termino) - 1)
+            consulta = termino[:pos] + "?" + termino[pos + 1 : pos + 2] + "*"
+        elif tipo == "comodin_medio":
+            consulta = f"{termino[:2]}*{termino[-2:]}"
+        else:
+            consulta = termino
+        consultas.append((tipo, consulta))
+    return consultas
+
+
+async def conectar(
+    host: str = "127.0.0.1", puerto: int = 8080, unix: Optional[str] = None
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Abre una conexión TCP o, si se indica `unix`, por socket Unix."""
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, puerto)
+
+
+async def consultar(
+    lector: asyncio.StreamReader,
+    escritor: asyncio.StreamWriter,
+    tipo: str,
+    consulta: str,
+    limite: Optional[int] = None,
+) -> Tuple[int, Dict]:
+    """
+    Envía una búsqueda por una conexión keep-alive y lee la respuesta.
+
+    Returns:
+        (estado HTTP, datos JSON)
+    """
+    parametros = {"tipo": tipo, "q": consulta}
+    if limite is not None:
+        parametros["limite"] = limite
+    escritor.write(f"GET /buscar?{urlencode(parametros)} HTTP/1.1\r\nHost: indice\r\n\r\n".encode())
+    return await leer_respuesta(lector)
+
+
+async def leer_respuesta(lector: asyncio.StreamReader) -> Tuple[int, Dict]:
+    """Lee una respuesta HTTP con Content-Length y cuerpo JSON."""
+    estado = int((await lector.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        if nombre.strip().lower() == "content-length":
+            largo = int(valor)
+    cuerpo = await lector.readexactly(largo)
+    return estado, json.loads(cuerpo)
+
+
+async def generar_carga(
+    consultas: List[Tuple[str, str]],
+    concurrencia: int = CONCURRENCIA_POR_DEFECTO,
+    total: int = TOTAL_POR_DEFECTO,
+    host: str = "127.0.0.1",
+    puerto: int = 8080,
+    unix: Optional[str] = None,
+) -> Dict:
+    """
+    Envía `total` consultas repartidas en `concurrencia` conexiones.
+
+    Returns:
+        Diccionario con consultas, segundos, QPS, latencias en ms
+        (p50, p90, p99, p999, máxima) y respuestas por estado
+    """
+    pendientes = iter(range(total))
+    siguiente = cycle(consultas)
+    latencias: List[float] = []
+    estados: Counter = Counter()
+
+    async def cliente():
+        lector, escritor = await conectar(host, puerto, unix)
+        try:
+            for _ in pendientes:  # Iterador compartido: cada consulta la envía un solo cliente
+                tipo, consulta = next(siguiente)
+                inicio = time.perf_counter()
+                try:
+                    estado, _ = await consultar(lector, escritor, tipo, consulta)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    estados["error"] += 1
+                    escritor.close()
+                    lector, escritor = await conectar(host, puerto, unix)
+                    continue
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                estados[estado] += 1
+        finally:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "consultas": total,
+        "segundos": segundos,
+        "qps": total / segundos if segundos else 0.0,
+        "p50": percentil(latencias, 50),
+        "p90": percentil(latencias, 90),
+        "p99": percentil(latencias, 99),
+        "p999": percentil(latencias, 99.9),
+        "maxima": max(latencias, default=0.0),
+        "estados": dict(estados),
+    }
+
+
+def main():
+    """Función principal."""
+    parser = argparse.ArgumentParser(description="Generador de carga para servidor.py.")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección TCP del servidor")
+    parser.add_argument("--puerto", type=int, default=8080, help="Puerto TCP del servidor")
+    parser.add_argument("--unix", metavar="RUTA", help="Socket Unix del servidor")
+    parser.add_argument(
+        "--concurrencia", type=int, default=CONCURRENCIA_POR_DEFECTO, help="Conexiones simultáneas"
+    )
+    parser.add_argument("--total", type=int, default=TOTAL_POR_DEFECTO, help="Consultas a enviar")
+    parser.add_argument(
+        "--consultas",
+        metavar="ARCHIVO",
+        help="Archivo con una consulta por línea: 'tipo consulta' (por defecto, del corpus)",
+    )
+    args = parser.parse_args()
+
+    if args.consultas:
+        lineas = Path(args.consultas).read_text(encoding="utf-8").splitlines()
+        consultas = [tuple(linea.split(maxsplit=1)) for linea in lineas if linea.strip()]
+    else:
+        consultas = consultas_de_corpus()
+
+    resumen = asyncio.run(
+        generar_carga(consultas, args.concurrencia, args.total, args.host, args.puerto, args.unix)
+    )
+    print(
+        f"\n📊 {resumen['consultas']:,} consultas con {args.concurrencia} conexiones "
+        f"en {resumen['segundos']:.2f} s: {resumen['qps']:,.0f} consultas/s"
+    )
+    print(
+        f"   • Latencia: p50 {resumen['p50']:.2f} ms, p90 {resumen['p90']:.2f} ms, "
+        f"p99 {resumen['p99']:.2f} ms, p99.9 {resumen['p999']:.2f} ms, "
+        f"máxima {resumen['maxima']:.2f} ms"
+    )
+    print(f"   • Respuestas: {resumen['estados']}")
+
+
+if __name__ == "__main__":
+    main()
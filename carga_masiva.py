@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Construcción masiva de los árboles B+ a partir de runs ordenados.
+
+En lugar de insertar término por término en orden aleatorio, se acumulan
+los postings en bloques de tamaño acotado, cada bloque se vuelca ordenado
+a un archivo temporal (run) y al final se hace un merge de k vías que
+llena los árboles en orden de clave. Es el mismo esquema que BSBI, pero
+el resultado final son los OOBTree del índice.
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Tuple
+import transaction
+from BTrees.IIBTree import IITreeSet
+
+
+def _leer_run(ruta: str) -> Iterator[Tuple[str, List[int]]]:
+    """Lee un run del disco: una línea 'clave<TAB>id id id' por término."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            clave, ids = linea.rstrip("\n").split("\t")
+            yield clave, [int(doc_id) for doc_id in ids.split(" ")]
+
+
+def fusionar_runs(rutas: List[str]) -> Iterator[Tuple[str, List[int]]]:
+    """
+    Merge de k vías de runs ordenados.
+
+    heapq.merge es estable, así que para una misma clave los doc_ids de los
+    runs anteriores (documentos anteriores) salen primero y la lista
+    resultante queda ordenada.
+
+    Args:
+        rutas: Archivos de runs, en el orden en que se generaron
+
+    Returns:
+        Iterador de (clave, doc_ids) en orden de clave
+    """
+    lectores = [_leer_run(ruta) for ruta in rutas]
+    clave_actual = None
+    doc_ids: List[int] = []
+
+    for clave, ids in heapq.merge(*lectores, key=lambda par: par[0]):
+        if clave != clave_actual:
+            if clave_actual is not None:
+                yield clave_actual, doc_ids
+            clave_actual = clave
+            doc_ids = []
+        doc_ids.extend(ids)
+
+    if clave_actual is not None:
+        yield clave_actual, doc_ids
+
+
+class ConstructorMasivo:
+    """
+    Acumula postings en bloques acotados y los vuelca a runs ordenados.
+
+    Se generan dos runs por bloque: uno ordenado por término (para `indice`)
+    y otro por término invertido (para `indice_invertido`).
+    """
+
+    def __init__(self, directorio_tmp: str = "tmp", max_postings_bloque: int = 1_000_000):
+        """
+        Args:
+            directorio_tmp: Directorio donde se crean los runs temporales
+            max_postings_bloque: Postings en memoria antes de volcar un run
+        """
+        os.makedirs(directorio_tmp, exist_ok=True)
+        self.directorio = tempfile.mkdtemp(prefix="runs_", dir=directorio_tmp)
+        self.max_postings_bloque = max_postings_bloque
+        self.bloque: Dict[str, List[int]] = {}
+        self.postings_bloque = 0
+        self.runs: List[str] = []
+        self.runs_invertidos: List[str] = []
+
+    def agregar(self, doc_id: int, terminos: Iterable[str]):
+        """
+        Agrega los términos de un documento al bloque actual.
+
+        Los documentos deben agregarse en orden creciente de doc_id.
+        """
+        for termino in terminos:
+            postings = self.bloque.get(termino)
+            if postings is None:
+                postings = self.bloque[termino] = []
+            postings.append(doc_id)
+            self.postings_bloque += 1
+
+        if self.postings_bloque >= self.max_postings_bloque:
+            self.volcar_bloque()
+
+    def _escribir_run(self, items: Iterable[Tuple[str, List[int]]], ruta: str):
+        with open(ruta, "w", encoding="utf-8") as f:
+            for clave, doc_ids in items:
+                f.write(f"{clave}\t{' '.join(map(str, doc_ids))}\n")
+
+    def volcar_bloque(self):
+        """
+        Escribe el bloque actual como un par de runs ordenados.
+
+        También toma un savepoint: los documentos registrados mientras se
+        llenaba el bloque (nombres y términos por documento) pasan al archivo
+        temporal de la transacción en vez de seguir en memoria hasta el commit.
+        """
+        if not self.bloque:
+            return
+
+        numero = len(self.runs)
+        ruta = os.path.join(self.directorio, f"run_{numero:05d}.txt")
+        ruta_invertida = os.path.join(self.directorio, f"run_inv_{numero:05d}.txt")
+
+        self._escribir_run(sorted(self.bloque.items()), ruta)
+        self._escribir_run(
+            sorted((termino[::-1], doc_ids) for termino, doc_ids in self.bloque.items()),
+            ruta_invertida,
+        )
+
+        self.runs.append(ruta)
+        self.runs_invertidos.append(ruta_invertida)
+        self.bloque = {}
+        self.postings_bloque = 0
+        transaction.savepoint(True)
+
+    def _llenar_arbol(self, arbol, items: Iterable[Tuple[str, List[int]]], tamano_lote: int) -> int:
+        """Inserta los pares en orden de clave, con un savepoint por lote."""
+        lote = []
+        total = 0
+
+        for clave, doc_ids in items:
+            lote.append((clave, IITreeSet(doc_ids)))
+            if len(lote) >= tamano_lote:
+                arbol.update(lote)
+                total += len(lote)
+                lote = []
+                # Permite que ZODB saque de memoria los objetos ya escritos
+                transaction.savepoint(True)
+
+        if lote:
+            arbol.update(lote)
+            total += len(lote)
+
+        return total
+
+    def cargar(self, indice, tamano_lote: int = 10000) -> Dict:
+        """
+        Fusiona los runs y llena los árboles (vacíos) del índice en orden.
+
+        Args:
+            indice: IndiceOrdenado con `indice` e `indice_invertido` vacíos
+            tamano_lote: Claves insertadas entre savepoints
+
+        Returns:
+            Diccionario con la cantidad de runs y de claves cargadas
+        """
+        self.volcar_bloque()
+
+        terminos = self._llenar_arbol(indice.indice, fusionar_runs(self.runs), tamano_lote)
+        self._llenar_arbol(
+            indice.indice_invertido, fusionar_runs(self.runs_invertidos), tamano_lote
+        )
+
+        return {"runs": len(self.runs), "terminos": terminos}
+
+    def limpiar(self):
+        """Elimina los runs temporales."""
+        shutil.rmtree(self.directorio, ignore_errors=True)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Utilidades para búsquedas con comodines (* y ?).
+
+Incluye la conversión de patrones a regex y dos índices auxiliares:
+
+- permuterm: cada término `t` se guarda con todas las rotaciones de `t$`,
+  de modo que un patrón se reduce a una búsqueda por prefijo en el árbol
+  de rotaciones seguida de un filtro barato con la regex.
+- k-gramas: cada k-grama de `$t$` apunta a los ids de los términos que lo
+  contienen; un patrón se reduce a la intersección de los k-gramas de sus
+  partes literales y la regex se aplica solo a esos candidatos.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+FIN = "$"  # Marca de fin de término en las rotaciones
+MAXIMO_CARACTER = "\U0010ffff"  # Cota superior para rangos por prefijo
+_SEPARADOR_COMODINES = re.compile(r"[*?]+")
+
+
+def patron_a_regex(patron_norm: str) -> Optional[Pattern]:
+    """
+    Convierte un patrón normalizado con * y ? en una regex anclada.
+
+    Returns:
+        Regex compilada o None si el patrón no es válido
+    """
+    regex_pattern = patron_norm.replace("*", ".*").replace("?", ".")
+    try:
+        return re.compile(f"^{regex_pattern}$")
+    except re.error:
+        return None
+
+
+def segmentos_literales(patron_norm: str) -> List[str]:
+    """Partes del patrón sin comodines, en orden (pueden ser vacías)."""
+    return _SEPARADOR_COMODINES.split(patron_norm)
+
+
+def prefijo_sufijo_literal(patron_norm: str) -> Tuple[str, str]:
+    """
+    Parte literal antes del primer comodín y después del último.
+
+    Para un patrón sin comodines ambas son el patrón completo.
+    """
+    segmentos = segmentos_literales(patron_norm)
+    return segmentos[0], segmentos[-1]
+
+
+def limite_prefijo(prefijo: str) -> str:
+    """Clave máxima del rango de todas las claves que empiezan con `prefijo`."""
+    return prefijo + MAXIMO_CARACTER
+
+
+class PlanComodin(NamedTuple):
+    """Estrategia elegida para resolver un patrón con comodines."""
+
+    estrategia: str  # exacto, prefijo, sufijo, kgramas, permuterm o recorrido
+    clave: str  # Clave o prefijo que se recorre en el árbol elegido
+    estimacion: int  # Claves (o candidatos) que se estima recorrer
+    prefijo: str  # Parte literal antes del primer comodín
+    sufijo: str  # Parte literal después del último comodín
+
+    def __str__(self) -> str:
+        return f"{self.estrategia} '{self.clave}' (~{self.estimacion} claves)"
+
+
+def rotaciones(termino: str) -> Iterator[str]:
+    """Genera las rotaciones de `termino$` (len(termino) + 1 claves)."""
+    marcado = termino + FIN
+    for i in range(len(marcado)):
+        yield marcado[i:] + marcado[:i]
+
+
+def clave_permuterm(patron_norm: str) -> str:
+    """
+    Elige el prefijo a buscar en el árbol permuterm para un patrón.
+
+    Para X*...*Z la rotación `Z$X` es prefijo de alguna rotación de todo
+    término que empiece con X y termine con Z. Si algún segmento interno
+    es más largo, también sirve (todo término que lo contiene tiene una
+    rotación que empieza con él) y es más selectivo.
+
+    Args:
+        patron_norm: Patrón normalizado con al menos un comodín
+
+    Returns:
+        Prefijo a recorrer en el árbol de rotaciones
+    """
+    segmentos = segmentos_literales(patron_norm)
+    clave = segmentos[-1] + FIN + segmentos[0]
+
+    for segmento in segmentos[1:-1]:
+        if len(segmento) >= len(clave):
+            clave = segmento
+
+    return clave
+
+
+def kgramas_de_termino(termino: str, k: int) -> Set[str]:
+    """
+    k-gramas de un término con marcas de borde: `$termino$`.
+
+    Un término más corto que k - 2 genera igualmente al menos un k-grama
+    (el término completo con sus marcas).
+    """
+    marcado = FIN + termino + FIN
+    if len(marcado) <= k:
+        return {marcado}
+    return {marcado[i : i + k] for i in range(len(marcado) - k + 1)}
+
+
+def kgramas_de_patron(patron_norm: str, k: int) -> Set[str]:
+    """
+    k-gramas que debe contener todo término que coincida con el patrón.
+
+    Solo se usan los segmentos literales (con las marcas de borde que
+    correspondan) de largo >= k; si ninguno alcanza, el conjunto es vacío
+    y el patrón no puede resolverse con el índice de k-gramas.
+    """
+    kgramas: Set[str] = set()
+
+    for segmento in segmentos_literales(FIN + patron_norm + FIN):
+        if len(segmento) < k:
+            continue
+        kgramas.update(segmento[i : i + k] for i in range(len(segmento) - k + 1))
+
+    return kgramas
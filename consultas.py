@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Consultas booleanas sobre el índice ordenado.
+
+Sintaxis (los operadores van en mayúsculas):
+
+    hobbit AND (anillo OR dragon*) AND NOT *ción
+    hobbit comarca          (AND implícito entre operandos)
+
+Cada operando puede ser un término exacto, un prefijo (`drag*`), un sufijo
+(`*ción`) o un patrón con comodines (`h?bb*t`). La evaluación trabaja
+sobre postings de doc_ids ordenados: los operandos de un AND se
+intersectan de menor a mayor, con búsqueda galopante cuando uno es mucho
+más chico que el otro, y los nombres de documentos se resuelven solo
+para el resultado final.
+"""
+
+import re
+from bisect import bisect_left
+from typing import List, Union
+from BTrees.IIBTree import IISet, difference, intersection, multiunion
+
+OPERADORES = {"AND", "OR", "NOT"}
+# A partir de esta diferencia de tamaños conviene galopar en lugar de mezclar
+RELACION_GALOPE = 8
+
+_TOKENS = re.compile(r"\(|\)|[^\s()]+")
+
+
+class Operando:
+    """Hoja de la consulta: término o patrón."""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+
+    def __repr__(self):
+        return f"Operando({self.texto!r})"
+
+
+class Operacion:
+    """Nodo AND/OR con dos o más hijos, o NOT con uno."""
+
+    def __init__(self, operador: str, hijos: List):
+        self.operador = operador
+        self.hijos = hijos
+
+    def __repr__(self):
+        return f"{self.operador}({', '.join(map(repr, self.hijos))})"
+
+
+Nodo = Union[Operando, Operacion]
+
+
+class _Parser:
+    """Parser descendente recursivo de la gramática de consultas."""
+
+    def __init__(self, consulta: str):
+        self.tokens = _TOKENS.findall(consulta)
+        self.pos = 0
+
+    def _actual(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _consumir(self) -> str:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parsear(self) -> Nodo:
+        if not self.tokens:
+            raise ValueError("La consulta está vacía")
+        nodo = self._or()
+        if self._actual() is not None:
+            raise ValueError(f"Token inesperado: '{self._actual()}'")
+        return nodo
+
+    def _or(self) -> Nodo:
+        hijos = [self._and()]
+        while self._actual() == "OR":
+            self._consumir()
+            hijos.append(self._and())
+        return hijos[0] if len(hijos) == 1 else Operacion("OR", hijos)
+
+    def _and(self) -> Nodo:
+        hijos = [self._not()]
+        while self._actual() not in (None, "OR", ")"):
+            if self._actual() == "AND":
+                self._consumir()
+            hijos.append(self._not())
+        return hijos[0] if len(hijos) == 1 else Operacion("AND", hijos)
+
+    def _not(self) -> Nodo:
+        if self._actual() == "NOT":
+            self._consumir()
+            return Operacion("NOT", [self._not()])
+        return self._primario()
+
+    def _primario(self) -> Nodo:
+        token = self._actual()
+        if token is None:
+            raise ValueError("Falta un operando al final de la consulta")
+        if token == "(":
+            self._consumir()
+            nodo = self._or()
+            if self._actual() != ")":
+                raise ValueError("Falta cerrar un paréntesis")
+            self._consumir()
+            return nodo
+        if token == ")" or token in OPERADORES:
+            raise ValueError(f"Se esperaba un operando y se encontró '{token}'")
+        return Operando(self._consumir())
+
+
+def parsear_consulta(consulta: str) -> Nodo:
+    """
+    Convierte el texto de una consulta booleana en un árbol de nodos.
+
+    Raises:
+        ValueError: Si la consulta tiene errores de sintaxis
+    """
+    return _Parser(consulta).parsear()
+
+
+def interseccion_galopante(chica, grande) -> IISet:
+    """
+    Intersecta postings ordenados cuando `chica` es mucho menor que `grande`.
+
+    Si `grande` admite acceso por posición (IISet), avanza con búsqueda
+    exponencial desde la última posición encontrada; si no (IITreeSet),
+    consulta la pertenencia en el árbol, que también es O(log n).
+    """
+    if not hasattr(grande, "__getitem__"):
+        return IISet([doc_id for doc_id in chica if doc_id in grande])
+
+    resultado = []
+    pos = 0
+    total = len(grande)
+
+    for doc_id in chica:
+        # Galopar: duplicar el salto hasta pasar doc_id y luego bisecar
+        salto = 1
+        while pos + salto < total and grande[pos + salto] < doc_id:
+            salto *= 2
+        pos = bisect_left(grande, doc_id, pos + salto // 2, min(pos + salto + 1, total))
+        if pos == total:
+            break
+        if grande[pos] == doc_id:
+            resultado.append(doc_id)
+
+    return IISet(resultado)
+
+
+def intersectar(a, b) -> IISet:
+    """Intersección de dos postings eligiendo entre mezcla en C y galope."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) * RELACION_GALOPE < len(b):
+        return interseccion_galopante(a, b)
+    return intersection(a, b)
+
+
+class EvaluadorBooleano:
+    """Evalúa árboles de consulta contra un IndiceOrdenado."""
+
+    def __init__(self, indice):
+        self.indice = indice
+
+    def _universo(self) -> IISet:
+        return IISet(self.indice.documentos.keys())
+
+    def evaluar(self, nodo: Nodo):
+        """
+        Evalúa un nodo y devuelve sus doc_ids ordenados.
+
+        Returns:
+            IISet o IITreeSet con los doc_ids que cumplen el nodo
+        """
+        if isinstance(nodo, Operando):
+            return self.indice.postings_patron(nodo.texto)
+
+        if nodo.operador == "OR":
+            return multiunion([self.evaluar(hijo) for hijo in nodo.hijos])
+
+        if nodo.operador == "NOT":
+            return difference(self._universo(), self.evaluar(nodo.hijos[0]))
+
+        return self._evaluar_and(nodo.hijos)
+
+    def _evaluar_and(self, hijos: List[Nodo]):
+        positivos = [hijo for hijo in hijos if not _es_not(hijo)]
+        negativos = [hijo.hijos[0] for hijo in hijos if _es_not(hijo)]
+
+        if positivos:
+            # De menor a mayor: cada intersección achica el resultado cuanto antes
+            postings = sorted((self.evaluar(hijo) for hijo in positivos), key=len)
+            resultado = postings[0]
+            for siguiente in postings[1:]:
+                if not resultado:
+                    break
+                resultado = intersectar(resultado, siguiente)
+        else:
+            resultado = self._universo()
+
+        for negativo in negativos:
+            if not resultado:
+                break
+            resultado = difference(resultado, self.evaluar(negativo))
+
+        return resultado
+
+
+def _es_not(nodo: Nodo) -> bool:
+    return isinstance(nodo, Operacion) and nodo.operador == "NOT"
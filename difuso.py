@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Búsqueda difusa con un autómata de Levenshtein sobre el vocabulario ordenado.
+
+El autómata se simula con la fila de la matriz de distancias de edición:
+el estado tras leer un prefijo `p` es la fila con la distancia de `p` a
+cada prefijo del término buscado. Un estado está muerto cuando todos sus
+valores superan el máximo de ediciones: ningún término que empiece con
+`p` puede coincidir.
+
+El recorrido del árbol aprovecha eso (ver automatas.py): al encontrar una
+clave con un prefijo muerto calcula el menor prefijo vivo posterior y salta
+hasta él con `minKey`, en lugar de calcular la distancia contra cada término.
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+from automatas import recorrer_automata
+
+Estado = Tuple[int, ...]
+
+
+class AutomataLevenshtein:
+    """Acepta las cadenas a `max_ediciones` o menos de `termino`."""
+
+    def __init__(self, termino: str, max_ediciones: int):
+        if max_ediciones < 0:
+            raise ValueError("La cantidad de ediciones no puede ser negativa")
+        self.termino = termino
+        self.max_ediciones = max_ediciones
+        self.caracteres = sorted(set(termino))
+        self._en_termino = frozenset(termino)
+        # Transiciones ya calculadas: el autómata determinista se arma a demanda
+        self._transiciones = {}
+
+    def inicial(self) -> Estado:
+        """Estado antes de leer caracteres."""
+        return tuple(min(i, self.max_ediciones + 1) for i in range(len(self.termino) + 1))
+
+    def avanzar(self, estado: Estado, caracter: str) -> Estado:
+        """Estado tras leer `caracter` (los valores se acotan en max_ediciones + 1)."""
+        # Todos los caracteres ausentes del término llevan al mismo estado
+        if caracter not in self._en_termino:
+            caracter = "\0"
+        clave = (estado, caracter)
+        siguiente = self._transiciones.get(clave)
+        if siguiente is None:
+            siguiente = self._transiciones[clave] = self._calcular(estado, caracter)
+        return siguiente
+
+    def _calcular(self, estado: Estado, caracter: str) -> Estado:
+        tope = self.max_ediciones + 1
+        fila = [min(estado[0] + 1, tope)]
+        for i, esperado in enumerate(self.termino):
+            costo = estado[i] + (esperado != caracter)
+            fila.append(min(fila[i] + 1, costo, estado[i + 1] + 1, tope))
+        return tuple(fila)
+
+    def acepta(self, estado: Estado) -> bool:
+        """Si la cadena leída está a `max_ediciones` o menos."""
+        return estado[-1] <= self.max_ediciones
+
+    def vivo(self, estado: Estado) -> bool:
+        """Si alguna continuación de la cadena leída puede ser aceptada."""
+        return min(estado) <= self.max_ediciones
+
+    def distancia(self, estado: Estado) -> int:
+        """Distancia de edición de la cadena leída (si es aceptada)."""
+        return estado[-1]
+
+    def siguiente_caracter(self, estado: Estado, despues_de: str) -> Optional[str]:
+        """Menor carácter mayor que `despues_de` que deja el estado vivo."""
+        # Un carácter que no está en el término es el peor caso: si mantiene
+        # vivo el estado, cualquier carácter lo hace
+        if self.vivo(self.avanzar(estado, "\0")):
+            return chr(ord(despues_de) + 1)
+        for caracter in self.caracteres:
+            if caracter > despues_de and self.vivo(self.avanzar(estado, caracter)):
+                return caracter
+        return None
+
+
+def recorrer_difuso(
+    arbol, automata: AutomataLevenshtein, estadisticas: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[str, int]]:
+    """
+    Genera las claves de `arbol` aceptadas por el autómata, en orden, con su distancia.
+
+    Args:
+        arbol: Árbol B+ con claves str (ej: el índice de términos)
+        automata: Autómata de Levenshtein del término buscado
+        estadisticas: Diccionario opcional para contar claves visitadas y saltos
+
+    Returns:
+        Iterador de pares (clave, distancia)
+    """
+    for clave, estado in recorrer_automata(arbol, automata, estadisticas):
+        yield clave, automata.distancia(estado)
+
+
+def distancia_levenshtein(a: str, b: str) -> int:
+    """Distancia de edición clásica (inserción, borrado, sustitución)."""
+    fila = list(range(len(b) + 1))
+    for i, caracter_a in enumerate(a, 1):
+        anterior, fila[0] = fila[0], i
+        for j, caracter_b in enumerate(b, 1):
+            anterior, fila[j] = fila[j], min(
+                fila[j] + 1, fila[j - 1] + 1, anterior + (caracter_a != caracter_b)
+            )
+    return fila[-1]
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de términos por expresión regular con un autómata determinista.
+
+La expresión se analiza a un árbol sintáctico, se compila a un autómata no
+determinista (construcción de Thompson) y se determiniza a demanda: cada
+estado determinista es el conjunto de estados no deterministas alcanzables,
+y sus transiciones se calculan la primera vez que se usan. Los estados desde
+los que no se llega a la aceptación se descartan al compilar, así que un
+conjunto vacío es el único estado muerto.
+
+La coincidencia es sobre el término completo (como `re.fullmatch`). Se
+admiten literales, `.`, clases `[a-z]` y `[^...]`, escapes `\\d \\w \\s` (y
+sus negaciones), alternación `|`, grupos `(...)` y `(?:...)`, y los
+cuantificadores `* + ?`, `{m}`, `{m,}` y `{m,n}`. `^` y `$` solo se aceptan
+en los extremos, donde no cambian nada.
+
+`\\w` se aproxima por exceso (todo carácter no ASCII cuenta como letra):
+el autómata solo poda, y cada término aceptado se confirma con `re`. Por
+la misma razón, cuando el estado incluye un bucle `.*` (toda continuación
+sigue viva) el recorrido deja de avanzar el autómata y confirma
+directamente con `re` las claves de ese prefijo.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+MAXIMO_CODIGO = 0x10FFFF
+MAXIMO_REPETICIONES = 100  # Cota de {m,n}: cada repetición copia el subautómata
+
+Rangos = Tuple[Tuple[int, int], ...]  # Intervalos cerrados de códigos, ordenados
+
+_DIGITOS: Rangos = ((ord("0"), ord("9")),)
+_PALABRA: Rangos = (
+    (ord("0"), ord("9")),
+    (ord("A"), ord("Z")),
+    (ord("_"), ord("_")),
+    (ord("a"), ord("z")),
+    (0x80, MAXIMO_CODIGO),
+)
+_ESPACIOS: Rangos = ((9, 13), (32, 32))
+_CUALQUIERA: Rangos = ((0, MAXIMO_CODIGO),)
+
+
+def _normalizar_rangos(rangos) -> Rangos:
+    """Ordena y une intervalos solapados o contiguos."""
+    unidos: List[List[int]] = []
+    for inicio, fin in sorted(rangos):
+        if unidos and inicio <= unidos[-1][1] + 1:
+            unidos[-1][1] = max(unidos[-1][1], fin)
+        else:
+            unidos.append([inicio, fin])
+    return tuple((inicio, fin) for inicio, fin in unidos)
+
+
+def _complemento(rangos: Rangos) -> Rangos:
+    """Intervalos de los códigos que no están en `rangos`."""
+    resultado = []
+    siguiente = 0
+    for inicio, fin in rangos:
+        if inicio > siguiente:
+            resultado.append((siguiente, inicio - 1))
+        siguiente = fin + 1
+    if siguiente <= MAXIMO_CODIGO:
+        resultado.append((siguiente, MAXIMO_CODIGO))
+    return tuple(resultado)
+
+
+# Nodos del árbol sintáctico:
+#   ("clase", rangos) | ("concatenar", [nodos]) | ("alternar", [nodos])
+#   ("repetir", nodo, minimo, maximo o None)
+Nodo = tuple
+
+
+class _Parser:
+    """Analizador descendente recursivo de la sintaxis admitida."""
+
+    def __init__(self, patron: str):
+        self.patron = patron
+        self.posicion = 0
+
+    def _error(self, mensaje: str):
+        raise ValueError(f"{mensaje} en la posición {self.posicion} de {self.patron!r}")
+
+    def _ver(self) -> Optional[str]:
+        if self.posicion < len(self.patron):
+            return self.patron[self.posicion]
+        return None
+
+    def _tomar(self) -> str:
+        caracter = self.patron[self.posicion]
+        self.posicion += 1
+        return caracter
+
+    def analizar(self) -> Nodo:
+        if self._ver() == "^":
+            self.posicion += 1
+        nodo = self._alternativa()
+        if self._ver() == "$":
+            self.posicion += 1
+        if self.posicion != len(self.patron):
+            self._error(f"Carácter inesperado {self._ver()!r}")
+        return nodo
+
+    def _alternativa(self) -> Nodo:
+        opciones = [self._concatenacion()]
+        while self._ver() == "|":
+            self.posicion += 1
+            opciones.append(self._concatenacion())
+        return opciones[0] if len(opciones) == 1 else ("alternar", opciones)
+
+    def _concatenacion(self) -> Nodo:
+        partes = []
+        while True:
+            caracter = self._ver()
+            if caracter is None or caracter in "|)":
+                break
+            if caracter == "$" and self.posicion == len(self.patron) - 1:
+                break
+            partes.append(self._repeticion())
+        return partes[0] if len(partes) == 1 else ("concatenar", partes)
+
+    def _repeticion(self) -> Nodo:
+        nodo = self._atomo()
+        while True:
+            caracter = self._ver()
+            if caracter == "*":
+                minimo, maximo = 0, None
+            elif caracter == "+":
+                minimo, maximo = 1, None
+            elif caracter == "?":
+                minimo, maximo = 0, 1
+            elif caracter == "{" and self._es_cota():
+                minimo, maximo = self._cota()
+                nodo = ("repetir", nodo, minimo, maximo)
+                continue
+            else:
+                return nodo
+            self.posicion += 1
+            if self._ver() in ("?", "+"):
+                self._error("Cuantificador no admitido")
+            nodo = ("repetir", nodo, minimo, maximo)
+
+    def _es_cota(self) -> bool:
+        return re.match(r"\{\d+(,\d*)?\}", self.patron[self.posicion :]) is not None
+
+    def _cota(self) -> Tuple[int, Optional[int]]:
+        cota = re.match(r"\{(\d+)(,(\d*))?\}", self.patron[self.posicion :])
+        self.posicion += cota.end()
+        minimo = int(cota.group(1))
+        if cota.group(2) is None:
+            maximo = minimo
+        elif cota.group(3):
+            maximo = int(cota.group(3))
+        else:
+            maximo = None
+        if maximo is not None and maximo < minimo:
+            self._error("Cota de repetición invertida")
+        if max(minimo, maximo or 0) > MAXIMO_REPETICIONES:
+            self._error(f"Cota de repetición mayor que {MAXIMO_REPETICIONES}")
+        return minimo, maximo
+
+    def _atomo(self) -> Nodo:
+        caracter = self._tomar()
+        if caracter == "(":
+            if self.patron.startswith("?:", self.posicion):
+                self.posicion += 2
+            elif self._ver() == "?":
+                self._error("Grupo especial no admitido")
+            nodo = self._alternativa()
+            if self._ver() != ")":
+                self._error("Falta ')'")
+            self.posicion += 1
+            return nodo
+        if caracter == "[":
+            return ("clase", self._clase())
+        if caracter == ".":
+            return ("clase", _CUALQUIERA)
+        if caracter == "\\":
+            return ("clase", self._escape())
+        if caracter in "*+?{":
+            self._error(f"Cuantificador {caracter!r} sin operando")
+        if caracter in "^$":
+            self._error(f"Ancla {caracter!r} fuera de los extremos")
+        return ("clase", ((ord(caracter), ord(caracter)),))
+
+    def _escape(self) -> Rangos:
+        if self._ver() is None:
+            self._error("Escape incompleto")
+        caracter = self._tomar()
+        clases = {"d": _DIGITOS, "w": _PALABRA, "s": _ESPACIOS}
+        if caracter in clases:
+            return clases[caracter]
+        if caracter.lower() in clases:
+            return _complemento(clases[caracter.lower()])
+        if caracter.isalnum():
+            self._error(f"Escape \\{caracter} no admitido")
+        return ((ord(caracter), ord(caracter)),)
+
+    def _clase(self) -> Rangos:
+        negada = self._ver() == "^"
+        if negada:
+            self.posicion += 1
+        rangos: list = []
+        primero = True
+        while True:
+            if self._ver() is None:
+                self._error("Falta ']'")
+            if self._ver() == "]" and not primero:
+                self.posicion += 1
+                break
+            primero = False
+            inicio = self._elemento_clase()
+            if (
+                isinstance(inicio, int)
+                and self._ver() == "-"
+                and self.posicion + 1 < len(self.patron)
+                and self.patron[self.posicion + 1] != "]"
+            ):
+                self.posicion += 1
+                fin = self._elemento_clase()
+                if not isinstance(fin, int) or fin < inicio:
+                    self._error("Rango de clase inválido")
+                rangos.append((inicio, fin))
+            elif isinstance(inicio, int):
+                rangos.append((inicio, inicio))
+            else:
+                rangos.extend(inicio)
+        rangos = _normalizar_rangos(rangos)
+        return _complemento(rangos) if negada else rangos
+
+    def _elemento_clase(self):
+        """Código de un carácter de la clase, o los rangos de un escape como \\d."""
+        caracter = self._tomar()
+        if caracter != "\\":
+            return ord(caracter)
+        rangos = self._escape()
+        if len(rangos) == 1 and rangos[0][0] == rangos[0][1]:
+            return rangos[0][0]
+        return rangos
+
+
+def parsear_regex(patron: str) -> Nodo:
+    """
+    Analiza una expresión regular de la sintaxis admitida.
+
+    Raises:
+        ValueError: Si la expresión es inválida o usa sintaxis no admitida
+    """
+    return _Parser(patron).analizar()
+
+
+class _Thompson:
+    """Autómata no determinista con transiciones vacías y por rangos."""
+
+    def __init__(self):
+        self.vacias: List[List[int]] = []
+        self.transiciones: List[List[Tuple[Rangos, int]]] = []
+
+    def nuevo(self) -> int:
+        self.vacias.append([])
+        self.transiciones.append([])
+        return len(self.vacias) - 1
+
+    def compilar(self, nodo: Nodo) -> Tuple[int, int]:
+        """Agrega el fragmento de `nodo` y devuelve sus estados (entrada, salida)."""
+        tipo = nodo[0]
+        if tipo == "clase":
+            entrada, salida = self.nuevo(), self.nuevo()
+            if nodo[1]:
+                self.transiciones[entrada].append((nodo[1], salida))
+            return entrada, salida
+        if tipo == "concatenar":
+            entrada = salida = self.nuevo()
+            for parte in nodo[1]:
+                inicio, fin = self.compilar(parte)
+                self.vacias[salida].append(inicio)
+                salida = fin
+            return entrada, salida
+        if tipo == "alternar":
+            entrada, salida = self.nuevo(), self.nuevo()
+            for opcion in nodo[1]:
+                inicio, fin = self.compilar(opcion)
+                self.vacias[entrada].append(inicio)
+                self.vacias[fin].append(salida)
+            return entrada, salida
+        _, interno, minimo, maximo = nodo
+        entrada = salida = self.nuevo()
+        for _ in range(minimo):
+            inicio, fin = self.compilar(interno)
+            self.vacias[salida].append(inicio)
+            salida = fin
+        if maximo is None:
+            # Clausura de Kleene sobre una copia más
+            inicio, fin = self.compilar(interno)
+            self.vacias[salida].append(inicio)
+            self.vacias[fin].append(inicio)
+            final = self.nuevo()
+            self.vacias[salida].append(final)
+            self.vacias[fin].append(final)
+            return entrada, final
+        final = self.nuevo()
+        for _ in range(maximo - minimo):
+            # Cada copia opcional puede saltarse hasta el final
+            self.vacias[salida].append(final)
+            inicio, fin = self.compilar(interno)
+            self.vacias[salida].append(inicio)
+            salida = fin
+        self.vacias[salida].append(final)
+        return entrada, final
+
+    def utiles(self, aceptacion: int) -> FrozenSet[int]:
+        """Estados desde los que se llega a `aceptacion`."""
+        inversas: List[List[int]] = [[] for _ in self.vacias]
+        for origen, destinos in enumerate(self.vacias):
+            for destino in destinos:
+                inversas[destino].append(origen)
+        for origen, salidas in enumerate(self.transiciones):
+            for _, destino in salidas:
+                inversas[destino].append(origen)
+        alcanzados = {aceptacion}
+        pendientes = [aceptacion]
+        while pendientes:
+            for origen in inversas[pendientes.pop()]:
+                if origen not in alcanzados:
+                    alcanzados.add(origen)
+                    pendientes.append(origen)
+        return frozenset(alcanzados)
+
+
+class AutomataRegex:
+    """Acepta los términos que coinciden completos con una expresión regular."""
+
+    def __init__(self, patron: str):
+        """
+        Args:
+            patron: Expresión regular (ver la sintaxis admitida en el módulo)
+
+        Raises:
+            ValueError: Si la expresión es inválida o usa sintaxis no admitida
+        """
+        try:
+            self.regex = re.compile(patron)
+        except re.error as error:
+            raise ValueError(f"Expresión regular inválida {patron!r}: {error}") from error
+        self.patron = patron
+
+        nfa = _Thompson()
+        entrada, self._aceptacion = nfa.compilar(parsear_regex(patron))
+        utiles = nfa.utiles(self._aceptacion)
+        self._vacias = [[d for d in destinos if d in utiles] for destinos in nfa.vacias]
+        # Por estado: (inicios, fines, destino) de cada transición útil
+        self._salidas = [
+            [
+                (tuple(i for i, _ in rangos), tuple(f for _, f in rangos), destino)
+                for rangos, destino in salidas
+                if destino in utiles
+            ]
+            for salidas in nfa.transiciones
+        ]
+        self._inicial = self._clausura([entrada] if entrada in utiles else [])
+        # Estados con un bucle `.*`: desde ellos toda continuación sigue viva
+        self._bucles = frozenset(
+            origen
+            for origen, salidas in enumerate(nfa.transiciones)
+            if origen in utiles
+            for rangos, destino in salidas
+            if rangos == _CUALQUIERA and destino in utiles and origen in self._clausura([destino])
+        )
+        # Transiciones deterministas ya calculadas
+        self._transiciones: Dict[Tuple[FrozenSet[int], str], FrozenSet[int]] = {}
+
+    def _clausura(self, estados) -> FrozenSet[int]:
+        alcanzados = set(estados)
+        pendientes = list(estados)
+        while pendientes:
+            for destino in self._vacias[pendientes.pop()]:
+                if destino not in alcanzados:
+                    alcanzados.add(destino)
+                    pendientes.append(destino)
+        return frozenset(alcanzados)
+
+    def inicial(self) -> FrozenSet[int]:
+        """Estado antes de leer caracteres."""
+        return self._inicial
+
+    def avanzar(self, estado: FrozenSet[int], caracter: str) -> FrozenSet[int]:
+        """Estado tras leer `caracter`."""
+        clave = (estado, caracter)
+        siguiente = self._transiciones.get(clave)
+        if siguiente is None:
+            codigo = ord(caracter)
+            destinos = []
+            for origen in estado:
+                for inicios, fines, destino in self._salidas[origen]:
+                    i = bisect_right(inicios, codigo) - 1
+                    if i >= 0 and codigo <= fines[i]:
+                        destinos.append(destino)
+            siguiente = self._transiciones[clave] = self._clausura(destinos)
+        return siguiente
+
+    def acepta(self, estado: FrozenSet[int]) -> bool:
+        """Si la cadena leída coincide con la expresión."""
+        return self._aceptacion in estado
+
+    def vivo(self, estado: FrozenSet[int]) -> bool:
+        """Si alguna continuación de la cadena leída puede coincidir."""
+        return bool(estado)
+
+    def sin_poda(self, estado: FrozenSet[int]) -> bool:
+        """Si toda continuación de la cadena leída sigue viva (hay un `.*` en curso)."""
+        return not self._bucles.isdisjoint(estado)
+
+    def siguiente_caracter(self, estado: FrozenSet[int], despues_de: str) -> Optional[str]:
+        """Menor carácter mayor que `despues_de` que deja el estado vivo."""
+        # Todo destino es útil: cualquier carácter de una transición sirve
+        codigo = ord(despues_de) + 1
+        mejor = None
+        for origen in estado:
+            for inicios, fines, _ in self._salidas[origen]:
+                i = bisect_right(fines, codigo - 1)
+                if i < len(inicios):
+                    candidato = max(inicios[i], codigo)
+                    if mejor is None or candidato < mejor:
+                        mejor = candidato
+        return None if mejor is None else chr(mejor)
+
+    def coincide(self, termino: str) -> bool:
+        """Confirmación exacta con `re` de un término aceptado por el autómata."""
+        return self.regex.fullmatch(termino) is not None
@@ -4,16 +4,180 @@ Indexación de documentos usando Árboles B+ de ZODB.
 Implementa un índice ordenado con persistencia en disco.
 """
 
+import argparse
+import codecs
+import hashlib
 import os
-import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, wraps
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 import ZODB
 import ZODB.FileStorage
 import transaction
-from BTrees.OOBTree import OOBTree
+from BTrees.IIBTree import IISet, IITreeSet, multiunion
+from BTrees.IIBTree import intersection as intersection_postings
+from BTrees.IOBTree import IOBTree
+from BTrees.OIBTree import OIBTree
+from BTrees.OOBTree import OOBTree, OOSet
+from BTrees.OOBTree import intersection as intersection_terminos
 from persistent import Persistent
+from cache import CAPACIDAD_POR_DEFECTO, CacheResultados
+from autocompletado import TOP_AUTOCOMPLETADO, construir_top_k, mejores_completados
+from carga_masiva import ConstructorMasivo
+from consultas import EvaluadorBooleano, parsear_consulta
+from automatas import recorrer_automata
+from difuso import AutomataLevenshtein, recorrer_difuso
+from expresiones import AutomataRegex
+from instantanea import escribir_instantanea
+from particiones import cantidad_particiones, particionar_indice, ruta_mapa
+from comodines import (
+    PlanComodin,
+    clave_permuterm,
+    kgramas_de_patron,
+    kgramas_de_termino,
+    limite_prefijo,
+    patron_a_regex,
+    prefijo_sufijo_literal,
+    rotaciones,
+)
+from posiciones import calcular_posiciones, decodificar_posiciones, frecuencia, hay_proximidad
+from tokenizador import TOKENIZADOR_POR_DEFECTO, Tokenizador
+
+
+def normalizar_termino(termino: str) -> str:
+    """Normaliza un término con el tokenizador por defecto."""
+    return TOKENIZADOR_POR_DEFECTO.normalizar(termino)
+
+
+def extraer_terminos(contenido: str) -> Set[str]:
+    """Tokeniza un texto con el tokenizador por defecto."""
+    return TOKENIZADOR_POR_DEFECTO.terminos(contenido)
+
+
+TAMANO_BLOQUE = 1 << 20  # 1 MiB
+# Por debajo de esta densidad (claves del rango por consulta) conviene barrer
+CLAVES_POR_CONSULTA_BARRIDO = 16
+
+
+def leer_bloques(
+    ruta: Union[str, os.PathLike], tamano_bloque: int = TAMANO_BLOQUE, huella=None
+) -> Iterator[str]:
+    """
+    Lee un archivo UTF-8 en bloques de texto de tamaño acotado.
+
+    Args:
+        ruta: Archivo a leer
+        tamano_bloque: Bytes leídos por bloque
+        huella: Objeto hashlib opcional que se actualiza con los bytes leídos
+
+    Returns:
+        Iterador de fragmentos de texto decodificados
+    """
+    # El decodificador incremental no corta caracteres multibyte entre bloques
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+
+    with open(ruta, "rb") as f:
+        while True:
+            datos = f.read(tamano_bloque)
+            if not datos:
+                break
+            if huella is not None:
+                huella.update(datos)
+            yield decodificador.decode(datos)
+
+    yield decodificador.decode(b"", final=True)
+
+
+def tokenizar_archivo(
+    ruta: str, tokenizador: Tokenizador = TOKENIZADOR_POR_DEFECTO, posicional: bool = False
+) -> Tuple[Union[List[str], Dict[str, bytes]], str, Optional[str]]:
+    """
+    Lee y tokeniza un archivo del corpus. Se ejecuta en los procesos worker.
+
+    Args:
+        ruta: Ruta del archivo a tokenizar
+        tokenizador: Tokenizador a usar (debe poder serializarse con pickle)
+        posicional: Calcular también las posiciones codificadas de cada término
+
+    Returns:
+        (términos, hash del contenido, mensaje de error o None). Los términos
+        son una lista ordenada o, en modo posicional, un diccionario
+        {término -> blob de posiciones}.
+    """
+    huella = hashlib.sha1()
+
+    try:
+        bloques = leer_bloques(ruta, huella=huella)
+        if posicional:
+            blobs = calcular_posiciones(tokenizador.tokens_por_bloques(bloques))
+            return blobs, huella.hexdigest(), None
+        terminos = tokenizador.terminos_por_bloques(bloques)
+    except Exception as e:
+        return [], "", str(e)
+
+    # Una lista ordenada es más barata de serializar entre procesos que un set
+    return sorted(terminos), huella.hexdigest(), None
+
+
+class Pagina(NamedTuple):
+    """Página de resultados de una búsqueda por términos."""
+
+    resultados: List[Tuple[str, IITreeSet]]  # (término, doc_ids) en orden de clave
+    cursor: Optional[str]  # Pasarlo a la siguiente llamada; None si no hay más
+
+
+class Conteo(NamedTuple):
+    """Cantidad de términos y de documentos distintos que coinciden con una búsqueda."""
+
+    terminos: int
+    documentos: int
+
+
+def _paginar(recorrido: Iterator[Tuple[str, str, IITreeSet]], limite: int) -> Pagina:
+    """
+    Toma hasta `limite` elementos de un recorrido (clave, término, postings).
+
+    Solo se consume un elemento extra para saber si quedan más; el cursor es
+    la última clave devuelta en el árbol recorrido.
+    """
+    if limite < 1:
+        raise ValueError("El límite de una página debe ser al menos 1")
+
+    resultados = []
+    cursor = None
+
+    for clave, termino, postings in recorrido:
+        if len(resultados) == limite:
+            return Pagina(resultados, cursor)
+        resultados.append((termino, postings))
+        cursor = clave
+
+    return Pagina(resultados, None)
+
+
+def _cacheado(tipo: str, normalizar: Callable[["IndiceOrdenado", str], str]):
+    """
+    Decora un método `buscar_*` para pasar por la caché de resultados del índice.
+
+    La clave es (tipo de consulta, patrón normalizado, ids), así que "Hobbit"
+    y "hobbit" comparten entrada.
+    """
+
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, texto: str, ids: bool = False):
+            clave = (tipo, normalizar(self, texto), ids)
+            return self.cache_resultados.obtener(
+                clave, self.generacion, lambda: metodo(self, texto, ids=ids)
+            )
+
+        return envoltura
+
+    return decorador
 
 
 class IndiceOrdenado(Persistent):
@@ -21,22 +185,90 @@ class IndiceOrdenado(Persistent):
     Índice ordenado usando Árboles B+ de ZODB.
 
     Estructura:
-    - indice: OOBTree (término -> set de doc_ids)
-    - indice_invertido: OOBTree (término invertido -> set de doc_ids)
-    - documentos: OOBTree (doc_id -> nombre del documento)
+    - indice: OOBTree (término -> IITreeSet de doc_ids)
+    - indice_invertido: OOBTree (término invertido -> IITreeSet de doc_ids)
+    - documentos: IOBTree (doc_id -> nombre del documento)
+    - terminos_documento: IOBTree (doc_id -> tupla de términos del documento)
+    - archivos: OOBTree (archivo -> (doc_id, tamaño, mtime_ns, hash))
+    - posiciones: OOBTree (término -> IOBTree doc_id -> blob), solo en modo
+      posicional; cada blob guarda tf y posiciones en varint (ver posiciones.py)
+    - permuterm: OOBTree (rotación de término$ -> término), opcional; acelera
+      las búsquedas con comodines (ver comodines.py)
+    - kgramas: OOBTree (k-grama de $término$ -> IITreeSet de ids de término),
+      opcional, junto con termino_a_id (OIBTree) e id_a_termino (IOBTree)
+    - frecuencia_documentos: OIBTree (término -> cantidad de documentos)
+    - autocompletado: OOBTree (prefijo corto -> mejores completados por df),
+      opcional (ver autocompletado.py)
+    - generacion: contador que aumenta con cada cambio del índice; invalida
+      la caché de resultados de `buscar_*` (ver cache.py) y la tabla densa
+      de nombres de documentos, que viven solo en memoria en atributos
+      volátiles (`_v_cache_resultados`, `_v_tabla_documentos`)
+
+    La tokenización y normalización se delegan en `tokenizador`; para usar
+    otra basta con asignar una instancia de una subclase de `Tokenizador`.
     """
 
-    def __init__(self):
+    tokenizador = TOKENIZADOR_POR_DEFECTO
+    posiciones = None
+    permuterm = None
+    kgramas = None
+    k = 0
+    frecuencia_documentos = None
+    autocompletado = None
+    largo_autocompletado = 0
+    k_autocompletado = 0
+    autocompletado_vigente = False
+    generacion = 0
+
+    def __init__(
+        self,
+        posicional: bool = False,
+        permuterm: bool = False,
+        kgramas: int = 0,
+        autocompletado: int = 0,
+    ):
+        """
+        Args:
+            posicional: Guardar frecuencias y posiciones de cada término
+            permuterm: Mantener el árbol de rotaciones para comodines
+            kgramas: Largo k del índice de k-gramas (0 = sin índice)
+            autocompletado: Largo máximo de los prefijos con completados
+                precalculados (0 = sin caché)
+        """
         super().__init__()
-        self.indice = OOBTree()  # término -> set de doc_ids
-        # término invertido -> set de doc_ids
+        self.indice = OOBTree()  # término -> IITreeSet de doc_ids
+        # término invertido -> IITreeSet de doc_ids
         self.indice_invertido = OOBTree()
-        self.documentos = OOBTree()  # doc_id -> nombre del documento
+        self.documentos = IOBTree()  # doc_id -> nombre del documento
+        # doc_id -> términos, para poder quitar un documento de los postings
+        self.terminos_documento = IOBTree()
+        # archivo del corpus -> (doc_id, tamaño, mtime_ns, hash)
+        self.archivos = OOBTree()
+        self.frecuencia_documentos = OIBTree()  # término -> df
         self.doc_counter = 0
+        if posicional:
+            self.posiciones = OOBTree()
+        if permuterm:
+            self.permuterm = OOBTree()
+        if kgramas:
+            self._iniciar_kgramas(kgramas)
+        if autocompletado:
+            self.construir_autocompletado(autocompletado)
+
+    def asegurar_estructuras(self):
+        """Crea las estructuras que no existen en índices de versiones anteriores."""
+        if not hasattr(self, "indice_invertido"):
+            self.indice_invertido = OOBTree()
+        if not hasattr(self, "terminos_documento"):
+            self.terminos_documento = IOBTree()
+        if not hasattr(self, "archivos"):
+            self.archivos = OOBTree()
+        if self.frecuencia_documentos is None:
+            self.construir_frecuencias()
 
     def normalizar_termino(self, termino: str) -> str:
         """Normaliza un término: lowercase y sin puntuación."""
-        return re.sub(r"[^\w]", "", termino.lower())
+        return self.tokenizador.normalizar(termino)
 
     def agregar_documento(self, nombre_doc: str, contenido: str) -> int:
         """
@@ -49,107 +281,585 @@ class IndiceOrdenado(Persistent):
         Returns:
             doc_id: ID asignado al documento
         """
-        doc_id = self.doc_counter
-        self.doc_counter += 1
+        if self.posiciones is not None:
+            blobs = calcular_posiciones(self.tokenizador.tokens(contenido))
+            doc_id = self.agregar_terminos(nombre_doc, blobs)
+            self.agregar_posiciones(doc_id, blobs)
+            return doc_id
+
+        return self.agregar_terminos(nombre_doc, self.tokenizador.terminos(contenido))
+
+    def agregar_documento_por_bloques(
+        self,
+        nombre_doc: str,
+        fuente: Union[str, os.PathLike, Iterable[str]],
+        tamano_bloque: int = TAMANO_BLOQUE,
+    ) -> int:
+        """
+        Agrega un documento leyéndolo por bloques, sin cargarlo entero en memoria.
 
-        # Registrar el documento
-        self.documentos[doc_id] = nombre_doc
+        Args:
+            nombre_doc: Nombre del documento
+            fuente: Ruta de un archivo UTF-8 o iterable de fragmentos de texto
+            tamano_bloque: Bytes por bloque cuando `fuente` es una ruta
 
-        # Tokenizar y agregar términos al índice
-        palabras = contenido.split()
-        terminos_unicos = set()
+        Returns:
+            doc_id: ID asignado al documento
+        """
+        if isinstance(fuente, (str, os.PathLike)):
+            fuente = leer_bloques(fuente, tamano_bloque)
 
-        for palabra in palabras:
-            termino = self.normalizar_termino(palabra)
-            if termino and len(termino) > 0:
-                terminos_unicos.add(termino)
+        if self.posiciones is not None:
+            blobs = calcular_posiciones(self.tokenizador.tokens_por_bloques(fuente))
+            doc_id = self.agregar_terminos(nombre_doc, blobs)
+            self.agregar_posiciones(doc_id, blobs)
+            return doc_id
+
+        return self.agregar_terminos(nombre_doc, self.tokenizador.terminos_por_bloques(fuente))
+
+    def agregar_terminos(self, nombre_doc: str, terminos_unicos: Iterable[str]) -> int:
+        """
+        Agrega un documento ya tokenizado al índice.
+
+        Args:
+            nombre_doc: Nombre del documento
+            terminos_unicos: Términos normalizados y sin repetir del documento
+
+        Returns:
+            doc_id: ID asignado al documento
+        """
+        terminos_unicos = tuple(terminos_unicos)
+        doc_id = self.registrar_documento(nombre_doc, terminos_unicos)
+        frecuencias = self.frecuencia_documentos
 
         # Agregar términos al índice
         for termino in terminos_unicos:
-            if termino not in self.indice:
-                self.indice[termino] = set()
-            self.indice[termino].add(doc_id)
+            if frecuencias is not None:
+                frecuencias[termino] = frecuencias.get(termino, 0) + 1
+            postings = self.indice.get(termino)
+            if postings is None:
+                postings = self.indice[termino] = IITreeSet()
+                if self.permuterm is not None:
+                    self._agregar_rotaciones(termino)
+                if self.kgramas is not None:
+                    self._agregar_kgramas(termino)
+            postings.add(doc_id)
 
             # Agregar también al índice con palabras invertidas
             termino_invertido = termino[::-1]  # Invertir la palabra
-            if termino_invertido not in self.indice_invertido:
-                self.indice_invertido[termino_invertido] = set()
-            self.indice_invertido[termino_invertido].add(doc_id)
+            postings = self.indice_invertido.get(termino_invertido)
+            if postings is None:
+                postings = self.indice_invertido[termino_invertido] = IITreeSet()
+            postings.add(doc_id)
+
+        self._actualizar_autocompletado(terminos_unicos)
+        return doc_id
+
+    def agregar_posiciones(self, doc_id: int, blobs: Dict[str, bytes]):
+        """
+        Guarda las posiciones codificadas de los términos de un documento.
+
+        Args:
+            doc_id: ID del documento
+            blobs: Diccionario {término -> blob de posiciones}
+        """
+        for termino, blob in blobs.items():
+            por_documento = self.posiciones.get(termino)
+            if por_documento is None:
+                por_documento = self.posiciones[termino] = IOBTree()
+            por_documento[doc_id] = blob
+
+    def _agregar_rotaciones(self, termino: str):
+        for rotacion in rotaciones(termino):
+            self.permuterm[rotacion] = termino
+
+    def _quitar_rotaciones(self, termino: str):
+        for rotacion in rotaciones(termino):
+            self.permuterm.pop(rotacion, None)
+
+    def construir_permuterm(self, tamano_lote: int = 10000) -> int:
+        """
+        Crea (o recrea) el árbol permuterm a partir del vocabulario actual.
+
+        Las rotaciones se insertan ordenadas por lotes, con un savepoint
+        entre lotes.
+
+        Args:
+            tamano_lote: Términos procesados entre savepoints
+
+        Returns:
+            Cantidad de rotaciones guardadas
+        """
+        if self.permuterm is None:
+            self.permuterm = OOBTree()
+        else:
+            self.permuterm.clear()
+
+        lote = []
+        total = 0
+        for i, termino in enumerate(self.indice.keys(), 1):
+            lote.extend((rotacion, termino) for rotacion in rotaciones(termino))
+            if i % tamano_lote == 0:
+                lote.sort()
+                self.permuterm.update(lote)
+                total += len(lote)
+                lote = []
+                transaction.savepoint(True)
+
+        lote.sort()
+        self.permuterm.update(lote)
+        return total + len(lote)
+
+    def construir_frecuencias(self, tamano_lote: int = 10000) -> int:
+        """
+        Crea (o recrea) el árbol de frecuencias de documentos desde los postings.
+
+        Se usa tras la carga masiva, que llena los árboles sin pasar por
+        `agregar_terminos`, y en índices de versiones anteriores.
+
+        Args:
+            tamano_lote: Términos procesados entre savepoints
+
+        Returns:
+            Cantidad de términos con frecuencia registrada
+        """
+        if self.frecuencia_documentos is None:
+            self.frecuencia_documentos = OIBTree()
+        else:
+            self.frecuencia_documentos.clear()
+        if self.autocompletado is not None:
+            self.autocompletado_vigente = False
+
+        lote = []
+        total = 0
+        for termino, postings in self.indice.items():
+            lote.append((termino, len(postings)))
+            if len(lote) >= tamano_lote:
+                self.frecuencia_documentos.update(lote)
+                total += len(lote)
+                lote = []
+                transaction.savepoint(True)
+
+        self.frecuencia_documentos.update(lote)
+        return total + len(lote)
+
+    def construir_autocompletado(self, largo_maximo: int, k: int = TOP_AUTOCOMPLETADO) -> int:
+        """
+        Precalcula los `k` mejores completados de cada prefijo de hasta
+        `largo_maximo` caracteres, en una pasada por las frecuencias.
+
+        Después, agregar o eliminar documentos actualiza solo los prefijos de
+        sus términos (ver `_actualizar_autocompletado`); la carga masiva, que
+        recrea las frecuencias, obliga a reconstruirla.
+
+        Args:
+            largo_maximo: Largo máximo de los prefijos precalculados
+            k: Completados guardados por prefijo
+
+        Returns:
+            Cantidad de prefijos guardados
+        """
+        if self.frecuencia_documentos is None:
+            self.construir_frecuencias()
+
+        top_k = construir_top_k(self.frecuencia_documentos.items(), largo_maximo, k)
+
+        if self.autocompletado is None:
+            self.autocompletado = OOBTree()
+        else:
+            self.autocompletado.clear()
+        self.autocompletado.update(sorted(top_k.items()))
+        self.largo_autocompletado = largo_maximo
+        self.k_autocompletado = k
+        self.autocompletado_vigente = True
+
+        return len(top_k)
+
+    def _actualizar_autocompletado(self, terminos: Iterable[str]):
+        """
+        Corrige los completados de los prefijos de `terminos`, cuyo df acaba de cambiar.
+
+        La lista de cada prefijo se mezcla con los df nuevos. Solo si un
+        término que bajó deja la lista por debajo de su último completado,
+        algún término de afuera podría superarlo y se recorre el rango.
+
+        Args:
+            terminos: Términos del documento agregado o eliminado
+        """
+        if not terminos or self.autocompletado is None or not self.autocompletado_vigente:
+            return
+        if self.frecuencia_documentos is None:
+            self.autocompletado_vigente = False
+            return
+
+        afectados: Dict[str, List[str]] = {}
+        for termino in terminos:
+            for largo in range(min(self.largo_autocompletado, len(termino)) + 1):
+                afectados.setdefault(termino[:largo], []).append(termino)
+
+        frecuencias = self.frecuencia_documentos
+        k = self.k_autocompletado
+        for prefijo, cambiados in afectados.items():
+            anterior = self.autocompletado.get(prefijo, ())
+            excluir = set(cambiados)
+            pares = [par for par in anterior if par[0] not in excluir]
+            pares.extend((termino, frecuencias.get(termino, 0)) for termino in cambiados)
+            mejores = [par for par in mejores_completados(pares, k) if par[1]]
+
+            # Con la lista llena, los de afuera están detrás de su último completado
+            if len(anterior) == k:
+                corte = (-anterior[-1][1], anterior[-1][0])
+                if len(mejores) < k or (-mejores[-1][1], mejores[-1][0]) > corte:
+                    rango = frecuencias.items(min=prefijo, max=limite_prefijo(prefijo))
+                    mejores = mejores_completados(rango, k)
+
+            if mejores:
+                self.autocompletado[prefijo] = tuple(mejores)
+            elif prefijo in self.autocompletado:
+                del self.autocompletado[prefijo]
+
+    def _candidatos_permuterm(self, patron_norm: str) -> Iterator[str]:
+        """Términos cuya alguna rotación empieza con la clave permuterm del patrón."""
+        clave = clave_permuterm(patron_norm)
+        vistos = set()
+
+        for rotacion, termino in self.permuterm.items(min=clave):
+            if not rotacion.startswith(clave):
+                break
+            # Un término puede tener varias rotaciones con la misma clave
+            if termino not in vistos:
+                vistos.add(termino)
+                yield termino
+
+    def _iniciar_kgramas(self, k: int):
+        self.k = k
+        self.kgramas = OOBTree()
+        self.termino_a_id = OIBTree()
+        self.id_a_termino = IOBTree()
+        self.termino_counter = 0
+
+    def _agregar_kgramas(self, termino: str):
+        termino_id = self.termino_counter
+        self.termino_counter += 1
+        self.termino_a_id[termino] = termino_id
+        self.id_a_termino[termino_id] = termino
+
+        for kgrama in kgramas_de_termino(termino, self.k):
+            ids = self.kgramas.get(kgrama)
+            if ids is None:
+                ids = self.kgramas[kgrama] = IITreeSet()
+            ids.add(termino_id)
+
+    def _quitar_kgramas(self, termino: str):
+        termino_id = self.termino_a_id.pop(termino, None)
+        if termino_id is None:
+            return
+        del self.id_a_termino[termino_id]
+
+        for kgrama in kgramas_de_termino(termino, self.k):
+            ids = self.kgramas.get(kgrama)
+            if ids is not None:
+                ids.remove(termino_id)
+                if not ids:
+                    del self.kgramas[kgrama]
+
+    def construir_kgramas(self, k: int, tamano_lote: int = 10000) -> int:
+        """
+        Crea (o recrea) el índice de k-gramas a partir del vocabulario actual.
+
+        Args:
+            k: Largo de los k-gramas
+            tamano_lote: Términos procesados entre savepoints
+
+        Returns:
+            Cantidad de k-gramas distintos
+        """
+        self._iniciar_kgramas(k)
+
+        for i, termino in enumerate(self.indice.keys(), 1):
+            self._agregar_kgramas(termino)
+            if i % tamano_lote == 0:
+                transaction.savepoint(True)
+
+        return len(self.kgramas)
+
+    def _candidatos_kgramas(self, patron_norm: str) -> Optional[List[str]]:
+        """
+        Términos que contienen todos los k-gramas literales del patrón.
+
+        Returns:
+            Lista de términos candidatos, o None si el patrón no tiene
+            segmentos literales de largo suficiente
+        """
+        kgramas = kgramas_de_patron(patron_norm, self.k)
+        if not kgramas:
+            return None
+
+        conjuntos = []
+        for kgrama in kgramas:
+            ids = self.kgramas.get(kgrama)
+            if ids is None:
+                return []
+            conjuntos.append(ids)
+
+        # Intersectar de menor a mayor para achicar el resultado cuanto antes
+        conjuntos.sort(key=len)
+        candidatos = conjuntos[0]
+        for ids in conjuntos[1:]:
+            candidatos = intersection_postings(candidatos, ids)
+            if not candidatos:
+                return []
+
+        return [self.id_a_termino[termino_id] for termino_id in candidatos]
+
+    def registrar_documento(self, nombre_doc: str, terminos_unicos: Iterable[str]) -> int:
+        """
+        Asigna un doc_id y registra el documento sin tocar los árboles de términos.
+
+        Args:
+            nombre_doc: Nombre del documento
+            terminos_unicos: Términos normalizados y sin repetir del documento
+
+        Returns:
+            doc_id: ID asignado al documento
+        """
+        doc_id = self.doc_counter
+        self.doc_counter += 1
+        self.generacion += 1
+
+        self.documentos[doc_id] = nombre_doc
+        self.terminos_documento[doc_id] = tuple(sorted(terminos_unicos))
 
         return doc_id
 
-    def buscar_exacto(self, termino: str) -> List[str]:
+    def eliminar_documento(self, doc_id: int) -> int:
+        """
+        Quita un documento de los postings de todos sus términos.
+
+        Los términos que quedan sin documentos se eliminan de ambos árboles.
+
+        Args:
+            doc_id: ID del documento a eliminar
+
+        Returns:
+            Cantidad de términos eliminados del vocabulario
+        """
+        terminos = self.terminos_documento.pop(doc_id, ())
+        eliminados = 0
+        self.generacion += 1
+        frecuencias = self.frecuencia_documentos
+
+        for termino in terminos:
+            if frecuencias is not None and termino in frecuencias:
+                df = frecuencias[termino] - 1
+                if df:
+                    frecuencias[termino] = df
+                else:
+                    del frecuencias[termino]
+
+            for arbol, clave in ((self.indice, termino), (self.indice_invertido, termino[::-1])):
+                postings = arbol.get(clave)
+                if postings is None:
+                    continue
+                postings.remove(doc_id)
+                if not postings:
+                    del arbol[clave]
+                    if arbol is self.indice:
+                        eliminados += 1
+                        if self.permuterm is not None:
+                            self._quitar_rotaciones(termino)
+                        if self.kgramas is not None:
+                            self._quitar_kgramas(termino)
+
+            if self.posiciones is not None:
+                por_documento = self.posiciones.get(termino)
+                if por_documento is not None:
+                    por_documento.pop(doc_id, None)
+                    if not por_documento:
+                        del self.posiciones[termino]
+
+        self._actualizar_autocompletado(terminos)
+        self.documentos.pop(doc_id, None)
+        return eliminados
+
+    def registrar_archivo(
+        self, nombre_archivo: str, doc_id: int, tamano: int, mtime_ns: int, huella: str
+    ):
+        """Guarda los metadatos de un archivo del corpus para la indexación incremental."""
+        self.archivos[nombre_archivo] = (doc_id, tamano, mtime_ns, huella)
+
+    @property
+    def cache_resultados(self) -> CacheResultados:
+        """Caché de resultados de este objeto en memoria (no se persiste)."""
+        cache = getattr(self, "_v_cache_resultados", None)
+        if cache is None:
+            cache = self._v_cache_resultados = CacheResultados()
+        return cache
+
+    def configurar_cache(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        """
+        Reemplaza la caché de resultados por una vacía de la capacidad dada.
+
+        Args:
+            capacidad: Peso máximo de la caché (0 = desactivarla)
+        """
+        self._v_cache_resultados = CacheResultados(capacidad)
+
+    def estadisticas_cache(self) -> Dict[str, int]:
+        """Aciertos, fallos, desalojos e invalidaciones de la caché de resultados."""
+        return self.cache_resultados.estadisticas()
+
+    @property
+    def tabla_documentos(self) -> List[Optional[str]]:
+        """
+        Nombres de documentos en una lista indexada por doc_id.
+
+        Se arma una vez por conexión a partir de `documentos` y se vuelve a
+        armar cuando cambia la generación del índice; no se persiste.
+        """
+        tabla = getattr(self, "_v_tabla_documentos", None)
+        if tabla is None or tabla[0] != self.generacion:
+            tamano = self.doc_counter
+            if self.documentos:
+                tamano = max(tamano, self.documentos.maxKey() + 1)
+            nombres: List[Optional[str]] = [None] * tamano
+            for doc_id, nombre in self.documentos.items():
+                nombres[doc_id] = nombre
+            tabla = self._v_tabla_documentos = (self.generacion, nombres)
+        return tabla[1]
+
+    def nombres_documentos(self, doc_ids: Iterable[int]) -> List[str]:
+        """
+        Resuelve una secuencia ordenada de doc_ids a nombres de documentos.
+
+        Usa la tabla densa en memoria: los nombres son los mismos objetos
+        para todos los resultados, sin consultar el árbol por cada doc_id.
+        """
+        tabla = self.tabla_documentos
+        return [tabla[doc_id] for doc_id in doc_ids]
+
+    def _resolver(self, doc_ids, ids: bool):
+        """Devuelve los doc_ids tal cual o sus nombres, según `ids`."""
+        return doc_ids if ids else self.nombres_documentos(doc_ids)
+
+    def necesita_migracion(self) -> bool:
+        """Indica si el índice usa el formato anterior (sets de Python y OOBTree)."""
+        if not isinstance(self.documentos, IOBTree):
+            return True
+        for postings in self.indice.values():
+            return not isinstance(postings, IITreeSet)
+        return False
+
+    def migrar(self, tamano_lote: int = 10000) -> int:
+        """
+        Convierte un índice del formato anterior al formato de postings enteros.
+
+        Reemplaza cada set de Python por un IITreeSet y el OOBTree de
+        documentos por un IOBTree. Usa savepoints cada `tamano_lote` términos
+        para no retener todos los objetos modificados en memoria.
+
+        Args:
+            tamano_lote: Cantidad de términos a convertir entre savepoints
+
+        Returns:
+            Cantidad de postings convertidos
+        """
+        convertidos = 0
+
+        self.asegurar_estructuras()
+
+        for arbol in (self.indice, self.indice_invertido):
+            for termino in list(arbol.keys()):
+                postings = arbol[termino]
+                if isinstance(postings, IITreeSet):
+                    continue
+                arbol[termino] = IITreeSet(postings)
+                convertidos += 1
+                if convertidos % tamano_lote == 0:
+                    transaction.savepoint(True)
+
+        if not isinstance(self.documentos, IOBTree):
+            self.documentos = IOBTree(self.documentos.items())
+
+        return convertidos
+
+    @_cacheado("exacto", lambda indice, texto: indice.normalizar_termino(texto))
+    def buscar_exacto(self, termino: str, ids: bool = False) -> Union[List[str], IITreeSet]:
         """
         Busca un término exacto en el índice.
 
         Args:
             termino: Término a buscar
+            ids: Devolver los doc_ids en lugar de los nombres
 
         Returns:
-            Lista de nombres de documentos que contienen el término
+            Lista de nombres de documentos que contienen el término, o sus
+            doc_ids ordenados si `ids` (no deben modificarse)
         """
         termino_norm = self.normalizar_termino(termino)
 
-        if termino_norm not in self.indice:
-            return []
+        postings = self.indice.get(termino_norm)
+        if postings is None:
+            return IISet() if ids else []
 
-        doc_ids = sorted(self.indice[termino_norm])
-        return [self.documentos[doc_id] for doc_id in doc_ids]
+        # IITreeSet ya mantiene los doc_ids ordenados
+        return self._resolver(postings, ids)
 
-    def buscar_prefijo(self, prefijo: str) -> Dict[str, List[str]]:
+    @_cacheado("prefijo", lambda indice, texto: indice.normalizar_termino(texto))
+    def buscar_prefijo(self, prefijo: str, ids: bool = False) -> Dict[str, List[str]]:
         """
         Busca todos los términos que empiezan con el prefijo dado.
 
         Args:
             prefijo: Prefijo a buscar
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
 
         Returns:
-            Diccionario {término -> lista de documentos}
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
         """
         prefijo_norm = self.normalizar_termino(prefijo)
         resultados = {}
 
         # OOBTree mantiene orden lexicográfico
         # Buscar desde el prefijo hasta términos que no empiecen con él
-        for termino in self.indice.keys(min=prefijo_norm):
+        for termino, postings in self.indice.items(min=prefijo_norm):
             if not termino.startswith(prefijo_norm):
                 break
 
-            doc_ids = sorted(self.indice[termino])
-            nombres_docs = [self.documentos[doc_id] for doc_id in doc_ids]
-            resultados[termino] = nombres_docs
+            resultados[termino] = self._resolver(postings, ids)
 
         return resultados
 
-    def buscar_sufijo(self, sufijo: str) -> Dict[str, List[str]]:
+    @_cacheado("sufijo", lambda indice, texto: indice.normalizar_termino(texto))
+    def buscar_sufijo(self, sufijo: str, ids: bool = False) -> Dict[str, List[str]]:
         """
         Busca todos los términos que terminan con el sufijo dado.
         Usa el índice con palabras invertidas para búsqueda eficiente.
 
         Args:
             sufijo: Sufijo a buscar
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
 
         Returns:
-            Diccionario {término -> lista de documentos}
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
         """
         sufijo_norm = self.normalizar_termino(sufijo)
         sufijo_invertido = sufijo_norm[::-1]
         resultados = {}
 
         # Buscar en el índice con palabras invertidas
-        for termino_inv in self.indice_invertido.keys(min=sufijo_invertido):
+        for termino_inv, postings in self.indice_invertido.items(min=sufijo_invertido):
             if not termino_inv.startswith(sufijo_invertido):
                 break
 
             # Recuperar el término original
             termino = termino_inv[::-1]
-            doc_ids = sorted(self.indice_invertido[termino_inv])
-            nombres_docs = [self.documentos[doc_id] for doc_id in doc_ids]
-            resultados[termino] = nombres_docs
+            resultados[termino] = self._resolver(postings, ids)
 
         return resultados
 
-    def buscar_comodin(self, patron: str) -> Dict[str, List[str]]:
+    @_cacheado("comodin", lambda indice, texto: indice.tokenizador.normalizar_patron(texto, "*?"))
+    def buscar_comodin(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
         """
         Busca términos que coincidan con un patrón con comodines.
 
@@ -159,35 +869,484 @@ class IndiceOrdenado(Persistent):
 
         Args:
             patron: Patrón con comodines
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
 
         Returns:
-            Diccionario {término -> lista de documentos}
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
         """
         # Normalizar patron pero preservar * y ?
-        patron_norm = patron.lower()
-        # Remover caracteres especiales excepto * y ?
-        patron_norm = re.sub(r"[^\w*?]", "", patron_norm)
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
 
         # Convertir patrón con comodines a regex
-        regex_pattern = patron_norm.replace("*", ".*").replace("?", ".")
-        regex_pattern = f"^{regex_pattern}$"
-
-        try:
-            regex = re.compile(regex_pattern)
-        except re.error:
+        regex = patron_a_regex(patron_norm)
+        if regex is None:
             return {}
 
+        plan = self._planificar_comodin(patron_norm)
+        coincidencias = [
+            (termino, postings)
+            for termino, postings in self._candidatos_plan(plan, patron_norm)
+            if regex.match(termino)
+        ]
+
+        # Solo el índice y el recorrido completo entregan los términos en orden
+        if plan.estrategia not in ("exacto", "prefijo", "recorrido"):
+            coincidencias.sort(key=lambda par: par[0])
+
         resultados = {}
+        for termino, postings in coincidencias:
+            if postings is None:
+                postings = self.indice[termino]
+            resultados[termino] = self._resolver(postings, ids)
+
+        return resultados
+
+    def postings_patron(self, patron: str):
+        """
+        Doc_ids de los documentos con algún término que coincida con el patrón.
+
+        Acepta términos exactos y patrones con * y ?; usa el mismo
+        planificador que `buscar_comodin` pero une los postings enteros sin
+        resolver nombres de documentos.
+
+        Args:
+            patron: Término o patrón con comodines
+
+        Returns:
+            IITreeSet o IISet con los doc_ids ordenados
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        if "*" not in patron_norm and "?" not in patron_norm:
+            return self.indice.get(patron_norm, IISet())
 
-        for termino in self.indice.keys():
+        return multiunion([postings for _, postings in self._coincidencias(patron_norm)])
+
+    def _coincidencias(self, patron_norm: str) -> Iterator[Tuple[str, IITreeSet]]:
+        """Términos que coinciden con un patrón normalizado, con sus postings, sin orden."""
+        regex = patron_a_regex(patron_norm)
+        if regex is None:
+            return
+        plan = self._planificar_comodin(patron_norm)
+
+        for termino, postings in self._candidatos_plan(plan, patron_norm):
             if regex.match(termino):
-                doc_ids = sorted(self.indice[termino])
-                nombres_docs = [self.documentos[doc_id] for doc_id in doc_ids]
-                resultados[termino] = nombres_docs
+                yield termino, self.indice[termino] if postings is None else postings
+
+    def _contar_rango(self, arbol, prefijo: str) -> Conteo:
+        """Términos del rango de `prefijo` en `arbol` y documentos distintos entre ellos."""
+        rango = arbol.values(min=prefijo, max=limite_prefijo(prefijo))
+        postings = list(rango)
+        return Conteo(len(postings), len(multiunion(postings)))
+
+    def contar_prefijo(self, prefijo: str) -> Conteo:
+        """
+        Cuenta lo que devolvería `buscar_prefijo` sin armar listas de nombres.
+
+        Une los postings enteros del rango con `multiunion` y cuenta el resultado.
+
+        Args:
+            prefijo: Prefijo a buscar
+
+        Returns:
+            Conteo(terminos, documentos)
+        """
+        return self._contar_rango(self.indice, self.normalizar_termino(prefijo))
+
+    def contar_sufijo(self, sufijo: str) -> Conteo:
+        """
+        Cuenta lo que devolvería `buscar_sufijo` sin armar listas de nombres.
+
+        Args:
+            sufijo: Sufijo a buscar
+
+        Returns:
+            Conteo(terminos, documentos)
+        """
+        return self._contar_rango(self.indice_invertido, self.normalizar_termino(sufijo)[::-1])
+
+    def contar_comodin(self, patron: str) -> Conteo:
+        """
+        Cuenta lo que devolvería `buscar_comodin` sin armar listas de nombres.
+
+        Usa el mismo planificador; los patrones sin comodines o con un solo
+        `*` al final o al principio se cuentan directamente sobre el rango.
+
+        Args:
+            patron: Patrón con comodines
+
+        Returns:
+            Conteo(terminos, documentos)
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        if "*" not in patron_norm and "?" not in patron_norm:
+            postings = self.indice.get(patron_norm)
+            return Conteo(0, 0) if postings is None else Conteo(1, len(postings))
+
+        # prefijo* y *sufijo: las claves del rango son exactamente las coincidencias
+        if "?" not in patron_norm and patron_norm.count("*") == 1:
+            if patron_norm.endswith("*"):
+                return self._contar_rango(self.indice, patron_norm[:-1])
+            if patron_norm.startswith("*"):
+                return self._contar_rango(self.indice_invertido, patron_norm[1:][::-1])
+
+        postings = [docs for _, docs in self._coincidencias(patron_norm)]
+        return Conteo(len(postings), len(multiunion(postings)))
+
+    def contar_comodin_medio(self, patron: str) -> Conteo:
+        """
+        Cuenta lo que devolvería `buscar_comodin_medio` sin armar listas de nombres.
+
+        Args:
+            patron: Patrón con * en el medio (ej: "ca*do")
+
+        Returns:
+            Conteo(terminos, documentos)
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*")
+        if patron_norm.count("*") != 1:
+            # Igual que buscar_comodin_medio: sin un único *, búsqueda normal
+            return self.contar_comodin(patron)
+        return self.contar_comodin(patron_norm)
+
+    @_cacheado("booleana", lambda indice, texto: " ".join(texto.split()))
+    def buscar_booleana(self, consulta: str, ids: bool = False) -> Union[List[str], IISet]:
+        """
+        Evalúa una consulta booleana con AND, OR, NOT y paréntesis.
+
+        Los operandos pueden ser términos, prefijos (`drag*`), sufijos
+        (`*ción`) o patrones con comodines. Ver consultas.py.
+
+        Args:
+            consulta: Consulta, ej: "hobbit AND (anillo OR drag*) AND NOT *ción"
+            ids: Devolver los doc_ids en lugar de los nombres
+
+        Returns:
+            Lista de nombres de documentos que cumplen la consulta, o sus doc_ids
+
+        Raises:
+            ValueError: Si la consulta tiene errores de sintaxis
+        """
+        doc_ids = EvaluadorBooleano(self).evaluar(parsear_consulta(consulta))
+        return self._resolver(doc_ids, ids)
+
+    def buscar_difuso(
+        self, termino: str, max_ediciones: int = 2, ids: bool = False
+    ) -> List[Tuple[str, int, Union[List[str], IITreeSet]]]:
+        """
+        Busca los términos a `max_ediciones` o menos de distancia de edición.
+
+        Recorre `indice` guiado por un autómata de Levenshtein: cuando un
+        prefijo ya no puede coincidir, salta con `minKey` al siguiente
+        prefijo viable en lugar de comparar contra cada término (ver difuso.py).
+
+        Args:
+            termino: Término, posiblemente mal escrito
+            max_ediciones: Inserciones, borrados o sustituciones permitidos
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Lista de (término, distancia, documentos), de menor a mayor distancia
+            y alfabética ante empates
+        """
+        automata = AutomataLevenshtein(self.normalizar_termino(termino), max_ediciones)
+
+        coincidencias = sorted(
+            recorrer_difuso(self.indice, automata), key=lambda par: (par[1], par[0])
+        )
+        return [
+            (clave, distancia, self._resolver(self.indice[clave], ids))
+            for clave, distancia in coincidencias
+        ]
+
+    def buscar_regex(
+        self, expresion: str, ids: bool = False, estadisticas: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Busca los términos que coinciden completos con una expresión regular.
+
+        La expresión se compila a un autómata determinista que recorre
+        `indice` en orden: cuando un prefijo ya no puede coincidir, salta con
+        `minKey` al siguiente prefijo viable (ver expresiones.py). Los
+        términos están normalizados, así que la expresión debe escribirse en
+        minúsculas.
+
+        Args:
+            expresion: Expresión regular, ej: "cas[ao]s?" o "(des|re)?hac.+"
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+            estadisticas: Diccionario opcional donde se guardan las claves
+                visitadas ("visitadas"), los saltos ("saltos") y el tamaño del
+                vocabulario ("vocabulario")
+
+        Returns:
+            Diccionario {término -> documentos}, en orden alfabético
+
+        Raises:
+            ValueError: Si la expresión es inválida o usa sintaxis no admitida
+        """
+        automata = AutomataRegex(expresion)
+        recorrido = {} if estadisticas is None else estadisticas
+
+        resultados = {
+            clave: self._resolver(self.indice[clave], ids)
+            for clave, _ in recorrer_automata(self.indice, automata, recorrido)
+            if automata.coincide(clave)
+        }
+        if estadisticas is not None:
+            estadisticas["vocabulario"] = len(self.indice)
+        return resultados
+
+    def autocompletar(self, prefijo: str, k: int = TOP_AUTOCOMPLETADO) -> List[Tuple[str, int]]:
+        """
+        Los `k` términos más frecuentes que empiezan con el prefijo.
+
+        Si el prefijo es corto y la caché está vigente, es una sola consulta
+        al árbol de autocompletado; si no, se recorre el rango del prefijo en
+        el árbol de frecuencias quedándose con los `k` mejores.
+
+        Args:
+            prefijo: Prefijo ingresado por el usuario
+            k: Cantidad de completados
+
+        Returns:
+            Lista de pares (término, df) por df descendente y luego alfabética
+        """
+        prefijo_norm = self.normalizar_termino(prefijo)
+
+        if (
+            self.autocompletado is not None
+            and self.autocompletado_vigente
+            and len(prefijo_norm) <= self.largo_autocompletado
+            and k <= self.k_autocompletado
+        ):
+            return list(self.autocompletado.get(prefijo_norm, ())[:k])
+
+        maximo = limite_prefijo(prefijo_norm)
+        if self.frecuencia_documentos is not None:
+            pares = self.frecuencia_documentos.items(min=prefijo_norm, max=maximo)
+        else:
+            # Índice anterior sin frecuencias: contar los postings
+            pares = (
+                (termino, len(postings))
+                for termino, postings in self.indice.items(min=prefijo_norm, max=maximo)
+            )
+        return mejores_completados(pares, k)
+
+    def _barrer(
+        self, arbol, consultas: List[Tuple[str, bool]]
+    ) -> Dict[Tuple[str, bool], List[Tuple[str, IITreeSet]]]:
+        """
+        Resuelve consultas exactas y por prefijo sobre `arbol` en orden de clave.
+
+        Si las consultas son densas respecto del rango de claves que abarcan,
+        se recorre ese rango una sola vez avanzando en paralelo por las
+        consultas ordenadas; si no, se hace una búsqueda por consulta, también
+        en orden, para no leer las claves intermedias.
+
+        Args:
+            arbol: indice o indice_invertido
+            consultas: Pares (clave, es_prefijo) ordenados y sin repetir
+
+        Returns:
+            Diccionario {(clave, es_prefijo) -> lista de (clave del árbol, postings)}
+        """
+        resultados = {consulta: [] for consulta in consultas}
+        if not consultas:
+            return resultados
+
+        # Un prefijo puede abarcar claves mayores que las consultas que lo siguen
+        maximo = max(
+            limite_prefijo(clave) if es_prefijo else clave for clave, es_prefijo in consultas
+        )
+        claves_rango = len(arbol.keys(min=consultas[0][0], max=maximo))
+
+        if claves_rango > CLAVES_POR_CONSULTA_BARRIDO * len(consultas):
+            for clave, es_prefijo in consultas:
+                if es_prefijo:
+                    rango = arbol.items(min=clave, max=limite_prefijo(clave))
+                    resultados[clave, es_prefijo].extend(rango)
+                elif clave in arbol:
+                    resultados[clave, es_prefijo].append((clave, arbol[clave]))
+            return resultados
+
+        siguiente = 0
+        activos: List[str] = []  # Prefijos que pueden seguir coincidiendo
+
+        for termino, postings in arbol.items(min=consultas[0][0], max=maximo):
+            # Incorporar las consultas que la clave actual ya alcanzó
+            while siguiente < len(consultas) and consultas[siguiente][0] <= termino:
+                clave, es_prefijo = consultas[siguiente]
+                if es_prefijo:
+                    activos.append(clave)
+                elif clave == termino:
+                    resultados[clave, False].append((termino, postings))
+                siguiente += 1
+
+            # Un prefijo que deja de coincidir ya no coincide con claves mayores
+            activos = [prefijo for prefijo in activos if termino.startswith(prefijo)]
+            for prefijo in activos:
+                resultados[prefijo, True].append((termino, postings))
+
+            if not activos and siguiente == len(consultas):
+                break
 
         return resultados
 
-    def buscar_comodin_medio(self, patron: str) -> Dict[str, List[str]]:
+    def buscar_lote(self, patrones: List[str], ids: bool = False) -> List[Dict[str, List[str]]]:
+        """
+        Resuelve muchas búsquedas exactas, por prefijo y por sufijo a la vez.
+
+        Los patrones se normalizan, se ordenan y se deduplican; los exactos y
+        los prefijos se responden en un solo recorrido ordenado de `indice`
+        y los sufijos en otro de `indice_invertido`. Los patrones con otros
+        comodines se resuelven uno por uno con `buscar_comodin`.
+
+        Args:
+            patrones: Términos exactos ("hobbit"), prefijos ("hob*") o sufijos ("*ción")
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Una entrada por patrón, en el mismo orden, con el mismo formato que
+            `buscar_prefijo`: diccionario {término -> lista de documentos}
+        """
+        clasificados = []
+        for patron in patrones:
+            patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+            if "?" in patron_norm or patron_norm.count("*") > 1:
+                clasificados.append(("comodin", patron_norm))
+            elif patron_norm.endswith("*"):
+                clasificados.append(("prefijo", patron_norm[:-1]))
+            elif patron_norm.startswith("*"):
+                clasificados.append(("sufijo", patron_norm[1:][::-1]))
+            elif "*" in patron_norm:
+                clasificados.append(("comodin", patron_norm))
+            else:
+                clasificados.append(("exacto", patron_norm))
+
+        directas = sorted(
+            {
+                (clave, tipo == "prefijo")
+                for tipo, clave in clasificados
+                if tipo in ("exacto", "prefijo")
+            }
+        )
+        sufijos = sorted({(clave, True) for tipo, clave in clasificados if tipo == "sufijo"})
+
+        por_clave = self._barrer(self.indice, directas)
+        por_sufijo = self._barrer(self.indice_invertido, sufijos)
+
+        # Los patrones repetidos comparten la misma respuesta
+        respuestas: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        for tipo, clave in clasificados:
+            if (tipo, clave) in respuestas:
+                continue
+            if tipo == "comodin":
+                respuesta = self.buscar_comodin(clave, ids=ids)
+            elif tipo == "sufijo":
+                respuesta = {
+                    termino_inv[::-1]: self._resolver(postings, ids)
+                    for termino_inv, postings in por_sufijo[clave, True]
+                }
+            else:
+                respuesta = {
+                    termino: self._resolver(postings, ids)
+                    for termino, postings in por_clave[clave, tipo == "prefijo"]
+                }
+            respuestas[tipo, clave] = respuesta
+
+        return [respuestas[tipo, clave] for tipo, clave in clasificados]
+
+    def _contar_prefijo(self, arbol, prefijo: str) -> int:
+        """Cantidad de claves de `arbol` que empiezan con `prefijo`."""
+        if not prefijo:
+            return len(arbol)
+        # len() de un rango recorre buckets, no claves individuales
+        return len(arbol.keys(min=prefijo, max=limite_prefijo(prefijo)))
+
+    def planificar_comodin(self, patron: str) -> PlanComodin:
+        """
+        Devuelve el plan con el que `buscar_comodin` resolvería el patrón.
+
+        Útil para depurar: indica el árbol elegido, la clave recorrida y la
+        cantidad estimada de claves a revisar.
+
+        Args:
+            patron: Patrón con comodines
+
+        Returns:
+            PlanComodin elegido
+        """
+        return self._planificar_comodin(self.tokenizador.normalizar_patron(patron, "*?"))
+
+    def _planificar_comodin(self, patron_norm: str) -> PlanComodin:
+        """
+        Elige la forma más barata de generar candidatos para un patrón.
+
+        Compara la cantidad de claves del rango del prefijo literal en
+        `indice`, del sufijo literal en `indice_invertido` y, si existen, de
+        los índices de k-gramas y permuterm, contra recorrer todo el
+        vocabulario. La regex se aplica después solo a los candidatos.
+        """
+        prefijo, sufijo = prefijo_sufijo_literal(patron_norm)
+
+        if "*" not in patron_norm and "?" not in patron_norm:
+            return PlanComodin("exacto", patron_norm, 1, prefijo, sufijo)
+
+        planes = [PlanComodin("recorrido", "", len(self.indice), prefijo, sufijo)]
+
+        if prefijo:
+            estimacion = self._contar_prefijo(self.indice, prefijo)
+            planes.append(PlanComodin("prefijo", prefijo, estimacion, prefijo, sufijo))
+        if sufijo:
+            estimacion = self._contar_prefijo(self.indice_invertido, sufijo[::-1])
+            planes.append(PlanComodin("sufijo", sufijo[::-1], estimacion, prefijo, sufijo))
+
+        if self.kgramas is not None:
+            kgramas = kgramas_de_patron(patron_norm, self.k)
+            if kgramas:
+                # El k-grama menos frecuente acota la cantidad de candidatos
+                estimacion = min(
+                    len(self.kgramas[kgrama]) if kgrama in self.kgramas else 0
+                    for kgrama in kgramas
+                )
+                planes.append(PlanComodin("kgramas", "", estimacion, prefijo, sufijo))
+
+        if self.permuterm is not None:
+            clave = clave_permuterm(patron_norm)
+            estimacion = self._contar_prefijo(self.permuterm, clave)
+            planes.append(PlanComodin("permuterm", clave, estimacion, prefijo, sufijo))
+
+        # min conserva el primero ante empates: se prefieren los planes sin orden extra
+        return min(planes, key=lambda plan: plan.estimacion)
+
+    def _candidatos_plan(
+        self, plan: PlanComodin, patron_norm: str
+    ) -> Iterator[Tuple[str, Optional[IITreeSet]]]:
+        """
+        Genera los términos candidatos de un plan, con sus postings si ya están a mano.
+        """
+        if plan.estrategia == "exacto":
+            postings = self.indice.get(plan.clave)
+            if postings is not None:
+                yield plan.clave, postings
+        elif plan.estrategia == "prefijo":
+            yield from self.indice.items(min=plan.clave, max=limite_prefijo(plan.clave))
+        elif plan.estrategia == "sufijo":
+            rango = self.indice_invertido.items(min=plan.clave, max=limite_prefijo(plan.clave))
+            for termino_inv, postings in rango:
+                yield termino_inv[::-1], postings
+        elif plan.estrategia == "kgramas":
+            for termino in self._candidatos_kgramas(patron_norm) or ():
+                yield termino, None
+        elif plan.estrategia == "permuterm":
+            for termino in self._candidatos_permuterm(patron_norm):
+                yield termino, None
+        else:
+            yield from self.indice.items()
+
+    @_cacheado(
+        "comodin_medio", lambda indice, texto: indice.tokenizador.normalizar_patron(texto, "*")
+    )
+    def buscar_comodin_medio(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
         """
         Busca términos con comodín en el medio (prefijo*sufijo).
         Usa ambos árboles B+ para eficiencia: índice para prefijo,
@@ -197,18 +1356,18 @@ class IndiceOrdenado(Persistent):
 
         Args:
             patron: Patrón con * en el medio (ej: "ca*do")
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
 
         Returns:
-            Diccionario {término -> lista de documentos}
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
         """
         # Normalizar patron
-        patron_norm = patron.lower()
-        patron_norm = re.sub(r"[^\w*]", "", patron_norm)
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*")
 
         # Verificar que tenga exactamente un * en el medio
         if patron_norm.count("*") != 1:
             # Si no tiene exactamente un *, usar búsqueda normal
-            return self.buscar_comodin(patron)
+            return self.buscar_comodin(patron, ids=ids)
 
         # Separar en prefijo y sufijo
         partes = patron_norm.split("*")
@@ -220,12 +1379,12 @@ class IndiceOrdenado(Persistent):
 
         # Si prefijo o sufijo vacíos, usar métodos especializados
         if not prefijo:
-            return self.buscar_sufijo(sufijo)
+            return self.buscar_sufijo(sufijo, ids=ids)
         if not sufijo:
-            return self.buscar_prefijo(prefijo)
+            return self.buscar_prefijo(prefijo, ids=ids)
 
         # 1. Buscar términos con el prefijo en el índice normal
-        terminos_con_prefijo = set()
+        terminos_con_prefijo = OOSet()
         for termino in self.indice.keys(min=prefijo):
             if not termino.startswith(prefijo):
                 break
@@ -233,45 +1392,524 @@ class IndiceOrdenado(Persistent):
 
         # 2. Buscar términos con el sufijo en el índice con palabras invertidas
         sufijo_invertido = sufijo[::-1]
-        terminos_con_sufijo = set()
+        terminos_con_sufijo = OOSet()
         for termino_inv in self.indice_invertido.keys(min=sufijo_invertido):
             if not termino_inv.startswith(sufijo_invertido):
                 break
             termino = termino_inv[::-1]
             terminos_con_sufijo.add(termino)
 
-        # 3. Intersección (AND) de ambos conjuntos de términos
-        terminos_coincidentes = terminos_con_prefijo & terminos_con_sufijo
+        # 3. Intersección (AND) de ambos conjuntos de términos (ya ordenada)
+        terminos_coincidentes = intersection_terminos(terminos_con_prefijo, terminos_con_sufijo)
 
         # 4. Construir resultado con documentos
         resultados = {}
-        for termino in sorted(terminos_coincidentes):
-            doc_ids = sorted(self.indice[termino])
-            nombres_docs = [self.documentos[doc_id] for doc_id in doc_ids]
-            resultados[termino] = nombres_docs
+        for termino in terminos_coincidentes:
+            resultados[termino] = self._resolver(self.indice[termino], ids)
 
         return resultados
 
+    def _rango(self, arbol, prefijo: str, cursor: Optional[str]):
+        """items() de las claves de `arbol` con `prefijo`, posteriores a `cursor`."""
+        if cursor is None:
+            return arbol.items(min=prefijo, max=limite_prefijo(prefijo))
+        # Reanudar después de la última clave vista, sin volver a recorrer
+        return arbol.items(min=cursor, max=limite_prefijo(prefijo), excludemin=True)
+
+    def _recorrer_prefijo(
+        self, prefijo_norm: str, cursor: Optional[str]
+    ) -> Iterator[Tuple[str, str, IITreeSet]]:
+        for termino, postings in self._rango(self.indice, prefijo_norm, cursor):
+            yield termino, termino, postings
+
+    def _recorrer_sufijo(
+        self, sufijo_invertido: str, cursor: Optional[str]
+    ) -> Iterator[Tuple[str, str, IITreeSet]]:
+        for termino_inv, postings in self._rango(self.indice_invertido, sufijo_invertido, cursor):
+            yield termino_inv, termino_inv[::-1], postings
+
+    def _recorrer_comodin(
+        self, patron_norm: str, cursor: Optional[str]
+    ) -> Iterator[Tuple[str, str, IITreeSet]]:
+        regex = patron_a_regex(patron_norm)
+        if regex is None:
+            return
+        plan = self._planificar_comodin(patron_norm)
+
+        if plan.estrategia in ("prefijo", "recorrido"):
+            recorrido = self._recorrer_prefijo(plan.clave, cursor)
+        elif plan.estrategia == "sufijo":
+            recorrido = self._recorrer_sufijo(plan.clave, cursor)
+        else:
+            # exacto, k-gramas y permuterm: pocos candidatos, sin orden propio
+            terminos = sorted(
+                termino
+                for termino, _ in self._candidatos_plan(plan, patron_norm)
+                if cursor is None or termino > cursor
+            )
+            recorrido = ((termino, termino, self.indice[termino]) for termino in terminos)
+
+        for clave, termino, postings in recorrido:
+            if regex.match(termino):
+                yield clave, termino, postings
+
+    def _items_rango(
+        self,
+        arbol,
+        minimo: Optional[str],
+        maximo: Optional[str],
+        incluir_min: bool,
+        incluir_max: bool,
+        limite: Optional[int],
+    ):
+        """items() de `arbol` entre dos claves, sin copiar el rango."""
+        rango = {}
+        # excludemin/excludemax sin cota excluirían la primera/última clave del árbol
+        if minimo is not None:
+            rango.update(min=minimo, excludemin=not incluir_min)
+        if maximo is not None:
+            rango.update(max=maximo, excludemax=not incluir_max)
+        return islice(arbol.items(**rango), limite)
+
+    def buscar_rango(
+        self,
+        minimo: Optional[str] = None,
+        maximo: Optional[str] = None,
+        incluir_min: bool = True,
+        incluir_max: bool = True,
+        limite: Optional[int] = None,
+    ) -> Iterator[Tuple[str, IITreeSet]]:
+        """
+        Recorre los términos entre `minimo` y `maximo` en orden lexicográfico.
+
+        Los pares salen directamente de `OOBTree.items(min, max, ...)` a
+        medida que se consumen, así que exportar una porción del vocabulario
+        usa memoria constante.
+
+        Args:
+            minimo: Cota inferior (None = desde el primer término)
+            maximo: Cota superior (None = hasta el último término)
+            incluir_min: Incluir `minimo` si es un término del índice
+            incluir_max: Incluir `maximo` si es un término del índice
+            limite: Máximo de términos a generar (None = sin límite)
+
+        Returns:
+            Iterador de pares (término, doc_ids)
+        """
+        minimo = None if minimo is None else self.normalizar_termino(minimo)
+        maximo = None if maximo is None else self.normalizar_termino(maximo)
+        return self._items_rango(self.indice, minimo, maximo, incluir_min, incluir_max, limite)
+
+    def buscar_rango_invertido(
+        self,
+        minimo: Optional[str] = None,
+        maximo: Optional[str] = None,
+        incluir_min: bool = True,
+        incluir_max: bool = True,
+        limite: Optional[int] = None,
+    ) -> Iterator[Tuple[str, IITreeSet]]:
+        """
+        Como `buscar_rango`, pero sobre el árbol de términos invertidos.
+
+        Las cotas son claves de ese árbol, es decir, términos escritos al
+        revés: ("oda", "odb") recorre los terminados en "ado". Los términos
+        se devuelven al derecho, agrupados por terminación.
+
+        Args:
+            minimo: Cota inferior, escrita al revés (None = sin cota)
+            maximo: Cota superior, escrita al revés (None = sin cota)
+            incluir_min: Incluir `minimo` si es una clave del árbol
+            incluir_max: Incluir `maximo` si es una clave del árbol
+            limite: Máximo de términos a generar (None = sin límite)
+
+        Returns:
+            Iterador de pares (término, doc_ids)
+        """
+        minimo = None if minimo is None else self.normalizar_termino(minimo)
+        maximo = None if maximo is None else self.normalizar_termino(maximo)
+        rango = self._items_rango(
+            self.indice_invertido, minimo, maximo, incluir_min, incluir_max, limite
+        )
+        return ((termino_inv[::-1], postings) for termino_inv, postings in rango)
+
+    def paginar_prefijo(
+        self, prefijo: str, limite: int = 20, cursor: Optional[str] = None
+    ) -> Pagina:
+        """
+        Versión paginada de `buscar_prefijo`.
+
+        Recorre solo las claves necesarias para llenar la página y no
+        resuelve nombres de documentos: devuelve los doc_ids de cada término.
+
+        Args:
+            prefijo: Prefijo a buscar
+            limite: Términos por página
+            cursor: Cursor de la página anterior, o None para la primera
+
+        Returns:
+            Pagina con hasta `limite` pares (término, doc_ids) y el cursor siguiente
+        """
+        return _paginar(self._recorrer_prefijo(self.normalizar_termino(prefijo), cursor), limite)
+
+    def paginar_sufijo(
+        self, sufijo: str, limite: int = 20, cursor: Optional[str] = None
+    ) -> Pagina:
+        """
+        Versión paginada de `buscar_sufijo`.
+
+        Los términos salen en el orden del índice invertido (por sufijo), que
+        es el que permite reanudar el recorrido desde el cursor.
+
+        Args:
+            sufijo: Sufijo a buscar
+            limite: Términos por página
+            cursor: Cursor de la página anterior, o None para la primera
+
+        Returns:
+            Pagina con hasta `limite` pares (término, doc_ids) y el cursor siguiente
+        """
+        sufijo_invertido = self.normalizar_termino(sufijo)[::-1]
+        return _paginar(self._recorrer_sufijo(sufijo_invertido, cursor), limite)
+
+    def paginar_comodin(
+        self, patron: str, limite: int = 20, cursor: Optional[str] = None
+    ) -> Pagina:
+        """
+        Versión paginada de `buscar_comodin`.
+
+        El orden de los términos es el del árbol que recorre el plan elegido
+        (alfabético, o por sufijo si se usa el índice invertido). El cursor
+        solo es válido para el mismo patrón mientras el índice no cambie.
+
+        Args:
+            patron: Patrón con comodines
+            limite: Términos por página
+            cursor: Cursor de la página anterior, o None para la primera
+
+        Returns:
+            Pagina con hasta `limite` pares (término, doc_ids) y el cursor siguiente
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        return _paginar(self._recorrer_comodin(patron_norm, cursor), limite)
+
+    def paginar_comodin_medio(
+        self, patron: str, limite: int = 20, cursor: Optional[str] = None
+    ) -> Pagina:
+        """
+        Versión paginada de `buscar_comodin_medio`.
+
+        El planificador ya elige entre el rango del prefijo y el del sufijo,
+        así que basta con recorrer el plan de `paginar_comodin`.
+
+        Args:
+            patron: Patrón con * en el medio (ej: "ca*do")
+            limite: Términos por página
+            cursor: Cursor de la página anterior, o None para la primera
+
+        Returns:
+            Pagina con hasta `limite` pares (término, doc_ids) y el cursor siguiente
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*")
+        if patron_norm.count("*") != 1:
+            # Igual que buscar_comodin_medio: sin un único *, búsqueda normal
+            return self.paginar_comodin(patron, limite, cursor)
+        return _paginar(self._recorrer_comodin(patron_norm, cursor), limite)
+
+    def _verificar_posicional(self):
+        if self.posiciones is None:
+            raise ValueError(
+                "El índice no es posicional: créalo con 'python indexar.py --posicional'"
+            )
+
+    def _posiciones_en(self, termino: str, doc_id: int) -> List[int]:
+        return decodificar_posiciones(self.posiciones[termino][doc_id])
+
+    def _documentos_con_todos(self, terminos: Iterable[str]):
+        """Intersección de los postings de los términos, de menor a mayor tamaño."""
+        postings = []
+        for termino in set(terminos):
+            docs = self.indice.get(termino)
+            if docs is None:
+                return None
+            postings.append(docs)
+
+        postings.sort(key=len)
+        resultado = postings[0]
+        for docs in postings[1:]:
+            resultado = intersection_postings(resultado, docs)
+            if not resultado:
+                break
+
+        return resultado
+
+    def frecuencias(self, termino: str) -> Dict[str, int]:
+        """
+        Frecuencia de un término en cada documento que lo contiene (modo posicional).
+
+        Args:
+            termino: Término a buscar
+
+        Returns:
+            Diccionario {documento -> cantidad de apariciones}
+        """
+        self._verificar_posicional()
+        termino_norm = self.normalizar_termino(termino)
+
+        por_documento = self.posiciones.get(termino_norm)
+        if por_documento is None:
+            return {}
+
+        tabla = self.tabla_documentos
+        return {tabla[doc_id]: frecuencia(blob) for doc_id, blob in por_documento.items()}
+
+    def buscar_frase(self, frase: str) -> List[str]:
+        """
+        Busca documentos que contienen los términos de la frase consecutivos.
+
+        Primero intersecta los postings (del más chico al más grande) y solo
+        decodifica posiciones de los documentos candidatos.
+
+        Args:
+            frase: Frase a buscar (ej: "el anillo único")
+
+        Returns:
+            Lista de nombres de documentos que contienen la frase
+        """
+        self._verificar_posicional()
+        tokens = self.tokenizador.tokens(frase)
+        if not tokens:
+            return []
+
+        candidatos = self._documentos_con_todos(tokens)
+        if not candidatos:
+            return []
+        if len(tokens) == 1:
+            return self.nombres_documentos(candidatos)
+
+        doc_ids = []
+        for doc_id in candidatos:
+            inicios = self._posiciones_en(tokens[0], doc_id)
+            siguientes = [set(self._posiciones_en(token, doc_id)) for token in tokens[1:]]
+
+            for inicio in inicios:
+                if all(inicio + i in posiciones for i, posiciones in enumerate(siguientes, 1)):
+                    doc_ids.append(doc_id)
+                    break
+
+        return self.nombres_documentos(doc_ids)
+
+    def buscar_proximidad(self, termino1: str, termino2: str, distancia: int) -> List[str]:
+        """
+        Busca documentos donde dos términos aparecen a `distancia` palabras o menos.
+
+        Args:
+            termino1: Primer término
+            termino2: Segundo término
+            distancia: Separación máxima en posiciones (1 = adyacentes)
+
+        Returns:
+            Lista de nombres de documentos
+        """
+        self._verificar_posicional()
+        termino1 = self.normalizar_termino(termino1)
+        termino2 = self.normalizar_termino(termino2)
+
+        candidatos = self._documentos_con_todos([termino1, termino2])
+        if not candidatos:
+            return []
+
+        doc_ids = [
+            doc_id
+            for doc_id in candidatos
+            if hay_proximidad(
+                self._posiciones_en(termino1, doc_id),
+                self._posiciones_en(termino2, doc_id),
+                distancia,
+            )
+        ]
+
+        return self.nombres_documentos(doc_ids)
+
     def obtener_estadisticas(self) -> Dict:
         """Retorna estadísticas del índice."""
         return {
             "total_terminos": len(self.indice),
             "total_documentos": len(self.documentos),
             "documentos": list(self.documentos.values()),
+            "posicional": self.posiciones is not None,
+            "permuterm_rotaciones": len(self.permuterm) if self.permuterm is not None else 0,
+            "kgramas": len(self.kgramas) if self.kgramas is not None else 0,
+            "k": self.k,
+            "autocompletado_prefijos": (
+                len(self.autocompletado) if self.autocompletado is not None else 0
+            ),
+            "largo_autocompletado": self.largo_autocompletado,
         }
 
 
-def crear_indice(directorio_corpus: str, archivo_db: str = "indice.fs") -> IndiceOrdenado:
+def pico_memoria_mb() -> float:
+    """Pico de memoria residente (RSS) del proceso en MB, o 0 si no se puede medir."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS informa bytes
+    if sys.platform == "darwin":
+        return pico / (1024 * 1024)
+    return pico / 1024
+
+
+def _documentos_tokenizados(
+    archivos: List[Path], procesos: int, tokenizador: Tokenizador, posicional: bool = False
+) -> Iterator[Tuple[Path, Union[List[str], Dict[str, bytes]], str, Optional[str]]]:
+    """
+    Tokeniza los archivos del corpus, en paralelo si `procesos` > 1.
+
+    Returns:
+        Iterador de (archivo, términos, hash, error) en el orden de `archivos`
+    """
+    if procesos > 1 and len(archivos) > 1:
+        print(f"  (tokenizando con {procesos} procesos)")
+        tokenizar = partial(tokenizar_archivo, tokenizador=tokenizador, posicional=posicional)
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            # map conserva el orden de entrada: doc_ids deterministas
+            tokenizados = pool.map(tokenizar, map(str, archivos), chunksize=4)
+            for archivo, (terminos, huella, error) in zip(archivos, tokenizados):
+                yield archivo, terminos, huella, error
+    else:
+        for archivo in archivos:
+            terminos, huella, error = tokenizar_archivo(str(archivo), tokenizador, posicional)
+            yield archivo, terminos, huella, error
+
+
+def _limpiar_indice(indice: IndiceOrdenado):
+    """Vacía todas las estructuras del índice para una reconstrucción completa."""
+    indice.asegurar_estructuras()
+    indice.indice.clear()
+    indice.indice_invertido.clear()
+    if isinstance(indice.documentos, IOBTree):
+        indice.documentos.clear()
+    else:
+        indice.documentos = IOBTree()
+    indice.terminos_documento.clear()
+    indice.archivos.clear()
+    indice.frecuencia_documentos.clear()
+    indice.autocompletado = None
+    indice.largo_autocompletado = 0
+    indice.autocompletado_vigente = False
+    indice.generacion += 1
+    if indice.posiciones is not None:
+        indice.posiciones.clear()
+    if indice.permuterm is not None:
+        indice.permuterm.clear()
+    indice.kgramas = None
+    indice.k = 0
+    indice.doc_counter = 0
+
+
+def _archivos_pendientes(indice: IndiceOrdenado, archivos: List[Path]) -> List[Path]:
+    """
+    Quita del índice los archivos borrados y devuelve los nuevos o modificados.
+
+    Un archivo con el mismo tamaño y mtime que el registrado se considera sin
+    cambios sin leerlo; el hash del contenido se compara después de tokenizar.
+    """
+    vigentes = {archivo.name for archivo in archivos}
+
+    for nombre_archivo in list(indice.archivos.keys()):
+        if nombre_archivo not in vigentes:
+            doc_id = indice.archivos[nombre_archivo][0]
+            print(f"  - Eliminando: {Path(nombre_archivo).stem}")
+            indice.eliminar_documento(doc_id)
+            del indice.archivos[nombre_archivo]
+
+    pendientes = []
+    for archivo in archivos:
+        registro = indice.archivos.get(archivo.name)
+        info = archivo.stat()
+        if registro is not None and registro[1:3] == (info.st_size, info.st_mtime_ns):
+            continue
+        pendientes.append(archivo)
+
+    return pendientes
+
+
+def crear_indice(
+    directorio_corpus: str,
+    archivo_db: str = "indice.fs",
+    procesos: int = 1,
+    masivo: bool = False,
+    max_postings_bloque: int = 1_000_000,
+    incremental: bool = False,
+    tokenizador: Optional[Tokenizador] = None,
+    posicional: bool = False,
+    permuterm: bool = False,
+    kgramas: int = 0,
+    autocompletado: int = 0,
+    particiones: int = 0,
+    plegar_acentos: bool = False,
+    largo_minimo: int = 1,
+    largo_maximo: int = 0,
+) -> IndiceOrdenado:
     """
     Crea un índice a partir de los documentos en el directorio corpus.
 
+    Con `procesos` > 1 la lectura y tokenización de los archivos se reparte
+    en un pool de procesos; el proceso principal solo inserta los términos
+    en los árboles B+. Los doc_ids se asignan en el orden de los archivos,
+    por lo que el resultado es el mismo que en modo secuencial.
+
+    Con `masivo` los postings se vuelcan en runs ordenados a `tmp/` y los
+    árboles se llenan en orden de clave tras un merge de k vías (ver
+    carga_masiva.py), lo que permite indexar corpus más grandes que la RAM.
+
+    Con `incremental` no se reconstruye el índice: se comparan tamaño, mtime
+    y hash de cada archivo con los guardados en la base, se indexan solo los
+    archivos nuevos o modificados y se quitan de los postings los documentos
+    borrados o reemplazados.
+
+    Con `particiones` > 0, al terminar se reparte el vocabulario en ese
+    número de archivos por rangos de claves, con un mapa de límites al lado
+    de `archivo_db` (ver particiones.py); `archivo_db` sigue siendo la copia
+    completa sobre la que se hacen las actualizaciones. Si la base ya estaba
+    particionada y no se indica `particiones`, se vuelve a repartir en la
+    misma cantidad de archivos para que las particiones no queden viejas.
+
     Args:
         directorio_corpus: Directorio con los archivos .txt
         archivo_db: Archivo de base de datos ZODB
+        procesos: Cantidad de procesos para tokenizar (1 = secuencial)
+        masivo: Construir los árboles con la carga masiva ordenada
+        max_postings_bloque: Postings por bloque en memoria (solo modo masivo)
+        incremental: Actualizar solo los archivos que cambiaron (con otro
+            tokenizador se reconstruye todo)
+        tokenizador: Tokenizador a guardar en el índice (None = el actual)
+        posicional: Guardar frecuencias y posiciones (frases y proximidad)
+        permuterm: Mantener el árbol permuterm para búsquedas con comodines
+        kgramas: Largo k del índice de k-gramas para comodines (0 = sin índice)
+        autocompletado: Largo máximo de los prefijos con completados
+            precalculados (0 = sin caché); en modo incremental se conserva
+            el largo con el que se creó el índice
+        particiones: Archivos en los que repartir el vocabulario (0 = los
+            mismos que ya tenía la base, o ninguno)
+        plegar_acentos: Sin `tokenizador`, usar uno que quite acentos y diacríticos
+        largo_minimo: Sin `tokenizador`, descartar los términos más cortos
+        largo_maximo: Sin `tokenizador`, descartar los términos más largos (0 = sin límite)
 
     Returns:
         IndiceOrdenado persistido en disco
     """
+    inicio = time.perf_counter()
+
+    if incremental and masivo:
+        print("  (la carga masiva solo aplica a reconstrucciones, se ignora)")
+        masivo = False
+
+    if tokenizador is None and (plegar_acentos or largo_minimo > 1 or largo_maximo):
+        tokenizador = Tokenizador(plegar_acentos, largo_minimo, largo_maximo)
+
     # Abrir/crear la base de datos ZODB
     storage = ZODB.FileStorage.FileStorage(archivo_db)
     db = ZODB.DB(storage)
@@ -281,49 +1919,154 @@ def crear_indice(directorio_corpus: str, archivo_db: str = "indice.fs") -> Indic
     # Crear nuevo índice o recuperar existente
     if not hasattr(root, "indice"):
         print("Creando nuevo índice...")
-        indice = IndiceOrdenado()
+        indice = IndiceOrdenado(
+            posicional=posicional,
+            permuterm=permuterm and not masivo,
+            kgramas=0 if masivo else kgramas,
+        )
         root.indice = indice
     else:
         print("Recuperando índice existente...")
         indice = root.indice
-        # Limpiar índice existente
-        indice.indice.clear()
-        if hasattr(indice, "indice_invertido"):
-            indice.indice_invertido.clear()
+        indice.asegurar_estructuras()
+        if incremental and indice.documentos and not indice.archivos:
+            # Índice de una versión anterior: no hay metadatos para comparar
+            print("  (el índice no tiene metadatos de archivos, se reconstruye)")
+            incremental = False
+        if incremental and indice.posiciones is not None:
+            # La actualización mantiene el modo con el que se creó el índice
+            posicional = True
+        if incremental and posicional and indice.posiciones is None:
+            print("  (el índice no es posicional, se reconstruye)")
+            incremental = False
+        if incremental and tokenizador is not None and tokenizador != indice.tokenizador:
+            # Los documentos sin cambios quedarían con los términos del anterior
+            print("  (cambió el tokenizador, se reconstruye)")
+            incremental = False
+        if incremental and indice.necesita_migracion():
+            indice.migrar()
+        if incremental and not autocompletado:
+            autocompletado = indice.largo_autocompletado
+        if not incremental:
+            # Limpiar índice existente
+            _limpiar_indice(indice)
+            if posicional and indice.posiciones is None:
+                indice.posiciones = OOBTree()
+            elif not posicional:
+                indice.posiciones = None
+            # En modo masivo el permuterm se construye al final, en orden
+            if permuterm and not masivo and indice.permuterm is None:
+                indice.permuterm = OOBTree()
+            elif not permuterm or masivo:
+                indice.permuterm = None
+            if kgramas and not masivo:
+                indice._iniciar_kgramas(kgramas)
         else:
-            indice.indice_invertido = OOBTree()
-        indice.documentos.clear()
-        indice.doc_counter = 0
+            # Se construyen sobre el vocabulario existente y luego se mantienen
+            if permuterm and indice.permuterm is None:
+                print("  (construyendo árbol permuterm)")
+                indice.construir_permuterm()
+            if kgramas and kgramas != indice.k:
+                print(f"  (construyendo índice de {kgramas}-gramas)")
+                indice.construir_kgramas(kgramas)
+
+    if tokenizador is not None:
+        indice.tokenizador = tokenizador
 
     # Indexar documentos
     corpus_path = Path(directorio_corpus)
     archivos = sorted(corpus_path.glob("*.txt"))
 
-    print(f"\nIndexando {len(archivos)} documentos...")
-
-    for archivo in archivos:
-        nombre_doc = archivo.stem  # Nombre sin extensión
-        print(f"  - Indexando: {nombre_doc}")
-
-        try:
-            with open(archivo, "r", encoding="utf-8") as f:
-                contenido = f.read()
-
-            doc_id = indice.agregar_documento(nombre_doc, contenido)
-
-        except Exception as e:
-            print(f"    Error al procesar {archivo}: {e}")
-            continue
+    if incremental:
+        archivos = _archivos_pendientes(indice, archivos)
+        print(f"\nActualizando {len(archivos)} documentos nuevos o modificados...")
+    else:
+        print(f"\nIndexando {len(archivos)} documentos...")
+
+    constructor = None
+    if masivo:
+        constructor = ConstructorMasivo("tmp", max_postings_bloque)
+
+    try:
+        for archivo, terminos, huella, error in _documentos_tokenizados(
+            archivos, procesos, indice.tokenizador, posicional
+        ):
+            nombre_doc = archivo.stem  # Nombre sin extensión
+
+            if error is not None:
+                print(f"  - Indexando: {nombre_doc}")
+                print(f"    Error al procesar {archivo}: {error}")
+                continue
+
+            info = archivo.stat()
+            registro = indice.archivos.get(archivo.name)
+            if registro is not None:
+                if registro[3] == huella:
+                    # Solo cambió el mtime: actualizar metadatos
+                    indice.registrar_archivo(
+                        archivo.name, registro[0], info.st_size, info.st_mtime_ns, huella
+                    )
+                    continue
+                indice.eliminar_documento(registro[0])
+
+            print(f"  - Indexando: {nombre_doc}")
+
+            if constructor is None:
+                doc_id = indice.agregar_terminos(nombre_doc, terminos)
+            else:
+                doc_id = indice.registrar_documento(nombre_doc, terminos)
+                constructor.agregar(doc_id, terminos)
+
+            if posicional:
+                indice.agregar_posiciones(doc_id, terminos)
+
+            indice.registrar_archivo(
+                archivo.name, doc_id, info.st_size, info.st_mtime_ns, huella
+            )
+
+        if constructor is not None:
+            carga = constructor.cargar(indice)
+            print(f"  (carga masiva: {carga['runs']} runs fusionados)")
+            indice.construir_frecuencias()
+            if permuterm:
+                indice.construir_permuterm()
+            if kgramas:
+                indice.construir_kgramas(kgramas)
+    finally:
+        if constructor is not None:
+            constructor.limpiar()
+
+    # Las altas y bajas ya corrigieron las listas de autocompletado; se
+    # construyen enteras solo en un índice nuevo, tras la carga masiva o
+    # si cambió el largo de los prefijos
+    if autocompletado and not (
+        indice.autocompletado_vigente and indice.largo_autocompletado == autocompletado
+    ):
+        indice.construir_autocompletado(autocompletado)
+
+    # Cada commit es una generación nueva: las cachés de otros procesos se invalidan
+    indice.generacion += 1
 
     # Confirmar transacción
     transaction.commit()
 
     # Mostrar estadísticas
     stats = indice.obtener_estadisticas()
-    print(f"\n✓ Índice creado exitosamente:")
+    print(f"\n✓ Índice {'actualizado' if incremental else 'creado'} exitosamente:")
     print(f"  - Términos únicos: {stats['total_terminos']}")
     print(f"  - Documentos indexados: {stats['total_documentos']}")
     print(f"  - Archivo de índice: {archivo_db}")
+    print(f"  - Tiempo de construcción: {time.perf_counter() - inicio:.2f} s")
+    print(f"  - Pico de memoria (RSS): {pico_memoria_mb():.1f} MB")
+
+    if not particiones:
+        particiones = cantidad_particiones(archivo_db)
+    if particiones:
+        resumen = particionar_indice(indice, archivo_db, particiones)
+        print(
+            f"  - Particiones: {resumen['particiones']} ({resumen['bytes'] / 1024:.1f} KB, "
+            f"mapa en {ruta_mapa(archivo_db)})"
+        )
 
     # Cerrar conexión
     connection.close()
@@ -332,19 +2075,223 @@ def crear_indice(directorio_corpus: str, archivo_db: str = "indice.fs") -> Indic
     return indice
 
 
+def migrar_indice(archivo_db: str = "index/indice.fs") -> int:
+    """
+    Migra un índice existente al formato de postings enteros (IITreeSet/IOBTree).
+
+    Args:
+        archivo_db: Archivo de base de datos ZODB
+
+    Returns:
+        Cantidad de postings convertidos
+    """
+    storage = ZODB.FileStorage.FileStorage(archivo_db)
+    db = ZODB.DB(storage)
+    connection = db.open()
+    root = connection.root()
+
+    try:
+        if not hasattr(root, "indice"):
+            print(f"Error: El índice no está inicializado en '{archivo_db}'")
+            return 0
+
+        indice = root.indice
+        indice.__class__ = IndiceOrdenado
+
+        if not indice.necesita_migracion():
+            print("✓ El índice ya usa postings enteros, no hay nada que migrar")
+            return 0
+
+        print("Migrando postings a IITreeSet...")
+        convertidos = indice.migrar()
+        transaction.commit()
+        print(f"✓ Postings convertidos: {convertidos}")
+        return convertidos
+    finally:
+        connection.close()
+        db.close()
+
+
+def exportar_instantanea(
+    archivo_db: str = "index/indice.fs",
+    ruta: str = "index/indice.snap",
+    bloque_vocabulario: int = 0,
+) -> Dict[str, int]:
+    """
+    Exporta el índice a una instantánea de solo lectura para consultas con mmap.
+
+    Args:
+        archivo_db: Archivo de base de datos ZODB
+        ruta: Archivo de la instantánea (ver instantanea.py)
+        bloque_vocabulario: Términos por bloque de front-coding del
+            vocabulario (0 = términos completos, ver vocabulario.py)
+
+    Returns:
+        Diccionario con términos, documentos y bytes escritos
+    """
+    storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+    db = ZODB.DB(storage)
+    connection = db.open()
+    root = connection.root()
+
+    try:
+        if not hasattr(root, "indice"):
+            print(f"Error: El índice no está inicializado en '{archivo_db}'")
+            return {}
+
+        indice = root.indice
+        indice.__class__ = IndiceOrdenado
+
+        inicio = time.time()
+        resumen = escribir_instantanea(indice, ruta, bloque_vocabulario)
+        print(
+            f"✓ Instantánea '{ruta}': {resumen['terminos']:,} términos, "
+            f"{resumen['documentos']:,} documentos, {resumen['bytes'] / 1024:.1f} KB "
+            f"({time.time() - inicio:.2f}s)"
+        )
+        return resumen
+    finally:
+        # Solo lectura: descartar lo que haya marcado el cambio de clase
+        transaction.abort()
+        connection.close()
+        db.close()
+
+
 def main():
     """Función principal para crear el índice."""
-    directorio_corpus = "corpus"
-    archivo_db = "index/indice.fs"
+    parser = argparse.ArgumentParser(description="Crea el índice ordenado del corpus.")
+    parser.add_argument("--corpus", default="corpus", help="Directorio con los archivos .txt")
+    parser.add_argument("--db", default="index/indice.fs", help="Archivo de base de datos ZODB")
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=1,
+        help="Procesos para tokenizar en paralelo (0 = todos los núcleos)",
+    )
+    parser.add_argument(
+        "--masivo",
+        action="store_true",
+        help="Construir los árboles con runs ordenados en tmp/ (corpus grandes)",
+    )
+    parser.add_argument(
+        "--bloque",
+        type=int,
+        default=1_000_000,
+        help="Postings por bloque en memoria en modo masivo",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Indexar solo archivos nuevos o modificados y quitar los borrados",
+    )
+    parser.add_argument(
+        "--posicional",
+        action="store_true",
+        help="Guardar frecuencias y posiciones para búsquedas de frases",
+    )
+    parser.add_argument(
+        "--permuterm",
+        action="store_true",
+        help="Mantener un árbol permuterm para búsquedas con comodines",
+    )
+    parser.add_argument(
+        "--kgramas",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Construir un índice de k-gramas de largo K para comodines (ej: 3)",
+    )
+    parser.add_argument(
+        "--autocompletado",
+        type=int,
+        default=0,
+        metavar="LARGO",
+        help="Precalcular el top-k de completados para prefijos de hasta LARGO letras",
+    )
+    parser.add_argument(
+        "--migrar", action="store_true", help="Migrar un índice existente a postings enteros"
+    )
+    parser.add_argument(
+        "--exportar",
+        metavar="RUTA",
+        help="Exportar el índice existente a una instantánea de solo lectura (ej: index/indice.snap)",
+    )
+    parser.add_argument(
+        "--bloque-vocabulario",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Con --exportar, comprimir el vocabulario con front-coding en bloques de N términos",
+    )
+    parser.add_argument(
+        "--particiones",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Repartir además el vocabulario en N archivos por rangos de claves",
+    )
+    parser.add_argument(
+        "--plegar-acentos",
+        action="store_true",
+        help="Quitar acentos y diacríticos de los términos (canción -> cancion)",
+    )
+    parser.add_argument(
+        "--largo-minimo",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Descartar los términos de menos de N caracteres",
+    )
+    parser.add_argument(
+        "--largo-maximo",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Descartar los términos de más de N caracteres (0 = sin límite)",
+    )
+    args = parser.parse_args()
+
+    directorio_corpus = args.corpus
+    archivo_db = args.db
+    procesos = args.procesos if args.procesos > 0 else (os.cpu_count() or 1)
+
+    if args.migrar:
+        if not os.path.exists(archivo_db):
+            print(f"Error: No existe el índice '{archivo_db}'")
+            sys.exit(1)
+        migrar_indice(archivo_db)
+        return
+
+    if args.exportar:
+        if not os.path.exists(archivo_db):
+            print(f"Error: No existe el índice '{archivo_db}'")
+            sys.exit(1)
+        exportar_instantanea(archivo_db, args.exportar, args.bloque_vocabulario)
+        return
 
     # Crear directorio index si no existe
-    os.makedirs("index", exist_ok=True)
+    os.makedirs(os.path.dirname(archivo_db) or ".", exist_ok=True)
 
     if not os.path.exists(directorio_corpus):
         print(f"Error: No existe el directorio '{directorio_corpus}'")
         sys.exit(1)
 
-    crear_indice(directorio_corpus, archivo_db)
+    crear_indice(
+        directorio_corpus,
+        archivo_db,
+        procesos=procesos,
+        masivo=args.masivo,
+        max_postings_bloque=args.bloque,
+        incremental=args.incremental,
+        posicional=args.posicional,
+        permuterm=args.permuterm,
+        kgramas=args.kgramas,
+        autocompletado=args.autocompletado,
+        particiones=args.particiones,
+        plegar_acentos=args.plegar_acentos,
+        largo_minimo=args.largo_minimo,
+        largo_maximo=args.largo_maximo,
+    )
 
 
 if __name__ == "__main__":
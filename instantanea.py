@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Instantáneas de solo lectura del índice, leídas con mmap.
+
+Una instantánea es un único archivo inmutable con el vocabulario ordenado,
+el vocabulario invertido y los postings codificados por deltas en varint.
+Los procesos de consulta la abren con `mmap`: no deserializan nada al
+arrancar, y todos comparten las mismas páginas del caché del sistema
+operativo en lugar de tener cada uno su copia de los árboles de ZODB.
+
+Formato (enteros little-endian):
+
+    cabecera: MAGIA + (inicio, largo) de cada sección, en el orden de SECCIONES
+    metadatos: pickle con el tokenizador, la generación y los totales
+    nombres / offsets_nombres: nombres de documentos en UTF-8, por doc_id
+    postings / offsets_postings: varint(df) + varint(gaps), por término
+    terminos / offsets_terminos: términos en UTF-8, ordenados
+    invertidos / offsets_invertidos: términos al revés, ordenados
+    orden_invertidos: posición en `terminos` de cada término invertido
+
+Los offsets son arreglos de uint64 con un elemento más que entradas: la
+entrada i ocupa [offsets[i], offsets[i + 1]) de su sección. Con
+`bloque_vocabulario` los dos vocabularios se guardan con front-coding y sus
+offsets son por bloque (ver vocabulario.py).
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from BTrees.IIBTree import IISet, multiunion
+from autocompletado import TOP_AUTOCOMPLETADO, mejores_completados
+from automatas import recorrer_automata
+from comodines import patron_a_regex, prefijo_sufijo_literal
+from consultas import EvaluadorBooleano, parsear_consulta
+from difuso import AutomataLevenshtein, recorrer_difuso
+from expresiones import AutomataRegex
+from posiciones import codificar_posiciones, decodificar_posiciones, decodificar_varint
+from vocabulario import (
+    VocabularioComprimido,
+    VocabularioPlano,
+    codificar_frontal,
+    codificar_plano,
+)
+
+MAGIA = b"INDSNAP1"
+SECCIONES = (
+    "metadatos",
+    "nombres",
+    "offsets_nombres",
+    "postings",
+    "offsets_postings",
+    "terminos",
+    "offsets_terminos",
+    "invertidos",
+    "offsets_invertidos",
+    "orden_invertidos",
+)
+_CABECERA = struct.Struct(f"<8s{2 * len(SECCIONES)}Q")
+
+
+def _bytes_arreglo(valores: array) -> bytes:
+    """Bytes de un arreglo de enteros en little-endian."""
+    if sys.byteorder == "big":
+        valores = array(valores.typecode, valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def decodificar_postings(blob: bytes) -> List[int]:
+    """
+    Decodifica los doc_ids de un blob varint(df) + varint(gaps).
+
+    Si quedan tantos bytes como documentos, todos los gaps ocupan un byte
+    (lo habitual en términos frecuentes) y la suma se hace en C.
+    """
+    df, inicio = decodificar_varint(blob)
+    if len(blob) - inicio == df:
+        return list(accumulate(blob[inicio:]))
+    return decodificar_posiciones(blob)
+
+
+def escribir_instantanea(indice, ruta: str, bloque_vocabulario: int = 0) -> Dict[str, int]:
+    """
+    Escribe una instantánea de solo lectura de `indice` en `ruta`.
+
+    Los postings se escriben a medida que se recorre el índice; el
+    vocabulario se arma en memoria. El archivo se escribe en `ruta`.tmp y
+    se renombra al final, así que los lectores nunca ven uno a medio escribir.
+
+    Args:
+        indice: IndiceOrdenado a exportar
+        ruta: Archivo de la instantánea
+        bloque_vocabulario: Términos por bloque de front-coding de los
+            vocabularios (0 = términos completos)
+
+    Returns:
+        Diccionario con términos, documentos y bytes escritos
+    """
+    temporal = f"{ruta}.tmp"
+    secciones: Dict[str, Tuple[int, int]] = {}
+
+    with open(temporal, "wb") as salida:
+        salida.write(b"\0" * _CABECERA.size)
+
+        def escribir(nombre: str, datos: bytes):
+            secciones[nombre] = (salida.tell(), len(datos))
+            salida.write(datos)
+
+        tamano = indice.doc_counter
+        if indice.documentos:
+            tamano = max(tamano, indice.documentos.maxKey() + 1)
+        metadatos = {
+            "tokenizador": indice.tokenizador,
+            "generacion": indice.generacion,
+            "total_documentos": len(indice.documentos),
+            "bloque_vocabulario": bloque_vocabulario,
+        }
+        escribir("metadatos", pickle.dumps(metadatos, protocol=pickle.HIGHEST_PROTOCOL))
+
+        nombres = [b""] * tamano
+        for doc_id, nombre in indice.documentos.items():
+            nombres[doc_id] = nombre.encode("utf-8")
+        datos, offsets = codificar_plano(nombres)
+        escribir("nombres", datos)
+        escribir("offsets_nombres", _bytes_arreglo(offsets))
+
+        # Postings en streaming: solo se retienen los términos y los offsets
+        terminos: List[str] = []
+        offsets = array("Q", [0])
+        inicio = salida.tell()
+        for termino, postings in indice.indice.items():
+            salida.write(codificar_posiciones(postings))
+            offsets.append(salida.tell() - inicio)
+            terminos.append(termino)
+        secciones["postings"] = (inicio, offsets[-1])
+        escribir("offsets_postings", _bytes_arreglo(offsets))
+
+        def escribir_vocabulario(nombre: str, claves: Iterable[str]):
+            if bloque_vocabulario:
+                datos, offsets, _ = codificar_frontal(claves, bloque_vocabulario)
+            else:
+                datos, offsets = codificar_plano(clave.encode("utf-8") for clave in claves)
+            escribir(nombre, datos)
+            escribir(f"offsets_{nombre}", _bytes_arreglo(offsets))
+
+        escribir_vocabulario("terminos", terminos)
+        orden = sorted(range(len(terminos)), key=lambda i: terminos[i][::-1])
+        escribir_vocabulario("invertidos", (terminos[i][::-1] for i in orden))
+        escribir("orden_invertidos", _bytes_arreglo(array("Q", orden)))
+
+        salida.seek(0)
+        salida.write(
+            _CABECERA.pack(MAGIA, *(valor for nombre in SECCIONES for valor in secciones[nombre]))
+        )
+        salida.seek(0, os.SEEK_END)
+        total = salida.tell()
+
+    os.replace(temporal, ruta)
+    return {"terminos": len(terminos), "documentos": len(indice.documentos), "bytes": total}
+
+
+class IndiceInstantanea:
+    """
+    Índice de solo lectura sobre una instantánea mapeada en memoria.
+
+    Ofrece las mismas búsquedas `buscar_*` que IndiceOrdenado (salvo las
+    que necesitan posiciones) con los mismos resultados. Abrirla solo lee
+    la cabecera y los metadatos; el resto se lee del mapa a demanda.
+    """
+
+    def __init__(self, ruta: str):
+        """
+        Args:
+            ruta: Archivo generado por `escribir_instantanea`
+
+        Raises:
+            ValueError: Si el archivo no es una instantánea
+        """
+        self.ruta = ruta
+        with open(ruta, "rb") as archivo:
+            self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mapa) < _CABECERA.size or self._mapa[: len(MAGIA)] != MAGIA:
+            self._mapa.close()
+            raise ValueError(f"'{ruta}' no es una instantánea del índice")
+
+        valores = _CABECERA.unpack_from(self._mapa)[1:]
+        self._secciones = {
+            nombre: (valores[2 * i], valores[2 * i + 1]) for i, nombre in enumerate(SECCIONES)
+        }
+        self._vistas: List[memoryview] = []
+
+        inicio, largo = self._secciones["metadatos"]
+        metadatos = pickle.loads(self._mapa[inicio : inicio + largo])
+        self.tokenizador = metadatos["tokenizador"]
+        self.generacion = metadatos["generacion"]
+        self.total_documentos = metadatos["total_documentos"]
+
+        self._offsets_postings = self._arreglo("offsets_postings")
+        self._inicio_postings = self._secciones["postings"][0]
+        self._orden_invertidos = self._arreglo("orden_invertidos")
+        self.bloque_vocabulario = metadatos.get("bloque_vocabulario", 0)
+        self.terminos = self._vocabulario("terminos")
+        self.invertidos = self._vocabulario("invertidos")
+        self._nombres = VocabularioPlano(
+            self._mapa, self._secciones["nombres"][0], self._arreglo("offsets_nombres")
+        )
+        self._documentos: Optional[Dict[int, str]] = None
+        self._tabla_documentos: Optional[List[str]] = None
+
+    def _arreglo(self, seccion: str):
+        """Arreglo de uint64 de una sección, como vista del mapa (sin copiar)."""
+        inicio, largo = self._secciones[seccion]
+        if sys.byteorder == "big":
+            valores = array("Q", self._mapa[inicio : inicio + largo])
+            valores.byteswap()
+            return valores
+        vista = memoryview(self._mapa)[inicio : inicio + largo].cast("Q")
+        self._vistas.append(vista)
+        return vista
+
+    def _vocabulario(self, seccion: str):
+        """Vocabulario de una sección, plano o con front-coding según la instantánea."""
+        inicio = self._secciones[seccion][0]
+        offsets = self._arreglo(f"offsets_{seccion}")
+        if self.bloque_vocabulario:
+            total = len(self._offsets_postings) - 1  # Un offset de postings por término
+            return VocabularioComprimido(self._mapa, inicio, offsets, total, self.bloque_vocabulario)
+        return VocabularioPlano(self._mapa, inicio, offsets)
+
+    def cerrar(self):
+        """Libera el mapa del archivo."""
+        for vista in self._vistas:
+            vista.release()
+        self._vistas.clear()
+        self._mapa.close()
+
+    def __enter__(self) -> "IndiceInstantanea":
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def normalizar_termino(self, termino: str) -> str:
+        """Normaliza un término con el tokenizador del índice exportado."""
+        return self.tokenizador.normalizar(termino)
+
+    # Postings y documentos
+
+    def _postings(self, i: int) -> IISet:
+        """Doc_ids del término en la posición `i`."""
+        inicio = self._inicio_postings + self._offsets_postings[i]
+        fin = self._inicio_postings + self._offsets_postings[i + 1]
+        return IISet(decodificar_postings(self._mapa[inicio:fin]))
+
+    def _df(self, i: int) -> int:
+        """Cantidad de documentos del término en la posición `i` (sin decodificar gaps)."""
+        return decodificar_varint(self._mapa, self._inicio_postings + self._offsets_postings[i])[0]
+
+    def _posicion_termino(self, termino: str) -> Optional[int]:
+        i = self.terminos.posicion(termino)
+        if i < len(self.terminos) and self.terminos[i] == termino:
+            return i
+        return None
+
+    @property
+    def documentos(self) -> Dict[int, str]:
+        """Diccionario {doc_id -> nombre}, armado la primera vez que se usa."""
+        if self._documentos is None:
+            self._documentos = {
+                doc_id: nombre for doc_id, nombre in enumerate(self.tabla_documentos) if nombre
+            }
+        return self._documentos
+
+    @property
+    def tabla_documentos(self) -> List[str]:
+        """Nombres de documentos en una lista indexada por doc_id, armada una vez."""
+        if self._tabla_documentos is None:
+            self._tabla_documentos = list(self._nombres)
+        return self._tabla_documentos
+
+    def nombres_documentos(self, doc_ids: Iterable[int]) -> List[str]:
+        """Resuelve una secuencia ordenada de doc_ids a nombres de documentos."""
+        tabla = self.tabla_documentos
+        return [tabla[doc_id] for doc_id in doc_ids]
+
+    def _resolver(self, doc_ids, ids: bool):
+        """Devuelve los doc_ids tal cual o sus nombres, según `ids`."""
+        return doc_ids if ids else self.nombres_documentos(doc_ids)
+
+    def _resultados(self, posiciones: Iterable[int], ids: bool) -> Dict[str, List[str]]:
+        """Diccionario {término -> documentos} de las posiciones dadas, en ese orden."""
+        return {self.terminos[i]: self._resolver(self._postings(i), ids) for i in posiciones}
+
+    # Búsquedas
+
+    def buscar_exacto(self, termino: str, ids: bool = False) -> Union[List[str], IISet]:
+        """Documentos que contienen el término (ver IndiceOrdenado.buscar_exacto)."""
+        i = self._posicion_termino(self.normalizar_termino(termino))
+        if i is None:
+            return IISet() if ids else []
+        return self._resolver(self._postings(i), ids)
+
+    def buscar_prefijo(self, prefijo: str, ids: bool = False) -> Dict[str, List[str]]:
+        """Términos que empiezan con el prefijo, con sus documentos."""
+        return self._resultados(
+            self.terminos.rango_prefijo(self.normalizar_termino(prefijo)), ids
+        )
+
+    def _posiciones_sufijo(self, sufijo: str) -> List[int]:
+        """Posiciones en `terminos` de los términos que terminan con `sufijo`."""
+        return [self._orden_invertidos[j] for j in self.invertidos.rango_prefijo(sufijo[::-1])]
+
+    def buscar_sufijo(self, sufijo: str, ids: bool = False) -> Dict[str, List[str]]:
+        """Términos que terminan con el sufijo, agrupados por terminación (como IndiceOrdenado)."""
+        return self._resultados(self._posiciones_sufijo(self.normalizar_termino(sufijo)), ids)
+
+    def _coincidencias(self, patron_norm: str) -> List[int]:
+        """
+        Posiciones de los términos que coinciden con un patrón normalizado, ordenadas.
+
+        El patrón se recorre como regex sobre el vocabulario del lado con la
+        parte literal más larga: el derecho desde el prefijo, o el invertido
+        (con el patrón al revés) desde el sufijo.
+        """
+        if patron_a_regex(patron_norm) is None:
+            return []
+        prefijo, sufijo = prefijo_sufijo_literal(patron_norm)
+        invertido = len(sufijo) > len(prefijo)
+        claves = self.invertidos if invertido else self.terminos
+        if invertido:
+            patron_norm = patron_norm[::-1]
+
+        automata = AutomataRegex(patron_norm.replace("*", ".*").replace("?", "."))
+        posiciones = []
+        for clave, _ in recorrer_automata(claves, automata):
+            if automata.coincide(clave):
+                i = claves.posicion(clave)
+                posiciones.append(self._orden_invertidos[i] if invertido else i)
+        return sorted(posiciones) if invertido else posiciones
+
+    def buscar_comodin(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
+        """Términos que coinciden con un patrón con * y ?, con sus documentos."""
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        return self._resultados(self._coincidencias(patron_norm), ids)
+
+    def buscar_comodin_medio(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
+        """
+        Términos con comodín en el medio (prefijo*sufijo).
+
+        Como en IndiceOrdenado, son los términos con el prefijo y con el
+        sufijo; se recorre el menor de los dos rangos, cuyo tamaño sale de
+        dos búsquedas binarias.
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*")
+        if patron_norm.count("*") != 1:
+            return self.buscar_comodin(patron, ids=ids)
+
+        prefijo, sufijo = patron_norm.split("*")
+        if not prefijo:
+            return self.buscar_sufijo(sufijo, ids=ids)
+        if not sufijo:
+            return self.buscar_prefijo(prefijo, ids=ids)
+
+        con_prefijo = self.terminos.rango_prefijo(prefijo)
+        con_sufijo = self.invertidos.rango_prefijo(sufijo[::-1])
+
+        if len(con_prefijo) <= len(con_sufijo):
+            posiciones = [i for i in con_prefijo if self.terminos[i].endswith(sufijo)]
+        else:
+            posiciones = [
+                self._orden_invertidos[j]
+                for j in con_sufijo
+                if self.invertidos[j].endswith(prefijo[::-1])
+            ]
+        return self._resultados(sorted(posiciones), ids)
+
+    def postings_patron(self, patron: str):
+        """Doc_ids de los documentos con algún término que coincida con el patrón."""
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        if "*" not in patron_norm and "?" not in patron_norm:
+            i = self._posicion_termino(patron_norm)
+            return IISet() if i is None else self._postings(i)
+        return multiunion([self._postings(i) for i in self._coincidencias(patron_norm)])
+
+    def buscar_booleana(self, consulta: str, ids: bool = False) -> Union[List[str], IISet]:
+        """
+        Evalúa una consulta booleana con AND, OR, NOT y paréntesis.
+
+        Raises:
+            ValueError: Si la consulta tiene errores de sintaxis
+        """
+        doc_ids = EvaluadorBooleano(self).evaluar(parsear_consulta(consulta))
+        return self._resolver(doc_ids, ids)
+
+    def buscar_difuso(
+        self, termino: str, max_ediciones: int = 2, ids: bool = False
+    ) -> List[Tuple[str, int, Union[List[str], IISet]]]:
+        """Términos a `max_ediciones` o menos, de menor a mayor distancia."""
+        automata = AutomataLevenshtein(self.normalizar_termino(termino), max_ediciones)
+        coincidencias = sorted(
+            recorrer_difuso(self.terminos, automata), key=lambda par: (par[1], par[0])
+        )
+        return [
+            (clave, distancia, self._resolver(self._postings(self.terminos.posicion(clave)), ids))
+            for clave, distancia in coincidencias
+        ]
+
+    def buscar_regex(
+        self, expresion: str, ids: bool = False, estadisticas: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Términos que coinciden completos con una expresión regular.
+
+        Raises:
+            ValueError: Si la expresión es inválida o usa sintaxis no admitida
+        """
+        automata = AutomataRegex(expresion)
+        recorrido = {} if estadisticas is None else estadisticas
+        posiciones = [
+            self.terminos.posicion(clave)
+            for clave, _ in recorrer_automata(self.terminos, automata, recorrido)
+            if automata.coincide(clave)
+        ]
+        if estadisticas is not None:
+            estadisticas["vocabulario"] = len(self.terminos)
+        return self._resultados(posiciones, ids)
+
+    def _posiciones_rango(
+        self,
+        claves,
+        minimo: Optional[str],
+        maximo: Optional[str],
+        incluir_min: bool,
+        incluir_max: bool,
+    ) -> range:
+        minimo = None if minimo is None else self.normalizar_termino(minimo)
+        maximo = None if maximo is None else self.normalizar_termino(maximo)
+        inicio = 0
+        if minimo is not None:
+            inicio = claves.posicion(minimo) if incluir_min else claves.posicion_derecha(minimo)
+        fin = len(claves)
+        if maximo is not None:
+            fin = claves.posicion_derecha(maximo) if incluir_max else claves.posicion(maximo)
+        return range(inicio, max(inicio, fin))
+
+    def buscar_rango(
+        self,
+        minimo: Optional[str] = None,
+        maximo: Optional[str] = None,
+        incluir_min: bool = True,
+        incluir_max: bool = True,
+        limite: Optional[int] = None,
+    ) -> Iterator[Tuple[str, IISet]]:
+        """Pares (término, doc_ids) entre dos cotas, en orden (ver IndiceOrdenado)."""
+        posiciones = self._posiciones_rango(
+            self.terminos, minimo, maximo, incluir_min, incluir_max
+        )
+        return ((self.terminos[i], self._postings(i)) for i in islice(posiciones, limite))
+
+    def buscar_rango_invertido(
+        self,
+        minimo: Optional[str] = None,
+        maximo: Optional[str] = None,
+        incluir_min: bool = True,
+        incluir_max: bool = True,
+        limite: Optional[int] = None,
+    ) -> Iterator[Tuple[str, IISet]]:
+        """Como `buscar_rango`, con cotas escritas al revés (ver IndiceOrdenado)."""
+        posiciones = self._posiciones_rango(
+            self.invertidos, minimo, maximo, incluir_min, incluir_max
+        )
+        return (
+            (self.invertidos[j][::-1], self._postings(self._orden_invertidos[j]))
+            for j in islice(posiciones, limite)
+        )
+
+    def autocompletar(self, prefijo: str, k: int = TOP_AUTOCOMPLETADO) -> List[Tuple[str, int]]:
+        """Los `k` términos con más documentos que empiezan con el prefijo."""
+        rango = self.terminos.rango_prefijo(self.normalizar_termino(prefijo))
+        return mejores_completados(((self.terminos[i], self._df(i)) for i in rango), k)
+
+    def obtener_estadisticas(self) -> Dict:
+        """Retorna estadísticas del índice exportado."""
+        return {
+            "total_terminos": len(self.terminos),
+            "total_documentos": self.total_documentos,
+            "documentos": list(self.documentos.values()),
+            "bytes": len(self._mapa),
+            "bloque_vocabulario": self.bloque_vocabulario,
+            "generacion": self.generacion,
+        }
@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+Índice particionado por rangos de claves en varios archivos ZODB.
+
+Un índice grande en un solo `indice.fs` queda atado a un archivo y a un
+proceso. Con `python indexar.py --particiones N` el índice se reparte,
+después de construirse, en N archivos `indice.p0.fs` ... `indice.pN-1.fs`:
+
+- el vocabulario se corta en N rangos contiguos de claves con la misma
+  cantidad de términos, y el vocabulario invertido en N rangos de claves
+  invertidas; la partición i guarda el rango i de cada uno, así que un
+  término y su clave invertida pueden quedar en particiones distintas;
+- cada partición guarda además la tabla de documentos y el tokenizador,
+  para que baste abrir una sola para resolver nombres;
+- el mapa `indice.particiones` (JSON) guarda los archivos y las claves
+  donde empieza cada partición, salvo la primera.
+
+`IndiceParticionado` lee el mapa y enruta cada consulta: una búsqueda
+exacta va a la única partición que puede contener el término, un prefijo
+(o un sufijo, por el vocabulario invertido) a las que cortan su rango, casi
+siempre una sola. Los patrones con comodines se resuelven recorriendo el
+rango más chico entre el del prefijo literal, el del sufijo literal y el
+vocabulario entero; cuando abarca varias particiones, cada una se recorre
+en un proceso distinto y los resultados se unen en orden de clave.
+
+Las particiones se abren en modo de solo lectura y solo cuando una consulta
+las necesita. Los cambios al índice requieren volver a particionar:
+`crear_indice` lo hace en cada construcción o actualización de una base que
+ya tiene mapa. El mapa guarda la generación del índice que se repartió y
+`IndiceParticionado` la compara al abrirse con la de la base: si cambió
+(por ejemplo, con `agregar_documento`) lanza `ParticionesDesactualizadas`
+en lugar de responder con datos viejos.
+"""
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import ZODB
+import ZODB.FileStorage
+import transaction
+from BTrees.IIBTree import IISet, IITreeSet
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
+from cache_zodb import CACHE_OBJETOS_POR_DEFECTO, abrir_db, aplicar_limites
+from comodines import limite_prefijo, patron_a_regex, prefijo_sufijo_literal
+
+EXTENSIONES_DB = ["", ".index", ".tmp", ".lock"]
+
+
+class ParticionesDesactualizadas(RuntimeError):
+    """El índice cambió después de repartirse: hay que volver a particionar."""
+
+
+def ruta_mapa(archivo_db: str) -> str:
+    """Mapa de particiones de una base: index/indice.fs -> index/indice.particiones."""
+    return str(Path(archivo_db).with_suffix(".particiones"))
+
+
+def ruta_particion(archivo_db: str, numero: int) -> str:
+    """Archivo de una partición: index/indice.fs -> index/indice.p0.fs."""
+    return str(Path(archivo_db).with_suffix(f".p{numero}.fs"))
+
+
+def calcular_limites(claves: Iterable[str], total: int, particiones: int) -> List[str]:
+    """
+    Claves donde empieza cada partición salvo la primera.
+
+    Args:
+        claves: Claves en orden
+        total: Cantidad de claves
+        particiones: Particiones deseadas (si hay menos claves, una por clave)
+
+    Returns:
+        Lista ordenada de particiones - 1 claves
+    """
+    particiones = max(1, min(particiones, total))
+    cortes = {total * i // particiones for i in range(1, particiones)}
+    return [clave for posicion, clave in enumerate(claves) if posicion in cortes]
+
+
+def particiones_de_rango(limites: List[str], prefijo: str) -> range:
+    """Particiones cuyo rango de claves corta el de las claves con `prefijo`."""
+    # La partición i tiene las claves en [limites[i - 1], limites[i])
+    return range(bisect_right(limites, prefijo), bisect_left(limites, limite_prefijo(prefijo)) + 1)
+
+
+def cantidad_particiones(archivo_db: str) -> int:
+    """Particiones del mapa actual de una base (0 si no está particionada)."""
+    mapa = ruta_mapa(archivo_db)
+    if not os.path.exists(mapa):
+        return 0
+    with open(mapa, encoding="utf-8") as archivo:
+        return len(json.load(archivo)["archivos"])
+
+
+def generacion_indice(archivo_db: str) -> int:
+    """Generación del índice guardado en una base, sin depender de su clase."""
+    db = abrir_db(archivo_db)
+    try:
+        indice = db.open().root().indice
+        indice._p_activate()
+        # Un índice creado con `python indexar.py` apunta a __main__.IndiceOrdenado:
+        # fuera de ese script se carga como un objeto roto que conserva su estado
+        estado = getattr(indice, "__Broken_state__", None)
+        return estado.get("generacion", 0) if estado is not None else indice.generacion
+    finally:
+        db.close()
+
+
+def borrar_particiones(archivo_db: str):
+    """Elimina el mapa y los archivos de las particiones anteriores de una base."""
+    mapa = ruta_mapa(archivo_db)
+    if not os.path.exists(mapa):
+        return
+    with open(mapa, encoding="utf-8") as archivo:
+        nombres = json.load(archivo)["archivos"]
+    for nombre in nombres:
+        for ext in EXTENSIONES_DB:
+            ruta = Path(mapa).parent / (nombre + ext)
+            if ruta.exists():
+                ruta.unlink()
+    os.remove(mapa)
+
+
+def particionar_indice(
+    indice, archivo_db: str, particiones: int, tamano_lote: int = 10000
+) -> Dict[str, int]:
+    """
+    Reparte el vocabulario de un índice en archivos por rangos de claves.
+
+    Recorre `indice` e `indice_invertido` una vez en orden para elegir los
+    límites y otra para copiar los postings; cada partición hace un
+    savepoint cada `tamano_lote` términos para no retenerlos en memoria.
+
+    Args:
+        indice: IndiceOrdenado abierto (no se modifica)
+        archivo_db: Archivo de la base; las particiones y el mapa van al lado
+        particiones: Cantidad de particiones
+        tamano_lote: Términos copiados entre savepoints
+
+    Returns:
+        Diccionario con particiones, términos y bytes escritos
+
+    Raises:
+        ValueError: Si `particiones` es menor que 1
+    """
+    if particiones < 1:
+        raise ValueError("La cantidad de particiones debe ser al menos 1")
+
+    borrar_particiones(archivo_db)
+    total = len(indice.indice)
+    limites = calcular_limites(indice.indice.keys(), total, particiones)
+    limites_invertidos = calcular_limites(
+        indice.indice_invertido.keys(), len(indice.indice_invertido), len(limites) + 1
+    )
+
+    archivos = [ruta_particion(archivo_db, numero) for numero in range(len(limites) + 1)]
+    bases = [ZODB.DB(ZODB.FileStorage.FileStorage(archivo)) for archivo in archivos]
+    gestores = [transaction.TransactionManager() for _ in bases]
+    raices = [db.open(transaction_manager=tm).root() for db, tm in zip(bases, gestores)]
+    origen = indice._p_jar
+
+    def repartir(items: Iterator[Tuple[str, IITreeSet]], limites: List[str], atributo: str):
+        numero = 0
+        for copiados, (clave, postings) in enumerate(items, 1):
+            while numero < len(limites) and clave >= limites[numero]:
+                gestores[numero].savepoint(True)
+                numero += 1
+            getattr(raices[numero], atributo)[clave] = IITreeSet(postings)
+            if copiados % tamano_lote == 0:
+                gestores[numero].savepoint(True)
+                if origen is not None:
+                    origen.cacheGC()
+
+    try:
+        for raiz in raices:
+            raiz.terminos = OOBTree()  # término -> IITreeSet, un rango del vocabulario
+            raiz.terminos_invertidos = OOBTree()  # término invertido -> IITreeSet
+            raiz.documentos = IOBTree(indice.documentos)
+            raiz.tokenizador = indice.tokenizador
+            raiz.generacion = indice.generacion
+
+        repartir(indice.indice.items(), limites, "terminos")
+        repartir(indice.indice_invertido.items(), limites_invertidos, "terminos_invertidos")
+
+        mapa = {
+            "archivos": [Path(archivo).name for archivo in archivos],
+            "limites": limites,
+            "limites_invertidos": limites_invertidos,
+            "terminos": [len(raiz.terminos) for raiz in raices],
+            "terminos_invertidos": [len(raiz.terminos_invertidos) for raiz in raices],
+            "documentos": len(indice.documentos),
+            "generacion": indice.generacion,
+        }
+        for tm in gestores:
+            tm.commit()
+    finally:
+        for db in bases:
+            db.close()
+
+    # El mapa se escribe al final: sin él las particiones no se usan
+    temporal = ruta_mapa(archivo_db) + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(mapa, archivo, ensure_ascii=False, indent=1)
+    os.replace(temporal, ruta_mapa(archivo_db))
+
+    return {
+        "particiones": len(archivos),
+        "terminos": total,
+        "bytes": sum(os.path.getsize(archivo) for archivo in archivos),
+    }
+
+
+def _filtro(patron_norm: str, medio: bool) -> Callable[[str], bool]:
+    """Condición de un patrón: regex de comodines, o prefijo y sufijo si `medio`."""
+    if medio:
+        prefijo, sufijo = patron_norm.split("*")
+        return lambda termino: termino.startswith(prefijo) and termino.endswith(sufijo)
+    return patron_a_regex(patron_norm).match
+
+
+def barrer_particion(
+    raiz, invertido: bool, clave: str, patron_norm: str, medio: bool = False
+) -> List[str]:
+    """
+    Términos de una partición que coinciden con un patrón.
+
+    Recorre solo las claves (no carga postings), así que lo que vuelve de
+    un proceso del pool son cadenas y los postings se leen después de las
+    conexiones del proceso principal.
+
+    Args:
+        raiz: Raíz de la base de la partición
+        invertido: Recorrer el vocabulario invertido en lugar del directo
+        clave: Prefijo del rango a recorrer, en el vocabulario elegido ("" = todo)
+        patron_norm: Patrón normalizado
+        medio: Patrón prefijo*sufijo (ver `buscar_comodin_medio`)
+
+    Returns:
+        Claves del vocabulario recorrido cuyos términos coinciden, en orden
+    """
+    coincide = _filtro(patron_norm, medio)
+    arbol = raiz.terminos_invertidos if invertido else raiz.terminos
+    rango = arbol.keys(min=clave, max=limite_prefijo(clave)) if clave else arbol.keys()
+    if invertido:
+        return [termino_inv for termino_inv in rango if coincide(termino_inv[::-1])]
+    return [termino for termino in rango if coincide(termino)]
+
+
+_CONEXIONES_PROCESO: Dict[str, object] = {}  # Particiones abiertas en cada proceso
+
+
+def _barrer_en_proceso(
+    archivo: str, cache_objetos: int, invertido: bool, clave: str, patron_norm: str, medio: bool
+) -> List[str]:
+    """
+    `barrer_particion` en un proceso del pool, que abre cada partición una vez.
+
+    La conexión no hace commits: se recorta la caché después de cada
+    recorrido para que respete `cache_objetos` (ver cache_zodb.py).
+    """
+    conexion = _CONEXIONES_PROCESO.get(archivo)
+    if conexion is None:
+        conexion = abrir_db(archivo, cache_objetos=cache_objetos).open()
+        _CONEXIONES_PROCESO[archivo] = conexion
+    claves = barrer_particion(conexion.root(), invertido, clave, patron_norm, medio)
+    aplicar_limites(conexion)
+    return claves
+
+
+class IndiceParticionado:
+    """
+    Consultas sobre un índice repartido en particiones por rango de claves.
+
+    Ofrece `buscar_exacto`, `buscar_prefijo`, `buscar_sufijo`,
+    `buscar_comodin` y `buscar_comodin_medio` con los mismos resultados que
+    `IndiceOrdenado`. Los recorridos que abarcan varias particiones se
+    reparten entre `procesos` procesos; la partición n va siempre al
+    proceso n % procesos, que la mantiene abierta con su caché.
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        procesos: int = 0,
+        cache_objetos: int = CACHE_OBJETOS_POR_DEFECTO,
+        archivo_db: Optional[str] = None,
+    ):
+        """
+        Args:
+            ruta: Mapa de particiones (ver `ruta_mapa`)
+            procesos: Procesos para recorrer particiones en paralelo
+                (0 = uno por partición sin pasar de los núcleos, 1 = todo en
+                este proceso)
+            cache_objetos: Límite de objetos de la caché de cada partición, en
+                este proceso y en los del pool
+            archivo_db: Base completa con la que comparar la generación (por
+                defecto, la del mismo nombre que el mapa, si existe)
+
+        Raises:
+            ParticionesDesactualizadas: Si el índice de la base cambió
+                después de repartirse
+        """
+        self.ruta = ruta
+        with open(ruta, encoding="utf-8") as archivo:
+            mapa = json.load(archivo)
+        self.archivos = [str(Path(ruta).parent / nombre) for nombre in mapa["archivos"]]
+        self.limites: List[str] = mapa["limites"]
+        self.limites_invertidos: List[str] = mapa["limites_invertidos"]
+        self.terminos_por_particion: List[int] = mapa["terminos"]
+        self.generacion = mapa["generacion"]
+        if archivo_db is None:
+            archivo_db = str(Path(ruta).with_suffix(".fs"))
+        if os.path.exists(archivo_db):
+            generacion = generacion_indice(archivo_db)
+            if generacion != self.generacion:
+                raise ParticionesDesactualizadas(
+                    f"'{ruta}' reparte la generación {self.generacion} del índice y "
+                    f"'{archivo_db}' va por la {generacion}: volver a indexar para particionar"
+                )
+        self.procesos = procesos or min(len(self.archivos), os.cpu_count() or 1)
+        self.cache_objetos = cache_objetos
+        self._bases: Dict[int, ZODB.DB] = {}
+        self._raices: Dict[int, object] = {}
+        self._pools: List[ProcessPoolExecutor] = []
+        self._tabla: Optional[List[Optional[str]]] = None
+        # Consultas que llegaron a cada partición (para ver el enrutamiento)
+        self.visitas = [0] * len(self.archivos)
+
+    def cerrar(self):
+        """Termina el pool de procesos y cierra las particiones abiertas."""
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools.clear()
+        for db in self._bases.values():
+            db.close()
+        self._bases.clear()
+        self._raices.clear()
+
+    def __enter__(self) -> "IndiceParticionado":
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def _raiz(self, numero: int):
+        """Raíz de la partición `numero`, que se abre la primera vez que se usa."""
+        raiz = self._raices.get(numero)
+        if raiz is None:
+            db = abrir_db(self.archivos[numero], cache_objetos=self.cache_objetos)
+            self._bases[numero] = db
+            raiz = self._raices[numero] = db.open().root()
+        return raiz
+
+    @property
+    def tokenizador(self):
+        """Tokenizador del índice (guardado en cada partición)."""
+        return self._raiz(0).tokenizador
+
+    def normalizar_termino(self, termino: str) -> str:
+        """Normaliza un término con el tokenizador del índice."""
+        return self.tokenizador.normalizar(termino)
+
+    def particion(self, termino: str) -> int:
+        """Partición que contendría el término normalizado `termino`."""
+        return bisect_right(self.limites, termino)
+
+    def particiones_prefijo(self, prefijo: str) -> range:
+        """Particiones con términos que pueden empezar con `prefijo` (normalizado)."""
+        return particiones_de_rango(self.limites, prefijo)
+
+    def particiones_sufijo(self, sufijo: str) -> range:
+        """Particiones con términos que pueden terminar con `sufijo` (normalizado)."""
+        return particiones_de_rango(self.limites_invertidos, sufijo[::-1])
+
+    @property
+    def tabla_documentos(self) -> List[Optional[str]]:
+        """Nombres de documentos en una lista indexada por doc_id."""
+        if self._tabla is None:
+            documentos = self._raiz(0).documentos
+            tabla: List[Optional[str]] = [None] * (documentos.maxKey() + 1 if documentos else 0)
+            for doc_id, nombre in documentos.items():
+                tabla[doc_id] = nombre
+            self._tabla = tabla
+        return self._tabla
+
+    def nombres_documentos(self, doc_ids: Iterable[int]) -> List[str]:
+        """Resuelve una secuencia ordenada de doc_ids a nombres de documentos."""
+        tabla = self.tabla_documentos
+        return [tabla[doc_id] for doc_id in doc_ids]
+
+    def _resolver(self, doc_ids, ids: bool):
+        """Devuelve los doc_ids tal cual o sus nombres, según `ids`."""
+        return doc_ids if ids else self.nombres_documentos(doc_ids)
+
+    def buscar_exacto(self, termino: str, ids: bool = False) -> Union[List[str], IITreeSet]:
+        """
+        Busca un término exacto en su partición.
+
+        Args:
+            termino: Término a buscar
+            ids: Devolver los doc_ids en lugar de los nombres
+
+        Returns:
+            Lista de nombres de documentos, o sus doc_ids ordenados si `ids`
+        """
+        termino_norm = self.normalizar_termino(termino)
+        postings = self._arbol(self.particion(termino_norm), False).get(termino_norm)
+        if postings is None:
+            return IISet() if ids else []
+        return self._resolver(postings, ids)
+
+    def _arbol(self, numero: int, invertido: bool) -> OOBTree:
+        """Vocabulario directo o invertido de una partición; cuenta la visita."""
+        self.visitas[numero] += 1
+        raiz = self._raiz(numero)
+        return raiz.terminos_invertidos if invertido else raiz.terminos
+
+    def _rango(self, invertido: bool, clave: str) -> Iterator[Tuple[str, IITreeSet]]:
+        """Claves que empiezan con `clave` en las particiones de su rango, en orden."""
+        limites = self.limites_invertidos if invertido else self.limites
+        for numero in particiones_de_rango(limites, clave):
+            yield from self._arbol(numero, invertido).items(min=clave, max=limite_prefijo(clave))
+
+    def buscar_prefijo(self, prefijo: str, ids: bool = False) -> Dict[str, List[str]]:
+        """
+        Busca los términos que empiezan con el prefijo en las particiones de su rango.
+
+        Args:
+            prefijo: Prefijo a buscar
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
+        """
+        prefijo_norm = self.normalizar_termino(prefijo)
+        return {
+            termino: self._resolver(postings, ids)
+            for termino, postings in self._rango(False, prefijo_norm)
+        }
+
+    def buscar_sufijo(self, sufijo: str, ids: bool = False) -> Dict[str, List[str]]:
+        """
+        Busca los términos que terminan con el sufijo en el vocabulario invertido.
+
+        Args:
+            sufijo: Sufijo a buscar
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids},
+            en orden de término invertido como en `IndiceOrdenado`
+        """
+        sufijo_invertido = self.normalizar_termino(sufijo)[::-1]
+        return {
+            termino_inv[::-1]: self._resolver(postings, ids)
+            for termino_inv, postings in self._rango(True, sufijo_invertido)
+        }
+
+    def _contar(self, invertido: bool, clave: str) -> int:
+        """Claves de todas las particiones que empiezan con `clave`."""
+        limites = self.limites_invertidos if invertido else self.limites
+        return sum(
+            # len() de un rango recorre buckets, no claves individuales
+            len(self._arbol(numero, invertido).keys(min=clave, max=limite_prefijo(clave)))
+            for numero in particiones_de_rango(limites, clave)
+        )
+
+    def planificar(self, prefijo: str, sufijo: str) -> Tuple[bool, str, range]:
+        """
+        Elige el rango más chico a recorrer para un patrón.
+
+        Compara la cantidad de términos con el prefijo literal, con el
+        sufijo literal (en el vocabulario invertido) y el vocabulario entero.
+
+        Args:
+            prefijo: Parte literal antes del primer comodín
+            sufijo: Parte literal después del último comodín
+
+        Returns:
+            (vocabulario invertido, prefijo del rango, particiones a recorrer)
+        """
+        planes = [(sum(self.terminos_por_particion), False, "", range(len(self.archivos)))]
+        if prefijo:
+            planes.append(
+                (self._contar(False, prefijo), False, prefijo, self.particiones_prefijo(prefijo))
+            )
+        if sufijo:
+            clave = sufijo[::-1]
+            planes.append((self._contar(True, clave), True, clave, self.particiones_sufijo(sufijo)))
+        # min conserva el primero ante empates: se prefiere el orden directo
+        _, invertido, clave, particiones = min(planes, key=lambda plan: plan[0])
+        return invertido, clave, particiones
+
+    def _barrer(
+        self, invertido: bool, clave: str, particiones: range, patron_norm: str, medio: bool
+    ) -> List[Tuple[str, IITreeSet]]:
+        """
+        Recorre las particiones, en paralelo si son varias, y une en orden de término.
+        """
+        for numero in particiones:
+            self.visitas[numero] += 1
+        if len(particiones) > 1 and self.procesos > 1:
+            if not self._pools:
+                # Un proceso por pool: cada partición va siempre al mismo y su caché sigue cargada
+                self._pools = [ProcessPoolExecutor(max_workers=1) for _ in range(self.procesos)]
+            tareas = [
+                self._pools[numero % self.procesos].submit(
+                    _barrer_en_proceso,
+                    self.archivos[numero],
+                    self.cache_objetos,
+                    invertido,
+                    clave,
+                    patron_norm,
+                    medio,
+                )
+                for numero in particiones
+            ]
+            partes = [tarea.result() for tarea in tareas]
+        else:
+            partes = [
+                barrer_particion(self._raiz(numero), invertido, clave, patron_norm, medio)
+                for numero in particiones
+            ]
+
+        # Rangos contiguos en orden: concatenar ya ordena por clave del vocabulario recorrido
+        coincidencias = []
+        for numero, claves in zip(particiones, partes):
+            raiz = self._raiz(numero)
+            arbol = raiz.terminos_invertidos if invertido else raiz.terminos
+            for clave_arbol in claves:
+                termino = clave_arbol[::-1] if invertido else clave_arbol
+                coincidencias.append((termino, arbol[clave_arbol]))
+        if invertido:
+            coincidencias.sort(key=lambda par: par[0])
+        return coincidencias
+
+    def buscar_comodin(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
+        """
+        Busca términos que coincidan con un patrón con * y ?.
+
+        Args:
+            patron: Patrón con comodines
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*?")
+        if patron_a_regex(patron_norm) is None:
+            return {}
+        if "*" not in patron_norm and "?" not in patron_norm:
+            postings = self._arbol(self.particion(patron_norm), False).get(patron_norm)
+            return {} if postings is None else {patron_norm: self._resolver(postings, ids)}
+
+        invertido, clave, particiones = self.planificar(*prefijo_sufijo_literal(patron_norm))
+        return {
+            termino: self._resolver(postings, ids)
+            for termino, postings in self._barrer(invertido, clave, particiones, patron_norm, False)
+        }
+
+    def buscar_comodin_medio(self, patron: str, ids: bool = False) -> Dict[str, List[str]]:
+        """
+        Busca términos con comodín en el medio (prefijo*sufijo).
+
+        Args:
+            patron: Patrón con * en el medio (ej: "ca*do")
+            ids: Devolver los doc_ids de cada término en lugar de los nombres
+
+        Returns:
+            Diccionario {término -> lista de documentos}, o {término -> doc_ids}
+        """
+        patron_norm = self.tokenizador.normalizar_patron(patron, "*")
+        if patron_norm.count("*") != 1:
+            return self.buscar_comodin(patron, ids=ids)
+
+        prefijo, sufijo = patron_norm.split("*")
+        if not prefijo:
+            return self.buscar_sufijo(sufijo, ids=ids)
+        if not sufijo:
+            return self.buscar_prefijo(prefijo, ids=ids)
+
+        invertido, clave, particiones = self.planificar(prefijo, sufijo)
+        return {
+            termino: self._resolver(postings, ids)
+            for termino, postings in self._barrer(invertido, clave, particiones, patron_norm, True)
+        }
+
+    def obtener_estadisticas(self) -> Dict:
+        """Retorna estadísticas del índice y de sus particiones."""
+        documentos = self._raiz(0).documentos
+        return {
+            "total_terminos": sum(self.terminos_por_particion),
+            "total_documentos": len(documentos),
+            "documentos": list(documentos.values()),
+            "particiones": len(self.archivos),
+            "terminos_por_particion": list(self.terminos_por_particion),
+        }
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Codificación compacta de postings posicionales.
+
+Cada par (término, documento) se guarda como un blob de bytes con la
+frecuencia del término seguida de las posiciones codificadas por deltas
+(gaps) en varint (variable byte): 7 bits por byte, el bit alto indica
+que el número continúa en el byte siguiente.
+
+    blob = varint(tf) + varint(p0) + varint(p1 - p0) + varint(p2 - p1) ...
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+
+def codificar_varint(numero: int, salida: bytearray):
+    """Agrega `numero` (>= 0) codificado en varint a `salida`."""
+    while numero >= 0x80:
+        salida.append((numero & 0x7F) | 0x80)
+        numero >>= 7
+    salida.append(numero)
+
+
+def decodificar_varint(datos: bytes, inicio: int = 0) -> Tuple[int, int]:
+    """
+    Decodifica un varint de `datos` a partir de `inicio`.
+
+    Returns:
+        (número, posición del byte siguiente)
+    """
+    numero = 0
+    desplazamiento = 0
+    pos = inicio
+
+    while True:
+        byte = datos[pos]
+        pos += 1
+        numero |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80:
+            return numero, pos
+        desplazamiento += 7
+
+
+def codificar_posiciones(posiciones: Iterable[int]) -> bytes:
+    """
+    Codifica una lista ordenada de posiciones como tf + gaps en varint.
+
+    Args:
+        posiciones: Posiciones crecientes del término en el documento
+
+    Returns:
+        Blob de bytes
+    """
+    posiciones = list(posiciones)
+    salida = bytearray()
+    codificar_varint(len(posiciones), salida)
+
+    anterior = 0
+    for posicion in posiciones:
+        codificar_varint(posicion - anterior, salida)
+        anterior = posicion
+
+    return bytes(salida)
+
+
+def decodificar_posiciones(blob: bytes) -> List[int]:
+    """Decodifica un blob generado por `codificar_posiciones`."""
+    frecuencia, pos = decodificar_varint(blob)
+    posiciones = []
+    actual = 0
+
+    for _ in range(frecuencia):
+        gap, pos = decodificar_varint(blob, pos)
+        actual += gap
+        posiciones.append(actual)
+
+    return posiciones
+
+
+def frecuencia(blob: bytes) -> int:
+    """Frecuencia del término en el documento, sin decodificar las posiciones."""
+    return decodificar_varint(blob)[0]
+
+
+def calcular_posiciones(tokens: Iterable[str]) -> Dict[str, bytes]:
+    """
+    Agrupa las posiciones de cada término de un documento y las codifica.
+
+    Args:
+        tokens: Términos del documento en orden de aparición
+
+    Returns:
+        Diccionario {término -> blob con tf y posiciones}
+    """
+    posiciones: Dict[str, List[int]] = {}
+
+    for posicion, termino in enumerate(tokens):
+        lista = posiciones.get(termino)
+        if lista is None:
+            lista = posiciones[termino] = []
+        lista.append(posicion)
+
+    return {termino: codificar_posiciones(lista) for termino, lista in posiciones.items()}
+
+
+def hay_proximidad(posiciones1: List[int], posiciones2: List[int], distancia: int) -> bool:
+    """
+    Indica si alguna posición de la primera lista está a `distancia` o menos de
+    alguna de la segunda. Recorre ambas listas ordenadas en paralelo.
+    """
+    i = j = 0
+
+    while i < len(posiciones1) and j < len(posiciones2):
+        if abs(posiciones1[i] - posiciones2[j]) <= distancia:
+            return True
+        if posiciones1[i] < posiciones2[j]:
+            i += 1
+        else:
+            j += 1
+
+    return False
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Servidor de consultas HTTP/JSON sobre el índice ordenado.
+
+Un proceso de larga duración atiende muchas consultas concurrentes sobre
+una sola base ZODB de solo lectura:
+
+- El bucle de asyncio solo lee y escribe sockets (TCP o Unix).
+- Las búsquedas corren en un pool de hilos: un recorrido largo no frena a
+  las demás conexiones.
+- Cada búsqueda toma una conexión de ZODB de un pool (una por hilo
+  trabajador, cada una con su caché de objetos y su gestor de
+  transacciones) y la devuelve al terminar.
+- Cada petición tiene un tiempo límite: si vence, se responde 504. Una
+  búsqueda que todavía espera un hilo se cancela; una que ya empezó
+  recorre los términos de a páginas y se corta en la próxima página,
+  devolviendo su conexión al pool.
+
+Endpoints:
+
+    GET /buscar?tipo=prefijo&q=ca&limite=100
+    POST /buscar  {"tipo": "prefijo", "q": "ca", "limite": 100}
+    GET /estadisticas
+
+Los tipos son exacto, prefijo, sufijo, comodin y comodin_medio. Ejemplo:
+
+    python servidor.py --puerto 8080 --trabajadores 4
+    curl 'http://127.0.0.1:8080/buscar?tipo=comodin&q=h?bbit*'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import transaction
+from cache_zodb import CACHE_MB_POR_DEFECTO, abrir_db, aplicar_limites
+from indexar import IndiceOrdenado
+
+TIPOS_BUSQUEDA = {
+    "exacto": "buscar_exacto",
+    "prefijo": "buscar_prefijo",
+    "sufijo": "buscar_sufijo",
+    "comodin": "buscar_comodin",
+    "comodin_medio": "buscar_comodin_medio",
+}
+TRABAJADORES_POR_DEFECTO = 4
+TIEMPO_LIMITE_POR_DEFECTO = 5.0  # Segundos por petición
+LIMITE_POR_DEFECTO = 1000  # Términos por respuesta (0 = sin límite)
+TERMINOS_POR_PAGINA = 256  # Términos recorridos entre controles del tiempo límite
+# Por conexión. Un servicio largo conviene que retenga los árboles: con los
+# 400 objetos de ZODB cada consulta vuelve a cargar casi todo lo que toca
+CACHE_OBJETOS_SERVIDOR = 100_000
+MAXIMO_CUERPO = 64 * 1024  # Bytes
+
+_MOTIVOS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    504: "Gateway Timeout",
+}
+
+
+class ErrorPeticion(Exception):
+    """Petición inválida: se responde con `estado` y el mensaje."""
+
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class PoolConexiones:
+    """
+    Conexiones de ZODB abiertas sobre una misma base, para usar de a una por hilo.
+
+    Cada conexión tiene su propio gestor de transacciones, así que puede
+    usarse desde cualquier hilo (no queda atada al que la abrió). Al
+    devolverla se cierra su transacción de lectura, lo que aplica las
+    invalidaciones pendientes, y se recorta su caché.
+    """
+
+    def __init__(self, db, tamano: int):
+        self._libres: "queue.LifoQueue" = queue.LifoQueue()
+        self._todas = []
+        for _ in range(tamano):
+            conexion = db.open(transaction_manager=transaction.TransactionManager())
+            indice = conexion.root().indice
+            indice.__class__ = IndiceOrdenado  # Forzar que use la clase actualizada
+            conexion.transaction_manager.abort()  # Solo lectura: descartar el cambio de clase
+            self._todas.append(conexion)
+            self._libres.put((conexion, indice))
+
+    @contextmanager
+    def indice(self) -> Iterator[IndiceOrdenado]:
+        """Presta el índice de una conexión libre (espera si no hay)."""
+        # LIFO: la conexión usada más recientemente tiene la caché más caliente
+        conexion, indice = self._libres.get()
+        try:
+            yield indice
+        finally:
+            conexion.transaction_manager.abort()
+            aplicar_limites(conexion, [indice])
+            self._libres.put((conexion, indice))
+
+    def cerrar(self):
+        """Cierra todas las conexiones (no debe haber ninguna prestada)."""
+        for conexion in self._todas:
+            conexion.transaction_manager.abort()
+            conexion.close()
+        self._todas = []
+
+
+class ServidorConsultas:
+    """Servidor HTTP/JSON con un pool de hilos y de conexiones de ZODB."""
+
+    def __init__(
+        self,
+        archivo_db: str = "index/indice.fs",
+        trabajadores: int = TRABAJADORES_POR_DEFECTO,
+        tiempo_limite: float = TIEMPO_LIMITE_POR_DEFECTO,
+        cache_objetos: int = CACHE_OBJETOS_SERVIDOR,
+        cache_mb: float = CACHE_MB_POR_DEFECTO,
+    ):
+        """
+        Args:
+            archivo_db: Archivo de base de datos ZODB
+            trabajadores: Hilos de búsqueda (y conexiones de ZODB)
+            tiempo_limite: Segundos máximos por petición, incluida la espera
+            cache_objetos: Límite de objetos de la caché de cada conexión
+            cache_mb: Límite en MB de la caché de cada conexión (0 = sin límite)
+        """
+        if trabajadores < 1:
+            raise ValueError("Se necesita al menos un trabajador")
+        self.tiempo_limite = tiempo_limite
+        self.db = abrir_db(archivo_db, cache_objetos=cache_objetos, cache_mb=cache_mb)
+        self.db.setPoolSize(trabajadores)
+        self.pool = PoolConexiones(self.db, trabajadores)
+        self.ejecutor = ThreadPoolExecutor(trabajadores, thread_name_prefix="busqueda")
+        self.atendidas = 0
+        self.vencidas = 0
+
+    def buscar(
+        self,
+        tipo: str,
+        consulta: str,
+        limite: int = LIMITE_POR_DEFECTO,
+        plazo: Optional[float] = None,
+    ) -> Dict:
+        """
+        Ejecuta una búsqueda con una conexión del pool (corre en un hilo trabajador).
+
+        Los términos se recorren de a páginas con `paginar_*`: el límite acota
+        el recorrido y entre página y página se controla el plazo.
+
+        Args:
+            tipo: Uno de TIPOS_BUSQUEDA
+            consulta: Término o patrón
+            limite: Máximo de términos en la respuesta (0 = sin límite)
+            plazo: Instante de `time.monotonic()` en que vence la petición
+
+        Returns:
+            Diccionario JSON con los resultados
+
+        Raises:
+            ErrorPeticion: 504 si el plazo vence antes de terminar
+        """
+        inicio = time.perf_counter()
+        respuesta = {"tipo": tipo, "q": consulta}
+        self._controlar_plazo(plazo)
+        with self.pool.indice() as indice:
+            if tipo == "exacto":
+                respuesta["documentos"] = indice.buscar_exacto(consulta)
+            else:
+                paginar = getattr(indice, "paginar_" + tipo)
+                resultados = {}
+                cursor = None
+                while True:
+                    faltan = limite - len(resultados) if limite else TERMINOS_POR_PAGINA
+                    pagina = paginar(consulta, min(faltan, TERMINOS_POR_PAGINA), cursor)
+                    for termino, doc_ids in pagina.resultados:
+                        resultados[termino] = indice.nombres_documentos(doc_ids)
+                    cursor = pagina.cursor
+                    if cursor is None or len(resultados) == limite:
+                        break
+                    self._controlar_plazo(plazo)
+                respuesta["terminos"] = len(resultados)
+                respuesta["truncado"] = cursor is not None
+                respuesta["resultados"] = resultados
+        respuesta["ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        return respuesta
+
+    def _controlar_plazo(self, plazo: Optional[float]):
+        """Corta la búsqueda en curso si la petición ya venció."""
+        if plazo is not None and time.monotonic() > plazo:
+            raise ErrorPeticion(504, f"La consulta superó {self.tiempo_limite:g} s")
+
+    def estadisticas(self) -> Dict:
+        """Estadísticas del índice y del servidor (corre en un hilo trabajador)."""
+        with self.pool.indice() as indice:
+            estadisticas = indice.obtener_estadisticas()
+            generacion = indice.generacion
+        return {
+            "total_terminos": estadisticas["total_terminos"],
+            "total_documentos": estadisticas["total_documentos"],
+            "generacion": generacion,
+            "atendidas": self.atendidas,
+            "vencidas": self.vencidas,
+        }
+
+    async def responder(self, metodo: str, destino: str, cuerpo: bytes) -> Tuple[int, Dict]:
+        """
+        Resuelve una petición y devuelve (estado HTTP, datos JSON).
+
+        Raises:
+            ErrorPeticion: Si la ruta, el método o los parámetros son inválidos
+        """
+        url = urlsplit(destino)
+        if url.path == "/estadisticas":
+            if metodo != "GET":
+                raise ErrorPeticion(405, "Usa GET")
+            return 200, await self._en_trabajador(self.estadisticas)
+        if url.path != "/buscar":
+            raise ErrorPeticion(404, f"No existe la ruta '{url.path}'")
+
+        if metodo == "GET":
+            parametros = dict(parse_qsl(url.query, keep_blank_values=True))
+        elif metodo == "POST":
+            try:
+                parametros = json.loads(cuerpo or b"{}")
+            except ValueError:
+                raise ErrorPeticion(400, "El cuerpo no es JSON válido")
+            if not isinstance(parametros, dict):
+                raise ErrorPeticion(400, "El cuerpo debe ser un objeto JSON")
+        else:
+            raise ErrorPeticion(405, "Usa GET o POST")
+
+        tipo = parametros.get("tipo", "")
+        if tipo not in TIPOS_BUSQUEDA:
+            raise ErrorPeticion(400, f"Tipo inválido; usa uno de: {', '.join(TIPOS_BUSQUEDA)}")
+        consulta = parametros.get("q")
+        if not isinstance(consulta, str):
+            raise ErrorPeticion(400, "Falta la consulta 'q'")
+        try:
+            limite = int(parametros.get("limite", LIMITE_POR_DEFECTO))
+        except (TypeError, ValueError):
+            raise ErrorPeticion(400, "El límite debe ser un entero")
+        if limite < 0:
+            raise ErrorPeticion(400, "El límite debe ser positivo")
+
+        plazo = time.monotonic() + self.tiempo_limite
+        return 200, await self._en_trabajador(self.buscar, tipo, consulta, limite, plazo)
+
+    async def _en_trabajador(self, funcion, *argumentos):
+        """Corre `funcion` en el pool de hilos, con el tiempo límite de la petición."""
+        futuro = asyncio.get_running_loop().run_in_executor(self.ejecutor, funcion, *argumentos)
+        try:
+            # Cancelar el futuro saca la búsqueda de la cola si todavía no empezó
+            return await asyncio.wait_for(futuro, self.tiempo_limite)
+        except asyncio.TimeoutError:
+            self.vencidas += 1
+            raise ErrorPeticion(504, f"La consulta superó {self.tiempo_limite:g} s")
+        except ErrorPeticion as e:
+            # La búsqueda misma vio vencer el plazo y soltó su conexión
+            if e.estado == 504:
+                self.vencidas += 1
+            raise
+
+    async def atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        """Atiende una conexión HTTP/1.1, con keep-alive, hasta que el cliente la cierra."""
+        try:
+            while True:
+                try:
+                    peticion = await leer_peticion(lector)
+                except ErrorPeticion as e:
+                    await escribir_respuesta(escritor, e.estado, {"error": str(e)}, cerrar=True)
+                    break
+                if peticion is None:
+                    break
+                metodo, destino, cuerpo, mantener = peticion
+
+                try:
+                    estado, datos = await self.responder(metodo, destino, cuerpo)
+                except ErrorPeticion as e:
+                    estado, datos = e.estado, {"error": str(e)}
+                except Exception as e:
+                    estado, datos = 500, {"error": f"{type(e).__name__}: {e}"}
+                self.atendidas += 1
+                await escribir_respuesta(escritor, estado, datos, cerrar=not mantener)
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # El cliente cortó la conexión
+        except ValueError:
+            pass  # Línea más larga que el límite del lector: se corta la conexión
+        finally:
+            escritor.close()
+
+    async def iniciar(
+        self, host: str = "127.0.0.1", puerto: int = 8080, unix: Optional[str] = None
+    ) -> asyncio.AbstractServer:
+        """Empieza a escuchar en TCP o, si se indica `unix`, en un socket Unix."""
+        if unix is not None:
+            if os.path.exists(unix):
+                os.remove(unix)  # Socket de una ejecución anterior
+            return await asyncio.start_unix_server(self.atender, path=unix)
+        return await asyncio.start_server(self.atender, host, puerto)
+
+    def cerrar(self):
+        """Espera las búsquedas en curso y cierra las conexiones y la base."""
+        self.ejecutor.shutdown(wait=True)
+        self.pool.cerrar()
+        self.db.close()
+
+
+async def leer_peticion(lector: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+    """
+    Lee una petición HTTP/1.x.
+
+    Returns:
+        (método, destino, cuerpo, mantener la conexión), o None si el cliente cerró
+
+    Raises:
+        ErrorPeticion: Si la petición está mal formada o el cuerpo es muy grande
+    """
+    linea = await lector.readline()
+    if not linea:
+        return None
+    partes = linea.decode("latin-1").split()
+    if len(partes) != 3 or not partes[2].startswith("HTTP/1."):
+        raise ErrorPeticion(400, "Línea de petición inválida")
+    metodo, destino, version = partes
+
+    encabezados = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        encabezados[nombre.strip().lower()] = valor.strip()
+
+    try:
+        largo = int(encabezados.get("content-length", 0))
+    except ValueError:
+        raise ErrorPeticion(400, "Content-Length inválido")
+    if largo > MAXIMO_CUERPO:
+        raise ErrorPeticion(413, f"El cuerpo supera {MAXIMO_CUERPO} bytes")
+    cuerpo = await lector.readexactly(largo) if largo > 0 else b""
+
+    conexion = encabezados.get("connection", "").lower()
+    mantener = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+    return metodo, destino, cuerpo, mantener
+
+
+async def escribir_respuesta(
+    escritor: asyncio.StreamWriter, estado: int, datos: Dict, cerrar: bool = False
+):
+    """Escribe una respuesta HTTP/1.1 con cuerpo JSON."""
+    cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    cabecera = (
+        f"HTTP/1.1 {estado} {_MOTIVOS.get(estado, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n"
+        f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n"
+    )
+    escritor.write(cabecera.encode("latin-1") + cuerpo)
+    await escritor.drain()
+
+
+async def servir(servidor: ServidorConsultas, host: str, puerto: int, unix: Optional[str]):
+    """Atiende peticiones hasta recibir SIGINT o SIGTERM."""
+    escucha = await servidor.iniciar(host, puerto, unix)
+    direccion = unix or f"http://{host}:{escucha.sockets[0].getsockname()[1]}"
+    print(f"✓ Escuchando en {direccion} (Ctrl+C para terminar)", flush=True)
+
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, detener.set)
+    async with escucha:
+        await detener.wait()
+    if unix is not None and os.path.exists(unix):
+        os.remove(unix)
+
+
+def main():
+    """Función principal."""
+    parser = argparse.ArgumentParser(description="Servidor de consultas HTTP/JSON del índice.")
+    parser.add_argument("--db", default="index/indice.fs", help="Archivo de base de datos ZODB")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección TCP")
+    parser.add_argument("--puerto", type=int, default=8080, help="Puerto TCP (0 = uno libre)")
+    parser.add_argument("--unix", metavar="RUTA", help="Escuchar en un socket Unix en lugar de TCP")
+    parser.add_argument(
+        "--trabajadores",
+        type=int,
+        default=TRABAJADORES_POR_DEFECTO,
+        help="Hilos de búsqueda y conexiones de ZODB",
+    )
+    parser.add_argument(
+        "--tiempo-limite",
+        type=float,
+        default=TIEMPO_LIMITE_POR_DEFECTO,
+        metavar="SEG",
+        help="Segundos máximos por petición",
+    )
+    parser.add_argument(
+        "--cache-objetos",
+        type=int,
+        default=CACHE_OBJETOS_SERVIDOR,
+        metavar="N",
+        help="Objetos en la caché de ZODB de cada conexión",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=CACHE_MB_POR_DEFECTO,
+        metavar="MB",
+        help="Tamaño estimado máximo de la caché de cada conexión (0 = sin límite)",
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Error: No existe el índice '{args.db}'")
+        print("Ejecuta 'python indexar.py' o 'make index' primero para crear el índice.")
+        sys.exit(1)
+
+    servidor = ServidorConsultas(
+        args.db,
+        trabajadores=args.trabajadores,
+        tiempo_limite=args.tiempo_limite,
+        cache_objetos=args.cache_objetos,
+        cache_mb=args.cache_mb,
+    )
+    try:
+        asyncio.run(servir(servidor, args.host, args.puerto, args.unix))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C antes de instalar los manejadores de señales
+    finally:
+        servidor.cerrar()
+        print(f"\n👋 {servidor.atendidas:,} peticiones atendidas")
+
+
+if __name__ == "__main__":
+    main()
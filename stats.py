@@ -96,6 +96,25 @@ def mostrar_estadisticas():
         nombre_doc = indice.documentos[doc_id]
         print(f"   • {nombre_doc}: {count:,} términos únicos")
 
+    # Costo del árbol permuterm
+    if stats.get("permuterm_rotaciones"):
+        rotaciones = stats["permuterm_rotaciones"]
+        caracteres = sum(len(clave) + len(termino) for clave, termino in indice.permuterm.items())
+        print(f"\n🔄 Árbol permuterm:")
+        print(f"   • Rotaciones: {rotaciones:,} ({rotaciones / stats['total_terminos']:.1f} por término)")
+        print(f"   • Caracteres en claves y valores: {caracteres:,}")
+
+    # Índice de k-gramas
+    if stats.get("kgramas"):
+        print(f"\n🧩 Índice de {stats['k']}-gramas:")
+        print(f"   • k-gramas distintos: {stats['kgramas']:,}")
+
+    # Caché de autocompletado
+    if stats.get("autocompletado_prefijos"):
+        print(f"\n⌨️  Autocompletado (prefijos de hasta {stats['largo_autocompletado']} letras):")
+        print(f"   • Prefijos precalculados: {stats['autocompletado_prefijos']:,}")
+        print(f"   • Vigente: {'sí' if indice.autocompletado_vigente else 'no'}")
+
     # Tamaño del índice
     print(f"\n💾 Tamaño en disco:")
     tamano = os.path.getsize(archivo_db)
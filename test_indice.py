@@ -3,15 +3,38 @@
 Tests para el índice ordenado con Árboles B+ de ZODB.
 """
 
+import asyncio
+import json
 import os
+import re
 import sys
 import tempfile
 import shutil
+import time
 from pathlib import Path
 import ZODB
 import ZODB.FileStorage
 import transaction
-from indexar import IndiceOrdenado, crear_indice
+from BTrees.IIBTree import IISet, IITreeSet
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
+from consultas import interseccion_galopante, parsear_consulta
+from difuso import distancia_levenshtein
+import indexar as indexar_modulo
+from indexar import IndiceOrdenado, crear_indice, migrar_indice
+from cache_zodb import ContadorCache, abrir_db, aplicar_limites, precalentar
+from carga import conectar, consultar, generar_carga, leer_respuesta
+from instantanea import IndiceInstantanea, escribir_instantanea
+from particiones import (
+    IndiceParticionado,
+    ParticionesDesactualizadas,
+    calcular_limites,
+    ruta_mapa,
+    ruta_particion,
+)
+from servidor import ErrorPeticion, ServidorConsultas
+from tokenizador import Tokenizador
+from vocabulario import VocabularioComprimido, VocabularioPlano, codificar_frontal
 
 
 def test_indice_basico():
@@ -87,7 +110,9 @@ def test_indice_basico():
     # Limpiar
     connection.close()
     db.close()
-    os.remove("tmp/test_temp.fs")
+    for ext in ["", ".index", ".tmp", ".lock"]:
+        if os.path.exists("tmp/test_temp.fs" + ext):
+            os.remove("tmp/test_temp.fs" + ext)
 
     print("\n✅ Todos los tests básicos pasaron correctamente\n")
 
@@ -211,6 +236,1586 @@ def test_corpus_real():
                 os.remove(archivo_db + ext)
 
 
+def test_migracion_postings():
+    """Test de migración de un índice con sets de Python a IITreeSet."""
+    print("\n" + "=" * 60)
+    print("TEST 4: Migración a postings enteros")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+
+    archivo_db = "tmp/test_migracion.fs"
+
+    try:
+        # Simular un índice con el formato anterior
+        storage = ZODB.FileStorage.FileStorage(archivo_db)
+        db = ZODB.DB(storage)
+        connection = db.open()
+        root = connection.root()
+
+        indice = IndiceOrdenado()
+        indice.documentos = OOBTree({0: "Doc1", 1: "Doc2"})
+        indice.indice["hobbit"] = {0, 1}
+        indice.indice["comarca"] = {0}
+        indice.indice_invertido["tibboh"] = {0, 1}
+        indice.indice_invertido["acramoc"] = {0}
+        indice.doc_counter = 2
+        root.indice = indice
+        transaction.commit()
+
+        assert indice.necesita_migracion(), "Error: el índice anterior debe requerir migración"
+
+        connection.close()
+        db.close()
+
+        convertidos = migrar_indice(archivo_db)
+        print(f"✓ Postings convertidos: {convertidos}")
+        assert convertidos == 4, "Error en cantidad de postings migrados"
+
+        # Reabrir y verificar
+        storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+        db = ZODB.DB(storage)
+        connection = db.open()
+        indice = connection.root().indice
+
+        assert not indice.necesita_migracion(), "Error: el índice ya fue migrado"
+        assert isinstance(indice.documentos, IOBTree), "Error: documentos debe ser IOBTree"
+        assert isinstance(indice.indice["hobbit"], IITreeSet), "Error: postings deben ser IITreeSet"
+        assert indice.buscar_exacto("hobbit") == ["Doc1", "Doc2"], "Error en búsqueda tras migrar"
+        assert list(indice.buscar_sufijo("arca")) == ["comarca"], "Error en sufijo tras migrar"
+
+        connection.close()
+        db.close()
+
+        print("✅ Test de migración pasó correctamente\n")
+
+    finally:
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(archivo_db + ext):
+                os.remove(archivo_db + ext)
+
+
+def test_indexacion_paralela():
+    """Test de indexación con tokenización en paralelo."""
+    print("\n" + "=" * 60)
+    print("TEST 5: Indexación paralela")
+    print("=" * 60)
+
+    if not os.path.exists("corpus"):
+        print("⚠️  Corpus no encontrado, saltando test\n")
+        return
+
+    os.makedirs("tmp", exist_ok=True)
+
+    archivo_secuencial = "tmp/test_secuencial.fs"
+    archivo_paralelo = "tmp/test_paralelo.fs"
+
+    try:
+        crear_indice("corpus", archivo_secuencial)
+        crear_indice("corpus", archivo_paralelo, procesos=2)
+
+        contenidos = []
+        for archivo_db in (archivo_secuencial, archivo_paralelo):
+            storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+            db = ZODB.DB(storage)
+            connection = db.open()
+            indice = connection.root().indice
+            contenidos.append(
+                (
+                    dict(indice.documentos.items()),
+                    {termino: list(docs) for termino, docs in indice.indice.items()},
+                    list(indice.indice_invertido.keys()),
+                )
+            )
+            connection.close()
+            db.close()
+
+        print(f"✓ Documentos: {len(contenidos[0][0])}, términos: {len(contenidos[0][1])}")
+        assert contenidos[0] == contenidos[1], "Error: el índice paralelo difiere del secuencial"
+
+        print("✅ Test de indexación paralela pasó correctamente\n")
+
+    finally:
+        for archivo_db in (archivo_secuencial, archivo_paralelo):
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                if os.path.exists(archivo_db + ext):
+                    os.remove(archivo_db + ext)
+
+
+def test_carga_masiva():
+    """Test de construcción masiva con runs ordenados y merge de k vías."""
+    print("\n" + "=" * 60)
+    print("TEST 6: Carga masiva ordenada")
+    print("=" * 60)
+
+    if not os.path.exists("corpus"):
+        print("⚠️  Corpus no encontrado, saltando test\n")
+        return
+
+    os.makedirs("tmp", exist_ok=True)
+
+    archivo_normal = "tmp/test_normal.fs"
+    archivo_masivo = "tmp/test_masivo.fs"
+
+    try:
+        crear_indice("corpus", archivo_normal)
+        # Bloques chicos para forzar varios runs
+        crear_indice("corpus", archivo_masivo, masivo=True, max_postings_bloque=5000)
+
+        contenidos = []
+        for archivo_db in (archivo_normal, archivo_masivo):
+            storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+            db = ZODB.DB(storage)
+            connection = db.open()
+            indice = connection.root().indice
+            contenidos.append(
+                (
+                    dict(indice.documentos.items()),
+                    {termino: list(docs) for termino, docs in indice.indice.items()},
+                    {termino: list(docs) for termino, docs in indice.indice_invertido.items()},
+                    dict(indice.terminos_documento.items()),
+                )
+            )
+            assert indice.buscar_sufijo("ción"), "Error: sufijo vacío en el índice"
+            connection.close()
+            db.close()
+
+        print(f"✓ Términos: {len(contenidos[1][1])}")
+        assert contenidos[0] == contenidos[1], "Error: la carga masiva difiere de la normal"
+        assert not [d for d in os.listdir("tmp") if d.startswith("runs_")], "Error: runs sin borrar"
+
+        print("✅ Test de carga masiva pasó correctamente\n")
+
+    finally:
+        for archivo_db in (archivo_normal, archivo_masivo):
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                if os.path.exists(archivo_db + ext):
+                    os.remove(archivo_db + ext)
+
+
+def test_indexacion_incremental():
+    """Test de actualización incremental: altas, modificaciones y bajas."""
+    print("\n" + "=" * 60)
+    print("TEST 7: Indexación incremental")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+
+    directorio = tempfile.mkdtemp(prefix="corpus_", dir="tmp")
+    archivo_db = "tmp/test_incremental.fs"
+
+    def escribir(nombre, contenido):
+        with open(os.path.join(directorio, nombre), "w", encoding="utf-8") as f:
+            f.write(contenido)
+
+    def abrir():
+        storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+        db = ZODB.DB(storage)
+        return db, db.open().root().indice
+
+    try:
+        escribir("Doc1.txt", "el hobbit vive en la comarca")
+        escribir("Doc2.txt", "el dragon duerme en la montaña")
+        escribir("Doc3.txt", "los elfos cantaban canciones")
+        crear_indice(directorio, archivo_db)
+
+        # Modificar, borrar y agregar archivos
+        escribir("Doc2.txt", "el dragon despertó furioso")
+        os.remove(os.path.join(directorio, "Doc3.txt"))
+        escribir("Doc4.txt", "un mago gris llegó a la comarca")
+        crear_indice(directorio, archivo_db, incremental=True)
+
+        db, indice = abrir()
+        print(f"✓ Documentos tras actualizar: {sorted(indice.documentos.values())}")
+        assert sorted(indice.documentos.values()) == ["Doc1", "Doc2", "Doc4"]
+        assert indice.buscar_exacto("comarca") == ["Doc1", "Doc4"], "Error en término compartido"
+        assert indice.buscar_exacto("despertó") == ["Doc2"], "Error en documento modificado"
+        assert indice.buscar_exacto("montaña") == [], "Error: término viejo sin quitar"
+        assert "elfos" not in indice.indice, "Error: término de documento borrado"
+        assert "sofle" not in indice.indice_invertido, "Error: término invertido sin quitar"
+        db.close()
+
+        # Sin cambios no se reindexa nada
+        antes = os.path.getsize(archivo_db)
+        crear_indice(directorio, archivo_db, incremental=True)
+        db, indice = abrir()
+        assert len(indice.documentos) == 3, "Error: documentos duplicados sin cambios"
+        db.close()
+        print(f"✓ Sin cambios: {antes} → {os.path.getsize(archivo_db)} bytes")
+
+        print("✅ Test de indexación incremental pasó correctamente\n")
+
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(archivo_db + ext):
+                os.remove(archivo_db + ext)
+
+
+class TokenizadorSinNumeros(Tokenizador):
+    """Tokenizador de prueba que descarta los términos numéricos."""
+
+    def terminos(self, contenido):
+        return {termino for termino in super().terminos(contenido) if not termino.isdigit()}
+
+
+def test_tokenizador():
+    """Test del tokenizador de una sola pasada y de un tokenizador propio."""
+    print("\n" + "=" * 60)
+    print("TEST 8: Tokenizador")
+    print("=" * 60)
+
+    def tokenizar_por_palabra(contenido):
+        # Tokenización original: una regex por palabra
+        terminos = set()
+        for palabra in contenido.split():
+            termino = re.sub(r"[^\w]", "", palabra.lower())
+            if termino:
+                terminos.add(termino)
+        return terminos
+
+    tokenizador = Tokenizador()
+    texto = "¡El Hobbit! vive, en la «Comarca»... año 1937 — co-autor: _x_ \t fin."
+    assert tokenizador.terminos(texto) == tokenizar_por_palabra(texto), "Error en tokenización"
+
+    if os.path.exists("corpus"):
+        for archivo in sorted(Path("corpus").glob("*.txt")):
+            contenido = archivo.read_text(encoding="utf-8")
+            assert tokenizador.terminos(contenido) == tokenizar_por_palabra(
+                contenido
+            ), f"Error: tokenización distinta en {archivo.name}"
+        print("✓ Misma tokenización que la versión por palabra en el corpus")
+
+    assert tokenizador.normalizar_patron("H*b?t!", "*?") == "h*b?t", "Error en patrón"
+    assert tokenizador.normalizar_patron("H*b?t!", "*") == "h*bt", "Error en patrón"
+
+    # Tokenizador propio
+    indice = IndiceOrdenado()
+    indice.tokenizador = TokenizadorSinNumeros()
+    indice.agregar_documento("Doc1", "el hobbit nació en 2890")
+    assert indice.buscar_exacto("hobbit") == ["Doc1"], "Error con tokenizador propio"
+    assert indice.buscar_exacto("2890") == [], "Error: el tokenizador propio no se aplicó"
+    print("✓ Tokenizador propio aplicado")
+
+    # Plegado de acentos: el documento y las consultas se pliegan igual
+    plegador = Tokenizador(plegar_acentos=True)
+    assert plegador.terminos("La Canción del NIÑO, pingüino") == {
+        "la",
+        "cancion",
+        "del",
+        "nino",
+        "pinguino",
+    }, "Error al plegar acentos"
+    assert plegador.tokens("Árbol árbol") == ["arbol", "arbol"], "Error en tokens plegados"
+    assert plegador.normalizar_patron("Cánc*ón?") == "canc*on?", "Error en patrón plegado"
+    indice = IndiceOrdenado()
+    indice.tokenizador = plegador
+    indice.agregar_documento("Doc1", "una canción élfica")
+    assert indice.buscar_exacto("cancion") == ["Doc1"], "Error buscando sin acento"
+    assert indice.buscar_exacto("Canción") == ["Doc1"], "Error buscando con acento"
+    assert list(indice.buscar_comodin("élf*")) == ["elfica"], "Error en comodín plegado"
+    print("✓ Acentos plegados en documentos y consultas")
+
+    # Largos mínimo y máximo
+    acotado = Tokenizador(largo_minimo=3, largo_maximo=7)
+    assert acotado.terminos("el sol de la montaña y un río") == {"sol", "montaña", "río"}
+    assert acotado.tokens("el sol de un río") == ["sol", "río"], "Error en tokens acotados"
+    assert Tokenizador(largo_minimo=2).terminos("a b cd") == {"cd"}, "Error en largo mínimo"
+    assert Tokenizador(largo_maximo=3).terminos("sol montaña") == {"sol"}, "Error en largo máximo"
+    for largos in [(0, 0), (3, 2), (1, -1)]:
+        try:
+            Tokenizador(largo_minimo=largos[0], largo_maximo=largos[1])
+            assert False, f"Error: largos {largos} deberían fallar"
+        except ValueError:
+            pass
+    print("✓ Términos fuera del rango de largos descartados")
+
+    # Las opciones llegan desde crear_indice
+    corpus = tempfile.mkdtemp(prefix="tokenizador_", dir="tmp")
+    test_db = "tmp/test_tokenizador.fs"
+    Path(corpus, "Doc1.txt").write_text("Él vivió en la montaña", encoding="utf-8")
+    try:
+        indice = crear_indice(corpus, test_db, plegar_acentos=True, largo_minimo=3)
+        assert set(indice.indice.keys()) == {"vivio", "montana"}, "Error en crear_indice"
+
+        # Cambiar las opciones en una actualización incremental reconstruye todo
+        Path(corpus, "Doc1.txt").write_text("dragón canción", encoding="utf-8")
+        Path(corpus, "Doc2.txt").write_text("hobbit dragón", encoding="utf-8")
+        crear_indice(corpus, test_db, tokenizador=Tokenizador())
+        Path(corpus, "Doc2.txt").write_text("hobbit dragón y más", encoding="utf-8")
+        crear_indice(corpus, test_db, incremental=True, plegar_acentos=True)
+        db = abrir_db(test_db)
+        indice = db.open().root().indice
+        vocabulario = list(indice.indice.keys())
+        assert vocabulario == ["cancion", "dragon", "hobbit", "mas", "y"], "Error: vocabulario mixto"
+        assert indice.buscar_exacto("dragón") == ["Doc1", "Doc2"], "Error tras reconstruir"
+        db.close()
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(test_db + ext):
+                os.remove(test_db + ext)
+    print("✓ Opciones del tokenizador aplicadas por crear_indice")
+
+    print("✅ Test de tokenizador pasó correctamente\n")
+
+
+def test_ingesta_por_bloques():
+    """Test de ingesta por bloques con palabras cortadas entre bloques."""
+    print("\n" + "=" * 60)
+    print("TEST 9: Ingesta por bloques")
+    print("=" * 60)
+
+    tokenizador = Tokenizador()
+    texto = "El hobbit vivía en la Comarca; añoraba  la aventura.\nFin del relato "
+
+    # Todos los cortes posibles en bloques de 1 a 7 caracteres
+    for tamano in range(1, 8):
+        bloques = [texto[i : i + tamano] for i in range(0, len(texto), tamano)]
+        assert tokenizador.terminos_por_bloques(bloques) == tokenizador.terminos(
+            texto
+        ), f"Error con bloques de {tamano} caracteres"
+    print("✓ Palabras cortadas entre bloques reconstruidas")
+
+    indice = IndiceOrdenado()
+    indice.agregar_documento_por_bloques("Doc1", iter(["el hob", "bit enc", "ontró un anillo"]))
+    assert indice.buscar_exacto("hobbit") == ["Doc1"], "Error con iterable de bloques"
+    assert indice.buscar_exacto("encontró") == ["Doc1"], "Error con iterable de bloques"
+
+    if os.path.exists("corpus"):
+        # Bloques de pocos bytes: cortan caracteres multibyte UTF-8
+        archivo = sorted(Path("corpus").glob("*.txt"))[0]
+        doc_id = indice.agregar_documento_por_bloques(archivo.stem, archivo, tamano_bloque=7)
+        esperado = tokenizador.terminos(archivo.read_text(encoding="utf-8"))
+        assert set(indice.terminos_documento[doc_id]) == esperado, "Error leyendo por bloques"
+        print(f"✓ {archivo.name} leído en bloques de 7 bytes: {len(esperado)} términos")
+
+    print("✅ Test de ingesta por bloques pasó correctamente\n")
+
+
+def test_indice_posicional():
+    """Test de postings posicionales: frases, proximidad y frecuencias."""
+    print("\n" + "=" * 60)
+    print("TEST 10: Índice posicional")
+    print("=" * 60)
+
+    from posiciones import codificar_posiciones, decodificar_posiciones
+
+    posiciones = [0, 5, 127, 128, 20000]
+    blob = codificar_posiciones(posiciones)
+    assert decodificar_posiciones(blob) == posiciones, "Error en codificación varint"
+    print(f"✓ {len(posiciones)} posiciones codificadas en {len(blob)} bytes")
+
+    indice = IndiceOrdenado(posicional=True)
+    indice.agregar_documento("Doc1", "el anillo único fue forjado en el monte del destino")
+    indice.agregar_documento("Doc2", "el único anillo que importa es el anillo del hobbit")
+    indice.agregar_documento_por_bloques("Doc3", ["el anillo úni", "co volvió"])
+
+    docs = indice.buscar_frase("el anillo único")
+    print(f"  'el anillo único' → {docs}")
+    assert docs == ["Doc1", "Doc3"], "Error en búsqueda de frase"
+    assert indice.buscar_frase("único anillo") == ["Doc2"], "Error en búsqueda de frase"
+    assert indice.buscar_frase("anillo monte") == [], "Error: frase inexistente"
+
+    assert indice.buscar_proximidad("anillo", "forjado", 3) == ["Doc1"], "Error en proximidad"
+    assert indice.buscar_proximidad("anillo", "hobbit", 2) == ["Doc2"], "Error en proximidad"
+    assert indice.frecuencias("anillo") == {"Doc1": 1, "Doc2": 2, "Doc3": 1}, "Error en tf"
+
+    indice.eliminar_documento(0)
+    assert indice.buscar_frase("el anillo único") == ["Doc3"], "Error tras eliminar documento"
+    assert "forjado" not in indice.posiciones, "Error: posiciones sin eliminar"
+
+    try:
+        IndiceOrdenado().buscar_frase("el anillo")
+        assert False, "Error: un índice no posicional debe rechazar frases"
+    except ValueError:
+        pass
+
+    if os.path.exists("corpus"):
+        os.makedirs("tmp", exist_ok=True)
+        archivo_db = "tmp/test_posicional.fs"
+        try:
+            crear_indice("corpus", archivo_db, posicional=True, procesos=2)
+            storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+            db = ZODB.DB(storage)
+            indice = db.open().root().indice
+            docs = indice.buscar_frase("la comarca")
+            print(f"  'la comarca' (corpus) → {docs}")
+            assert docs == ["Bombadil", "Introduccion", "Niggle"], "Error en frase del corpus"
+            assert indice.buscar_frase("érase una vez") == ["Niggle"], "Error en frase del corpus"
+            db.close()
+        finally:
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                if os.path.exists(archivo_db + ext):
+                    os.remove(archivo_db + ext)
+
+    print("✅ Test de índice posicional pasó correctamente\n")
+
+
+def test_permuterm():
+    """Test del índice permuterm para comodines múltiples."""
+    print("\n" + "=" * 60)
+    print("TEST 11: Índice permuterm")
+    print("=" * 60)
+
+    from comodines import clave_permuterm
+
+    assert clave_permuterm("h*b*t") == "t$h", "Error en clave permuterm"
+    assert clave_permuterm("*obbi*") == "obbi", "Error en clave permuterm"
+    assert clave_permuterm("ho?bit") == "bit$ho", "Error en clave permuterm"
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo, hábitat de hobbits",
+        "los elfos cantaban canciones",
+    ]
+    simple = IndiceOrdenado()
+    indice = IndiceOrdenado(permuterm=True)
+    for numero, texto in enumerate(textos, 1):
+        simple.agregar_documento(f"Doc{numero}", texto)
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    for patron in ["h*b*t", "*obbi*", "el?os", "*a*", "c*n*s", "?", "*", "hobbit", "x*"]:
+        resultados = indice.buscar_comodin(patron)
+        print(f"  '{patron}' → {list(resultados.keys())}")
+        assert resultados == simple.buscar_comodin(patron), f"Error con el patrón '{patron}'"
+
+    rotaciones = indice.obtener_estadisticas()["permuterm_rotaciones"]
+    assert rotaciones == sum(len(t) + 1 for t in indice.indice.keys()), "Error en rotaciones"
+
+    # Al eliminar un documento se quitan las rotaciones de sus términos exclusivos
+    indice.eliminar_documento(2)
+    assert "sofle$" not in indice.permuterm, "Error: rotaciones sin eliminar"
+    assert indice.buscar_comodin("*lfo*") == {}, "Error tras eliminar documento"
+
+    if os.path.exists("corpus"):
+        os.makedirs("tmp", exist_ok=True)
+        archivo_db = "tmp/test_permuterm.fs"
+        try:
+            crear_indice("corpus", archivo_db, permuterm=True, masivo=True)
+            storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+            db = ZODB.DB(storage)
+            indice = db.open().root().indice
+            resultados = indice.buscar_comodin("c*n*do")
+            print(f"  'c*n*do' (corpus) → {len(resultados)} términos")
+            assert "cansado" in resultados, "Error con permuterm en el corpus"
+            db.close()
+        finally:
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                if os.path.exists(archivo_db + ext):
+                    os.remove(archivo_db + ext)
+
+    print("✅ Test de permuterm pasó correctamente\n")
+
+
+def test_kgramas():
+    """Test del índice de k-gramas para generar candidatos de comodines."""
+    print("\n" + "=" * 60)
+    print("TEST 12: Índice de k-gramas")
+    print("=" * 60)
+
+    from comodines import kgramas_de_patron, kgramas_de_termino
+
+    assert kgramas_de_termino("hobbit", 3) == {"$ho", "hob", "obb", "bbi", "bit", "it$"}
+    assert kgramas_de_patron("ho*bit", 3) == {"$ho", "bit", "it$"}, "Error en k-gramas"
+    assert kgramas_de_patron("*a*", 3) == set(), "Error: patrón sin k-gramas"
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo, hábitat de hobbits",
+        "los elfos cantaban canciones",
+    ]
+    simple = IndiceOrdenado()
+    indice = IndiceOrdenado(kgramas=3)
+    for numero, texto in enumerate(textos, 1):
+        simple.agregar_documento(f"Doc{numero}", texto)
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    for patron in ["h*b*t", "*obbi*", "el?os", "*a*", "c*n*s", "?", "*", "ho?bit", "x*", "*ón"]:
+        resultados = indice.buscar_comodin(patron)
+        print(f"  '{patron}' → {list(resultados.keys())}")
+        assert resultados == simple.buscar_comodin(patron), f"Error con el patrón '{patron}'"
+
+    indice.eliminar_documento(2)
+    assert "lfo" not in indice.kgramas, "Error: k-gramas sin eliminar"
+    assert "elfos" not in indice.termino_a_id, "Error: id de término sin eliminar"
+    assert indice.buscar_comodin("*lfo*") == {}, "Error tras eliminar documento"
+
+    if os.path.exists("corpus"):
+        os.makedirs("tmp", exist_ok=True)
+        archivo_db = "tmp/test_kgramas.fs"
+        try:
+            crear_indice("corpus", archivo_db)
+            # Se agrega al índice existente sin reconstruirlo
+            crear_indice("corpus", archivo_db, incremental=True, kgramas=3)
+            storage = ZODB.FileStorage.FileStorage(archivo_db, read_only=True)
+            db = ZODB.DB(storage)
+            indice = db.open().root().indice
+            resultados = indice.buscar_comodin("*obbi*")
+            print(f"  '*obbi*' (corpus) → {list(resultados.keys())}")
+            assert indice.obtener_estadisticas()["k"] == 3, "Error en configuración de k"
+            assert "hobbit" in resultados, "Error con k-gramas en el corpus"
+            db.close()
+        finally:
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                if os.path.exists(archivo_db + ext):
+                    os.remove(archivo_db + ext)
+
+    print("✅ Test de k-gramas pasó correctamente\n")
+
+
+def test_plan_comodin():
+    """Test del planificador de búsquedas con comodines."""
+    print("\n" + "=" * 60)
+    print("TEST 13: Planificador de comodines")
+    print("=" * 60)
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo, hábitat de hobbits",
+        "los elfos cantaban canciones y cantos",
+        "cansado de caminar llegó al camino cerrado",
+    ]
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    casos = {
+        "hob?it*": "prefijo",
+        "ca*d?": "prefijo",
+        "*ado": "sufijo",
+        "?obbit": "sufijo",
+        "*a*": "recorrido",
+        "hobbit": "exacto",
+    }
+    for patron, estrategia in casos.items():
+        plan = indice.planificar_comodin(patron)
+        print(f"  '{patron}' → {plan}")
+        assert plan.estrategia == estrategia, f"Error en el plan de '{patron}'"
+
+    assert list(indice.buscar_comodin("ca*d?")) == ["cansado"], "Error en prefijo"
+    assert list(indice.buscar_comodin("*ado")) == ["cansado", "cerrado"], "Error en orden"
+    assert list(indice.buscar_comodin("hob?it*")) == ["hobbit", "hobbits"], "Error en prefijo"
+    assert list(indice.buscar_comodin("?")) == ["y"], "Error en recorrido"
+
+    # Con k-gramas, un infijo selectivo gana al recorrido completo
+    indice_kgramas = IndiceOrdenado(kgramas=3)
+    for numero, texto in enumerate(textos, 1):
+        indice_kgramas.agregar_documento(f"Doc{numero}", texto)
+    plan = indice_kgramas.planificar_comodin("*obbi*")
+    print(f"  '*obbi*' (k-gramas) → {plan}")
+    assert plan.estrategia == "kgramas", "Error: se esperaba el plan de k-gramas"
+    assert list(indice_kgramas.buscar_comodin("*obbi*")) == ["hobbit", "hobbits"]
+
+    print("✅ Test del planificador pasó correctamente\n")
+
+
+def test_busqueda_booleana():
+    """Test de consultas booleanas e intersección galopante."""
+    print("\n" + "=" * 60)
+    print("TEST 14: Búsqueda booleana")
+    print("=" * 60)
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo en la montaña",
+        "el dragon dormía sobre el tesoro de la montaña",
+        "los elfos cantaban una canción en la comarca",
+    ]
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    casos = {
+        "hobbit": ["Doc1", "Doc2"],
+        "hobbit AND montaña": ["Doc2"],
+        "hobbit montaña": ["Doc2"],
+        "comarca OR dragon": ["Doc1", "Doc3", "Doc4"],
+        "la AND NOT hobbit": ["Doc3", "Doc4"],
+        "NOT la": [],
+        "NOT hobbit": ["Doc3", "Doc4"],
+        "(hobbit OR elfos) AND comarca": ["Doc1", "Doc4"],
+        "drag* OR *ción": ["Doc3", "Doc4"],
+        "montaña AND NOT (dragon OR anillo)": [],
+        "h?bbit AND NOT comarca": ["Doc2"],
+        "inexistente AND hobbit": [],
+    }
+    for consulta, esperado in casos.items():
+        resultado = indice.buscar_booleana(consulta)
+        print(f"  {consulta!r} → {resultado}")
+        assert resultado == esperado, f"Error en la consulta {consulta!r}"
+
+    for invalida in ["", "hobbit AND", "(hobbit OR elfos", "OR hobbit", "hobbit )"]:
+        try:
+            parsear_consulta(invalida)
+        except ValueError as e:
+            print(f"  {invalida!r} → error: {e}")
+        else:
+            raise AssertionError(f"Se esperaba error de sintaxis en {invalida!r}")
+
+    # La intersección galopante coincide con la intersección directa
+    grande = IISet(range(0, 300000, 3))
+    chica = IISet([0, 2, 3, 299997, 299999, 150000, 77])
+    esperado = [n for n in chica if n % 3 == 0]
+    assert list(interseccion_galopante(chica, grande)) == esperado, "Error al galopar"
+    arbol = indice.indice["la"]
+    assert list(interseccion_galopante(IISet([1, 2, 3]), arbol)) == [1, 2, 3]
+
+    print("✅ Test de búsqueda booleana pasó correctamente\n")
+
+
+def test_paginacion():
+    """Test de búsquedas paginadas con cursor."""
+    print("\n" + "=" * 60)
+    print("TEST 15: Resultados paginados")
+    print("=" * 60)
+
+    textos = [
+        "cansado callado cambiado caminando canto cantado",
+        "casa caso cazado cerrado camino cabo",
+        "hobbit hobbits dragon cantar",
+    ]
+    indice = IndiceOrdenado(permuterm=True)
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    def todas_las_paginas(paginar, consulta, limite):
+        terminos = []
+        cursor = None
+        while True:
+            pagina = paginar(consulta, limite=limite, cursor=cursor)
+            assert len(pagina.resultados) <= limite, "Error: página demasiado larga"
+            terminos.extend(termino for termino, _ in pagina.resultados)
+            if pagina.cursor is None:
+                return terminos
+            cursor = pagina.cursor
+
+    esperados = [
+        (indice.paginar_prefijo, "ca", list(indice.buscar_prefijo("ca"))),
+        (indice.paginar_sufijo, "ado", list(indice.buscar_sufijo("ado"))),
+        (indice.paginar_comodin, "ca*o", list(indice.buscar_comodin("ca*o"))),
+        (indice.paginar_comodin, "*ant*", list(indice.buscar_comodin("*ant*"))),
+        (indice.paginar_comodin_medio, "ca*do", list(indice.buscar_comodin_medio("ca*do"))),
+        (indice.paginar_comodin_medio, "ca?ado", list(indice.buscar_comodin_medio("ca?ado"))),
+    ]
+    assert esperados[-1][2] == ["cazado"], "Error: '?' en comodín medio"
+    for paginar, consulta, esperado in esperados:
+        for limite in (1, 2, 3, 100):
+            terminos = todas_las_paginas(paginar, consulta, limite)
+            assert sorted(terminos) == sorted(esperado), f"Error paginando '{consulta}'"
+            assert len(terminos) == len(set(terminos)), f"Términos repetidos en '{consulta}'"
+        print(f"  {paginar.__name__}('{consulta}') → {terminos}")
+
+    # Orden de clave y doc_ids sin resolver
+    pagina = indice.paginar_prefijo("ca", limite=3)
+    assert [t for t, _ in pagina.resultados] == ["cabo", "callado", "cambiado"]
+    assert pagina.cursor == "cambiado", "Error: el cursor debe ser la última clave"
+    assert [indice.documentos[d] for d in pagina.resultados[0][1]] == ["Doc2"], "Error en doc_ids"
+
+    pagina = indice.paginar_prefijo("hobbit", limite=2)
+    assert pagina.cursor is None, "Error: la última página no debe tener cursor"
+
+    print("✅ Test de paginación pasó correctamente\n")
+
+
+def test_autocompletado():
+    """Test del autocompletado por frecuencia de documentos."""
+    print("\n" + "=" * 60)
+    print("TEST 16: Autocompletado top-k")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+    test_db = "tmp/test_autocompletado.fs"
+    corpus = tempfile.mkdtemp(prefix="autocompletado_", dir="tmp")
+
+    textos = {
+        "a": "casa camino cansado hobbit",
+        "b": "casa camino hobbit hora",
+        "c": "casa cantar hobbit",
+        "d": "casa camino caballo",
+    }
+    for nombre, texto in textos.items():
+        Path(corpus, f"{nombre}.txt").write_text(texto, encoding="utf-8")
+
+    try:
+        indice = crear_indice(corpus, test_db, autocompletado=2)
+
+        storage = ZODB.FileStorage.FileStorage(test_db)
+        db = ZODB.DB(storage)
+        connection = db.open()
+        indice = connection.root().indice
+
+        assert indice.autocompletado_vigente, "Error: la caché debería estar vigente"
+        completados = indice.autocompletar("ca", k=3)
+        print(f"  'ca' → {completados}")
+        assert completados == [("casa", 4), ("camino", 3), ("caballo", 1)]
+        assert indice.autocompletar("h") == [("hobbit", 3), ("hora", 1)]
+        assert indice.autocompletar("can") == [("cansado", 1), ("cantar", 1)]
+        assert indice.autocompletar("x") == [], "Error: prefijo sin términos"
+        assert indice.autocompletar("", k=1) == [("casa", 4)], "Error en el prefijo vacío"
+
+        def comparar_con_recorrido():
+            for prefijo in ["", "c", "ca", "h", "ho", "hob", "z"]:
+                con_cache = indice.autocompletar(prefijo)
+                indice.autocompletado_vigente = False
+                assert con_cache == indice.autocompletar(prefijo), f"Error en '{prefijo}'"
+                indice.autocompletado_vigente = True
+
+        # Agregar o quitar documentos actualiza df y solo los prefijos afectados
+        indice.agregar_documento("e", "hobbit hora hora")
+        assert indice.autocompletado_vigente, "Error: la caché debería seguir vigente"
+        assert indice.autocompletar("h") == [("hobbit", 4), ("hora", 2)]
+        indice.eliminar_documento(0)
+        assert indice.frecuencia_documentos.get("cansado") is None, "Error al quitar df"
+        assert indice.autocompletar("ca", k=2) == [("casa", 3), ("camino", 2)]
+        assert "can" not in [t for t, _ in indice.autocompletar("ca")], "Error: quedó 'cansado'"
+        comparar_con_recorrido()
+
+        # Con listas cortas, un término que baja deja lugar a otro de afuera
+        indice.construir_autocompletado(2, k=2)
+        indice.eliminar_documento(1)
+        indice.eliminar_documento(3)
+        assert indice.autocompletar("ca", k=2) == [("cantar", 1), ("casa", 1)]
+        indice.agregar_documento("f", "caballo caballo cantar")
+        assert indice.autocompletar("ca", k=2) == [("cantar", 2), ("caballo", 1)]
+        comparar_con_recorrido()
+
+        transaction.abort()
+        connection.close()
+        db.close()
+
+        print("✅ Test de autocompletado pasó correctamente\n")
+
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(test_db + ext):
+                os.remove(test_db + ext)
+
+
+def test_cache_resultados():
+    """Test de la caché de resultados con generaciones y LRU."""
+    print("\n" + "=" * 60)
+    print("TEST 17: Caché de resultados")
+    print("=" * 60)
+
+    indice = IndiceOrdenado()
+    indice.agregar_documento("Doc1", "el hobbit vive en la comarca")
+    indice.agregar_documento("Doc2", "el hobbit encontró un anillo")
+
+    primero = indice.buscar_prefijo("hob")
+    assert indice.buscar_prefijo("HOB") == primero, "Error: el patrón normalizado debe acertar"
+    assert indice.buscar_exacto("hobbit") == ["Doc1", "Doc2"]
+    stats = indice.estadisticas_cache()
+    print(f"  Tras 3 consultas: {stats}")
+    assert (stats["aciertos"], stats["fallos"]) == (1, 2), "Error en los contadores"
+
+    # Modificar un resultado devuelto no altera los aciertos siguientes
+    primero["hobbit"].append("Intruso")
+    primero["hobbitses"] = []
+    assert indice.buscar_prefijo("hob") == {"hobbit": ["Doc1", "Doc2"]}, "Error: caché alterada"
+    indice.buscar_exacto("hobbit").clear()
+    assert indice.buscar_exacto("hobbit") == ["Doc1", "Doc2"], "Error: lista compartida"
+    indice.buscar_booleana("hobbit AND anillo", ids=True).insert(0)
+    por_ids = indice.buscar_booleana("hobbit AND anillo", ids=True)
+    assert list(por_ids) == [1], "Error: IISet compartido"
+
+    # Un documento nuevo cambia la generación y la caché se invalida sola
+    generacion = indice.generacion
+    indice.agregar_documento("Doc3", "los hobbits cantan")
+    assert indice.generacion > generacion, "Error: la generación debe aumentar"
+    assert list(indice.buscar_prefijo("hob")) == ["hobbit", "hobbits"], "Error: resultado viejo"
+    assert indice.estadisticas_cache()["invalidaciones"] == 1, "Error al invalidar"
+
+    indice.eliminar_documento(0)
+    assert indice.buscar_exacto("comarca") == [], "Error: resultado viejo tras eliminar"
+
+    # Capacidad chica: se desaloja la entrada usada hace más tiempo
+    indice.configurar_cache(capacidad=5)
+    indice.buscar_exacto("hobbit")  # peso 2 (solo queda Doc2)
+    indice.buscar_exacto("anillo")  # peso 2
+    indice.buscar_exacto("hobbit")  # acierto: pasa a ser la más reciente
+    indice.buscar_exacto("cantan")  # peso 2: desaloja "anillo"
+    stats = indice.estadisticas_cache()
+    print(f"  Con capacidad 5: {stats}")
+    assert stats["desalojos"] == 1 and stats["peso"] <= 5, "Error en el desalojo"
+    indice.buscar_exacto("hobbit")
+    assert indice.estadisticas_cache()["aciertos"] == 2, "Error: se desalojó la entrada reciente"
+
+    # La generación persiste y aumenta en cada crear_indice
+    os.makedirs("tmp", exist_ok=True)
+    test_db = "tmp/test_cache.fs"
+    try:
+        generaciones = []
+        for _ in range(2):
+            crear_indice("corpus", test_db, incremental=True)
+            storage = ZODB.FileStorage.FileStorage(test_db, read_only=True)
+            db = ZODB.DB(storage)
+            generaciones.append(db.open().root().indice.generacion)
+            db.close()
+        print(f"  Generaciones tras dos commits: {generaciones}")
+        assert generaciones[1] > generaciones[0], "Error: crear_indice debe cambiar la generación"
+    finally:
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(test_db + ext):
+                os.remove(test_db + ext)
+
+    print("✅ Test de caché de resultados pasó correctamente\n")
+
+
+def test_busqueda_en_lote():
+    """Test de búsquedas en lote con un solo recorrido."""
+    print("\n" + "=" * 60)
+    print("TEST 18: Búsqueda en lote")
+    print("=" * 60)
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo, hábitat de hobbits",
+        "los elfos cantaban una canción",
+        "cansado de caminar llegó al camino cerrado",
+    ]
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+    indice.configurar_cache(0)
+
+    patrones = [
+        "hobbit", "Hobbit", "ca*", "*ado", "inexistente", "hob*", "h?bbit",
+        "c*o", "hobbits", "*", "ho*", "zzz*", "*ción", "camino",
+    ]
+    esperados = []
+    for patron in patrones:
+        if "?" in patron or patron.strip("*").count("*"):
+            esperados.append(indice.buscar_comodin(patron))
+        elif patron == "*":
+            esperados.append(indice.buscar_prefijo(""))
+        elif patron.endswith("*"):
+            esperados.append(indice.buscar_prefijo(patron[:-1]))
+        elif patron.startswith("*"):
+            esperados.append(indice.buscar_sufijo(patron[1:]))
+        else:
+            docs = indice.buscar_exacto(patron)
+            esperados.append({indice.normalizar_termino(patron): docs} if docs else {})
+
+    # Con recorrido único y con búsquedas por consulta
+    for densidad in (10**9, 0):
+        indexar_modulo.CLAVES_POR_CONSULTA_BARRIDO = densidad
+        try:
+            resultados = indice.buscar_lote(patrones)
+        finally:
+            indexar_modulo.CLAVES_POR_CONSULTA_BARRIDO = 16
+        assert len(resultados) == len(patrones), "Error: una respuesta por patrón"
+        for patron, resultado, esperado in zip(patrones, resultados, esperados):
+            assert resultado == esperado, f"Error en '{patron}' (densidad {densidad})"
+            assert list(resultado) == list(esperado), f"Error de orden en '{patron}'"
+
+    for patron, resultado in zip(patrones[:6], resultados):
+        print(f"  '{patron}' → {list(resultado)}")
+
+    # Un prefijo seguido de claves anidadas en él: el barrido llega hasta su final
+    indexar_modulo.CLAVES_POR_CONSULTA_BARRIDO = 10**9
+    try:
+        prefijo, exacto, anidado = indice.buscar_lote(["ca*", "camino", "cam*"])
+    finally:
+        indexar_modulo.CLAVES_POR_CONSULTA_BARRIDO = 16
+    assert prefijo == indice.buscar_prefijo("ca"), "Error: prefijo truncado por una clave anidada"
+    assert "cansado" in prefijo and exacto == {"camino": indice.buscar_exacto("camino")}
+    assert anidado == indice.buscar_prefijo("cam"), "Error en el prefijo anidado"
+    assert indice.buscar_lote([]) == [], "Error: lote vacío"
+
+    print("✅ Test de búsqueda en lote pasó correctamente\n")
+
+
+def test_resultados_por_doc_id():
+    """Test de resultados como doc_ids y de la tabla de documentos."""
+    print("\n" + "=" * 60)
+    print("TEST 19: Resultados por doc_id")
+    print("=" * 60)
+
+    indice = IndiceOrdenado()
+    indice.agregar_documento("Doc1", "el hobbit vive en la comarca")
+    indice.agregar_documento("Doc2", "el hobbit encontró un anillo, hábitat de hobbits")
+    indice.agregar_documento("Doc3", "los elfos cantaban")
+
+    assert list(indice.buscar_exacto("hobbit", ids=True)) == [0, 1], "Error en doc_ids"
+    assert list(indice.buscar_exacto("inexistente", ids=True)) == [], "Error en término ausente"
+    assert indice.buscar_exacto("hobbit") == ["Doc1", "Doc2"], "Error: el modo nombres cambió"
+
+    for metodo, patron in [
+        (indice.buscar_prefijo, "hob"),
+        (indice.buscar_sufijo, "bit"),
+        (indice.buscar_comodin, "h?bb*"),
+        (indice.buscar_comodin_medio, "h*s"),
+    ]:
+        por_id = metodo(patron, ids=True)
+        por_nombre = metodo(patron)
+        print(f"  {metodo.__name__}('{patron}') → { {t: list(d) for t, d in por_id.items()} }")
+        assert list(por_id) == list(por_nombre), f"Error en los términos de '{patron}'"
+        for termino, doc_ids in por_id.items():
+            assert indice.nombres_documentos(doc_ids) == por_nombre[termino]
+
+    assert list(indice.buscar_booleana("hobbit NOT comarca", ids=True)) == [1]
+
+    # La tabla se arma una vez y se rearma cuando cambia el índice
+    tabla = indice.tabla_documentos
+    assert tabla == ["Doc1", "Doc2", "Doc3"], "Error en la tabla de documentos"
+    assert indice.tabla_documentos is tabla, "Error: la tabla debe reutilizarse"
+    indice.eliminar_documento(1)
+    indice.agregar_documento("Doc4", "el hobbit vuelve")
+    assert indice.tabla_documentos == ["Doc1", None, "Doc3", "Doc4"], "Error: tabla vieja"
+    assert indice.buscar_exacto("hobbit") == ["Doc1", "Doc4"], "Error tras actualizar"
+
+    print("✅ Test de resultados por doc_id pasó correctamente\n")
+
+
+def test_busqueda_difusa():
+    """Test de la búsqueda difusa con autómata de Levenshtein."""
+    print("\n" + "=" * 60)
+    print("TEST 20: Búsqueda difusa")
+    print("=" * 60)
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "los hobbits encontraron un anillo",
+        "el hábito no hace al monje",
+        "un conejo y un robot",
+    ]
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    resultados = indice.buscar_difuso("hobit", max_ediciones=1)
+    print(f"  'hobit' (1 edición) → {resultados}")
+    assert resultados == [("hobbit", 1, ["Doc1"])], "Error con una edición"
+
+    resultados = indice.buscar_difuso("Hobit", max_ediciones=2)
+    print(f"  'Hobit' (2 ediciones) → {[(t, d) for t, d, _ in resultados]}")
+    assert [(t, d) for t, d, _ in resultados] == [
+        ("hobbit", 1),
+        ("hobbits", 2),
+        ("hábito", 2),
+        ("robot", 2),
+    ]
+    assert indice.buscar_difuso("comarca", 0) == [("comarca", 0, ["Doc1"])], "Error sin ediciones"
+    assert indice.buscar_difuso("xyzxyzxyz", 2) == [], "Error: no debería coincidir"
+    _, _, doc_ids = indice.buscar_difuso("anilo", 1, ids=True)[0]
+    assert list(doc_ids) == [1], "Error en doc_ids"
+
+    # El recorrido con saltos coincide con comparar contra todo el vocabulario
+    for consulta in ["hobit", "el", "un", "abito", "conjeo", "", "monje"]:
+        for ediciones in range(4):
+            esperado = sorted(
+                (distancia_levenshtein(termino, consulta), termino)
+                for termino in indice.indice.keys()
+                if distancia_levenshtein(termino, consulta) <= ediciones
+            )
+            obtenido = [(d, t) for t, d, _ in indice.buscar_difuso(consulta, ediciones)]
+            assert obtenido == esperado, f"Error en '{consulta}' con {ediciones} ediciones"
+
+    try:
+        indice.buscar_difuso("hobbit", -1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Se esperaba error con ediciones negativas")
+
+    print("✅ Test de búsqueda difusa pasó correctamente\n")
+
+
+def test_conteos():
+    """Test de los conteos sin materializar resultados."""
+    print("\n" + "=" * 60)
+    print("TEST 21: Conteos")
+    print("=" * 60)
+
+    textos = [
+        "el hobbit vive en la comarca",
+        "el hobbit encontró un anillo, hábitat de hobbits",
+        "los elfos cantaban canciones y cantos",
+        "cansado de caminar llegó al camino cerrado",
+    ]
+    indice = IndiceOrdenado(kgramas=3)
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    def conteo_esperado(resultados):
+        documentos = set()
+        for docs in resultados.values():
+            documentos.update(docs)
+        return (len(resultados), len(documentos))
+
+    casos = [
+        (indice.contar_prefijo, indice.buscar_prefijo, ["ca", "hob", "", "zzz"]),
+        (indice.contar_sufijo, indice.buscar_sufijo, ["ado", "s", "xyz"]),
+        (
+            indice.contar_comodin,
+            indice.buscar_comodin,
+            ["ca*", "*ado", "h?bbit*", "*an*", "hobbit", "inexistente", "c*o"],
+        ),
+        (
+            indice.contar_comodin_medio,
+            indice.buscar_comodin_medio,
+            ["ca*do", "h*s", "ca*", "cant?s", "c?nsado"],
+        ),
+    ]
+    assert tuple(indice.contar_comodin_medio("cant?s")) == (1, 1), "Error: '?' en comodín medio"
+    for contar, buscar, patrones in casos:
+        for patron in patrones:
+            conteo = contar(patron)
+            assert tuple(conteo) == conteo_esperado(buscar(patron)), f"Error en '{patron}'"
+        print(f"  {contar.__name__}('{patrones[0]}') → {contar(patrones[0])}")
+
+    conteo = indice.contar_prefijo("ca")
+    assert (conteo.terminos, conteo.documentos) == (6, 2), "Error en los campos del conteo"
+
+    print("✅ Test de conteos pasó correctamente\n")
+
+
+def test_busqueda_rango():
+    """Test de consultas por rango lexicográfico."""
+    print("\n" + "=" * 60)
+    print("TEST 22: Búsqueda por rango")
+    print("=" * 60)
+
+    indice = IndiceOrdenado()
+    indice.agregar_documento("Doc1", "ma mano mapa me mesa mi")
+    indice.agregar_documento("Doc2", "mano cansado cerrado pesado")
+
+    def terminos(rango):
+        return [termino for termino, _ in rango]
+
+    assert terminos(indice.buscar_rango("ma", "me")) == ["ma", "mano", "mapa", "me"]
+    assert terminos(indice.buscar_rango("ma", "me", incluir_min=False, incluir_max=False)) == [
+        "mano",
+        "mapa",
+    ]
+    assert terminos(indice.buscar_rango("MA", "me", limite=2)) == ["ma", "mano"]
+    assert terminos(indice.buscar_rango(maximo="cerrado", incluir_max=False)) == ["cansado"]
+    assert terminos(indice.buscar_rango("pesado", incluir_min=False)) == [], "Error al final"
+    assert terminos(indice.buscar_rango(minimo="mi")) == ["mi", "pesado"]
+    assert terminos(indice.buscar_rango("z", "a")) == [], "Error con cotas invertidas"
+    print(f"  'ma'..'me' → {terminos(indice.buscar_rango('ma', 'me'))}")
+
+    # Sin cota inferior no se debe excluir el primer término
+    assert terminos(indice.buscar_rango(incluir_min=False))[0] == "cansado"
+
+    mano = dict(indice.buscar_rango("mano", "mano"))["mano"]
+    assert list(mano) == [0, 1], "Error en los doc_ids"
+
+    invertidos = terminos(indice.buscar_rango_invertido("oda", "odb", incluir_max=False))
+    print(f"  terminados en 'ado' → {invertidos}")
+    assert invertidos == ["cerrado", "pesado", "cansado"], "Error en el rango invertido"
+    assert terminos(indice.buscar_rango_invertido(limite=1)) == ["ma"], "Error con límite"
+
+    # El resultado es un iterador: se consume a demanda
+    rango = indice.buscar_rango("ma")
+    assert next(rango)[0] == "ma", "Error al consumir el iterador"
+
+    print("✅ Test de búsqueda por rango pasó correctamente\n")
+
+
+def test_busqueda_regex():
+    """Test de la búsqueda por expresión regular con autómata determinista."""
+    print("\n" + "=" * 60)
+    print("TEST 23: Búsqueda por expresión regular")
+    print("=" * 60)
+
+    textos = [
+        "la casa y las casas del caso",
+        "los casos de cosas en 2024",
+        "deshacer y rehacer el camino",
+        "el hobbit cansado llegó a casa",
+    ]
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(textos, 1):
+        indice.agregar_documento(f"Doc{numero}", texto)
+
+    resultados = indice.buscar_regex("cas[ao]s?")
+    print(f"  'cas[ao]s?' → {resultados}")
+    assert list(resultados) == ["casa", "casas", "caso", "casos"], "Error con clase y ?"
+    assert resultados["casa"] == ["Doc1", "Doc4"], "Error en los documentos"
+    assert list(indice.buscar_regex("(des|re)hac.+")) == ["deshacer", "rehacer"]
+    assert list(indice.buscar_regex("\\d{4}")) == ["2024"], "Error con \\d y {m}"
+    assert list(indice.buscar_regex("c[^a]sas")) == ["cosas"], "Error con clase negada"
+    assert list(indice.buscar_regex("^ca(mi|n)")) == [], "Error: debe coincidir completo"
+    assert list(indice.buscar_regex("casa", ids=True)["casa"]) == [0, 3], "Error en doc_ids"
+
+    # El autómata coincide con re.fullmatch sobre todo el vocabulario
+    for expresion in ["c.*", ".*as", "[a-d]+", "(la|los?)", "\\w{2,3}", "(?:ca|co)s[ao]s?", "a|"]:
+        esperado = [t for t in indice.indice.keys() if re.fullmatch(expresion, t)]
+        assert list(indice.buscar_regex(expresion)) == esperado, f"Error en '{expresion}'"
+
+    # Los prefijos muertos se saltan sin visitar sus claves
+    recorrido = {}
+    indice.buscar_regex("h.*", estadisticas=recorrido)
+    print(f"  'h.*' → {recorrido}")
+    assert recorrido["vocabulario"] == len(indice.indice), "Error en el vocabulario"
+    assert recorrido["visitadas"] < recorrido["vocabulario"], "Error: no se saltó nada"
+    assert recorrido["saltos"] >= 1, "Error en los saltos"
+
+    for invalida in ["(ca", "ca{3,1}", "(?=ca)", "*a", "ca$s"]:
+        try:
+            indice.buscar_regex(invalida)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"Se esperaba error con '{invalida}'")
+
+    print("✅ Test de búsqueda por expresión regular pasó correctamente\n")
+
+
+def test_instantanea():
+    """Test de la instantánea de solo lectura leída con mmap."""
+    print("\n" + "=" * 60)
+    print("TEST 24: Instantánea con mmap")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+    ruta = "tmp/test_instantanea.snap"
+
+    indice = IndiceOrdenado()
+    indice.agregar_documento("Doc1", "el hobbit cansado vive en la casa")
+    indice.agregar_documento("Doc2", "los hobbits cerraron la casa")
+    indice.agregar_documento("Borrado", "dragón")
+    indice.agregar_documento("Doc4", "un hábito pesado y otro hábitat")
+    indice.eliminar_documento(2)
+    # Más de 127 documentos y gaps grandes: varints de varios bytes
+    for numero in range(200):
+        indice.agregar_documento(f"Extra{numero}", "común" + (" raro" if numero in (0, 199) else ""))
+
+    try:
+        resumen = escribir_instantanea(indice, ruta)
+        print(f"  {resumen}")
+        assert resumen["terminos"] == len(indice.indice), "Error en la cantidad de términos"
+        assert not os.path.exists(ruta + ".tmp"), "Error: quedó el temporal"
+
+        with IndiceInstantanea(ruta) as instantanea:
+            assert instantanea.obtener_estadisticas()["total_documentos"] == 203
+            assert instantanea.buscar_exacto("Casa") == ["Doc1", "Doc2"], "Error en exacto"
+            assert instantanea.buscar_exacto("dragón") == [], "Error: documento borrado"
+            assert len(instantanea.buscar_exacto("común")) == 200, "Error con df grande"
+            assert instantanea.buscar_exacto("raro") == ["Extra0", "Extra199"], "Error en gaps"
+
+            consultas = [
+                ("buscar_prefijo", ["h", "ca", "", "zzz"]),
+                ("buscar_sufijo", ["ado", "s", "xyz"]),
+                ("buscar_comodin", ["h?bbit*", "*ado", "c*s*", "*", "x*"]),
+                ("buscar_comodin_medio", ["ca*do", "h*s", "*sa", "ho*"]),
+            ]
+            for metodo, patrones in consultas:
+                for patron in patrones:
+                    esperado = getattr(indice, metodo)(patron)
+                    obtenido = getattr(instantanea, metodo)(patron)
+                    assert list(obtenido.items()) == list(esperado.items()), (
+                        f"Error en {metodo}('{patron}')"
+                    )
+            print(f"  sufijo 'ado' → {instantanea.buscar_sufijo('ado')}")
+
+            assert list(instantanea.buscar_prefijo("hob", ids=True)["hobbit"]) == [0]
+            assert instantanea.buscar_booleana("casa AND NOT hobbits") == ["Doc1"]
+            assert instantanea.buscar_difuso("hobit", 1) == indice.buscar_difuso("hobit", 1)
+            assert instantanea.buscar_regex("h.bit.*") == indice.buscar_regex("h.bit.*")
+            assert instantanea.autocompletar("c") == indice.autocompletar("c")
+            rango = [t for t, _ in instantanea.buscar_rango("ca", "co", incluir_max=False)]
+            assert rango == [t for t, _ in indice.buscar_rango("ca", "co", incluir_max=False)]
+            invertido = [t for t, _ in instantanea.buscar_rango_invertido("oda", "odb")]
+            assert invertido == ["pesado", "cansado"], "Error en el rango invertido"
+
+        Path(ruta).write_bytes(b"no es una instantanea")
+        try:
+            IndiceInstantanea(ruta)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Se esperaba error con un archivo inválido")
+
+        print("✅ Test de instantánea pasó correctamente\n")
+
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def test_vocabulario_comprimido():
+    """Test del vocabulario con front-coding en bloques."""
+    print("\n" + "=" * 60)
+    print("TEST 25: Vocabulario con front-coding")
+    print("=" * 60)
+
+    terminos = sorted(
+        ["casa", "casas", "casado", "cansado", "hobbit", "hobbits", "hábito", "ñandú", "über"]
+        + [f"término{numero:03d}" for numero in range(100)]
+    )
+    consultas = ["", "a", "cas", "casa", "casb", "hobbit", "hábitoz", "término050", "zzz", "ü"]
+
+    for tamano_bloque in (1, 3, 16, 200):
+        vocabulario = VocabularioComprimido.desde_terminos(terminos, tamano_bloque)
+        plano = VocabularioPlano.desde_terminos(terminos)
+        assert len(vocabulario) == len(terminos), "Error en la cantidad de términos"
+        assert list(vocabulario.keys()) == terminos, "Error al decodificar los bloques"
+        assert [vocabulario[i] for i in range(len(terminos))] == terminos, "Error en el acceso"
+        for consulta in consultas:
+            esperado = [t for t in terminos if t >= consulta]
+            assert list(vocabulario.keys(min=consulta)) == esperado, f"Error en keys('{consulta}')"
+            assert vocabulario.posicion(consulta) == plano.posicion(consulta)
+            assert vocabulario.posicion_derecha(consulta) == plano.posicion_derecha(consulta)
+            assert (consulta in vocabulario) == (consulta in terminos), f"Error con '{consulta}'"
+            rango = [vocabulario[i] for i in vocabulario.rango_prefijo(consulta)]
+            assert rango == [t for t in terminos if t.startswith(consulta)], "Error en el prefijo"
+        if tamano_bloque > 1:
+            assert vocabulario.bytes_datos() < plano.bytes_datos(), "Error: no comprimió"
+
+    comprimido = VocabularioComprimido.desde_terminos(terminos)
+    print(
+        f"  {len(terminos)} términos: {plano.bytes_datos()} bytes planos, "
+        f"{comprimido.bytes_datos()} con front-coding"
+    )
+
+    vacio = VocabularioComprimido.desde_terminos([])
+    assert len(vacio) == 0 and list(vacio.keys()) == [] and "a" not in vacio
+    try:
+        codificar_frontal(terminos, 0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Se esperaba error con un bloque vacío")
+
+    # Instantánea con los vocabularios comprimidos: mismos resultados
+    os.makedirs("tmp", exist_ok=True)
+    ruta = "tmp/test_vocabulario.snap"
+    indice = IndiceOrdenado()
+    for numero, texto in enumerate(
+        ["el hobbit cansado vive en la casa", "los hobbits cerraron la casa", "un hábito pesado"]
+    ):
+        indice.agregar_documento(f"Doc{numero + 1}", texto)
+
+    try:
+        escribir_instantanea(indice, ruta, bloque_vocabulario=4)
+        with IndiceInstantanea(ruta) as instantanea:
+            assert instantanea.obtener_estadisticas()["bloque_vocabulario"] == 4
+            assert instantanea.buscar_exacto("casa") == ["Doc1", "Doc2"], "Error en exacto"
+            for metodo, patron in [
+                ("buscar_prefijo", "h"),
+                ("buscar_sufijo", "ado"),
+                ("buscar_comodin", "h*t*"),
+                ("buscar_comodin_medio", "c*o"),
+            ]:
+                esperado = getattr(indice, metodo)(patron)
+                obtenido = getattr(instantanea, metodo)(patron)
+                assert list(obtenido.items()) == list(esperado.items()), f"Error en {metodo}"
+            assert instantanea.buscar_regex("h.b+its?") == indice.buscar_regex("h.b+its?")
+            assert instantanea.buscar_difuso("hobit", 1) == indice.buscar_difuso("hobit", 1)
+            invertido = [t for t, _ in instantanea.buscar_rango_invertido("oda", "odb")]
+            assert invertido == ["pesado", "cansado"], "Error en el rango invertido"
+
+        print("✅ Test de vocabulario con front-coding pasó correctamente\n")
+
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def test_cache_zodb():
+    """Test de límites, precalentamiento y contadores de la caché de ZODB."""
+    print("\n" + "=" * 60)
+    print("TEST 26: Caché de objetos de ZODB")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+    test_db = "tmp/test_cache_zodb.fs"
+    corpus = tempfile.mkdtemp(prefix="cache_zodb_", dir="tmp")
+
+    # Suficientes términos para que los árboles tengan varios buckets
+    for numero in range(4):
+        palabras = [f"palabra{numero}x{i:04d}" for i in range(600)] + ["casa", "común"] * 3
+        Path(corpus, f"doc{numero}.txt").write_text(" ".join(palabras), encoding="utf-8")
+
+    try:
+        crear_indice(corpus, test_db, autocompletado=1)
+
+        try:
+            abrir_db(test_db, cache_objetos=0)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Se esperaba error con una caché vacía")
+
+        db = abrir_db(test_db, cache_objetos=50, cache_mb=1)
+        connection = db.open()
+        indice = connection.root().indice
+        estadisticas = ContadorCache(connection).estadisticas()
+        assert estadisticas["limite_objetos"] == 50, "Error en el límite de objetos"
+        assert estadisticas["limite_bytes"] == 1024 * 1024, "Error en el límite de bytes"
+
+        resumen = precalentar(indice)
+        print(f"  Precalentado: {resumen}")
+        assert resumen["nodos"] >= 2 and resumen["cargas"] > 0, "Error al precalentar"
+        assert resumen["terminos"] > 0, "Error: debió usar los términos más frecuentes"
+        assert precalentar(indice, ["casa", "inexistente"])["terminos"] == 1
+
+        indice.configurar_cache(0)  # Que la consulta repetida vuelva a los árboles
+        contador = ContadorCache(connection)
+        with contador.medir() as primera:
+            assert len(indice.buscar_prefijo("palabra2x00")) == 100
+        with contador.medir() as segunda:
+            assert len(indice.buscar_prefijo("palabra2x00")) == 100
+        print(f"  Primera consulta: {primera}, repetida: {segunda}")
+        assert primera["cargas"] > 0, "Error: la primera consulta debió cargar buckets"
+        assert segunda["cargas"] == 0, "Error: la consulta repetida no debió cargar nada"
+        assert segunda["aciertos"] >= primera["cargas"], "Error en los aciertos"
+        with contador.medir() as caliente:
+            indice.buscar_exacto("casa")
+        assert caliente["cargas"] == 0, "Error: 'casa' debió quedar precalentado"
+        assert contador.estadisticas()["consultas"] == 3, "Error en los totales"
+
+        # Recortar respeta el límite y conserva el índice con sus cachés volátiles
+        cache_resultados = indice.cache_resultados
+        assert connection._cache.cache_non_ghost_count > 50
+        aplicar_limites(connection, [indice])
+        assert connection._cache.cache_non_ghost_count <= 50, "Error al recortar la caché"
+        assert indice.cache_resultados is cache_resultados, "Error: se desalojó el índice"
+
+        connection.close()
+        db.close()
+
+        print("✅ Test de caché de ZODB pasó correctamente\n")
+
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+        for ext in ["", ".index", ".tmp", ".lock"]:
+            if os.path.exists(test_db + ext):
+                os.remove(test_db + ext)
+
+
+def test_servidor():
+    """Test del servidor de consultas HTTP/JSON y del generador de carga."""
+    print("\n" + "=" * 60)
+    print("TEST 27: Servidor de consultas")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+    test_db = "tmp/test_servidor.fs"
+    socket_unix = "tmp/test_servidor.sock"
+    corpus = tempfile.mkdtemp(prefix="servidor_", dir="tmp")
+
+    textos = {
+        "Doc1": "el hobbit cansado vive en la casa",
+        "Doc2": "los hobbits cerraron la casa",
+        "Doc3": "un hábito pesado",
+    }
+    for nombre, texto in textos.items():
+        Path(corpus, f"{nombre}.txt").write_text(texto, encoding="utf-8")
+
+    async def probar(servidor: ServidorConsultas):
+        escucha = await servidor.iniciar(unix=socket_unix)
+        lector, escritor = await conectar(unix=socket_unix)
+        try:
+            estado, datos = await consultar(lector, escritor, "exacto", "Casa")
+            assert estado == 200 and datos["documentos"] == ["Doc1", "Doc2"], "Error en exacto"
+            estado, datos = await consultar(lector, escritor, "prefijo", "hob")
+            assert datos["resultados"] == {"hobbit": ["Doc1"], "hobbits": ["Doc2"]}
+            assert datos["terminos"] == 2 and not datos["truncado"]
+            _, datos = await consultar(lector, escritor, "sufijo", "ado", limite=1)
+            assert datos["terminos"] == 1 and datos["truncado"], "Error al truncar"
+            assert list(datos["resultados"]) == ["pesado"], "Error en el orden del sufijo"
+            _, datos = await consultar(lector, escritor, "comodin", "h?bbit*")
+            assert list(datos["resultados"]) == ["hobbit", "hobbits"], "Error en comodín"
+            print(f"  comodin 'h?bbit*' → {datos['resultados']}")
+
+            # POST con JSON, por la misma conexión keep-alive
+            cuerpo = json.dumps({"tipo": "comodin_medio", "q": "ca*do"}).encode("utf-8")
+            escritor.write(
+                b"POST /buscar HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(cuerpo) + cuerpo
+            )
+            estado, datos = await leer_respuesta(lector)
+            assert estado == 200 and list(datos["resultados"]) == ["cansado"], "Error en POST"
+            _, datos = await consultar(lector, escritor, "comodin_medio", "ca?sado")
+            assert datos["resultados"] == {"cansado": ["Doc1"]}, "Error: '?' en comodin_medio"
+
+            estado, datos = await consultar(lector, escritor, "regex", "x")
+            assert estado == 400 and "Tipo inválido" in datos["error"], "Error: tipo inválido"
+            escritor.write(b"POST /buscar HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}")
+            assert (await leer_respuesta(lector))[0] == 400, "Error: JSON inválido"
+            escritor.write(b"GET /otra HTTP/1.1\r\n\r\n")
+            assert (await leer_respuesta(lector))[0] == 404, "Error: ruta inexistente"
+            escritor.write(b"GET /estadisticas HTTP/1.1\r\n\r\n")
+            estado, datos = await leer_respuesta(lector)
+            assert estado == 200 and datos["total_documentos"] == 3, "Error en estadísticas"
+
+            resumen = await generar_carga(
+                [("exacto", "casa"), ("prefijo", "h"), ("comodin", "*ado")],
+                concurrencia=4,
+                total=60,
+                unix=socket_unix,
+            )
+            print(f"  Carga: {resumen['qps']:.0f} consultas/s, p99 {resumen['p99']:.2f} ms")
+            assert resumen["estados"] == {200: 60}, "Error bajo carga"
+        finally:
+            escritor.close()
+            escucha.close()
+            await escucha.wait_closed()
+
+    try:
+        crear_indice(corpus, test_db)
+
+        servidor = ServidorConsultas(test_db, trabajadores=2)
+        try:
+            asyncio.run(probar(servidor))
+            assert servidor.vencidas == 0, "Error: ninguna consulta debió vencer"
+
+            # Sin límite también se recorre de a páginas, hasta el final
+            todos = servidor.buscar("prefijo", "", limite=0)
+            with servidor.pool.indice() as indice:
+                assert todos["terminos"] == len(indice.indice) and not todos["truncado"]
+
+            # Una búsqueda que ve vencido su plazo se corta con 504
+            try:
+                servidor.buscar("prefijo", "", plazo=time.monotonic() - 1)
+                assert False, "Error: la búsqueda vencida debió cortarse"
+            except ErrorPeticion as e:
+                assert e.estado == 504, "Error: la búsqueda vencida debe responder 504"
+        finally:
+            servidor.cerrar()
+
+        # Con tiempo límite 0 toda consulta vence y se responde 504
+        async def vencer(servidor: ServidorConsultas):
+            escucha = await servidor.iniciar(unix=socket_unix)
+            lector, escritor = await conectar(unix=socket_unix)
+            estado, datos = await consultar(lector, escritor, "prefijo", "h")
+            escritor.close()
+            escucha.close()
+            await escucha.wait_closed()
+            return estado, datos
+
+        servidor = ServidorConsultas(test_db, trabajadores=1, tiempo_limite=0)
+        try:
+            estado, datos = asyncio.run(vencer(servidor))
+            print(f"  Tiempo límite 0 → {estado} {datos}")
+            assert estado == 504 and servidor.vencidas == 1, "Error en el tiempo límite"
+        finally:
+            servidor.cerrar()
+
+        print("✅ Test de servidor de consultas pasó correctamente\n")
+
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+        for ruta in [socket_unix] + [test_db + ext for ext in ["", ".index", ".tmp", ".lock"]]:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def test_particiones():
+    """Test del índice particionado por rangos de claves."""
+    print("\n" + "=" * 60)
+    print("TEST 28: Índice particionado")
+    print("=" * 60)
+
+    os.makedirs("tmp", exist_ok=True)
+    test_db = "tmp/test_particiones.fs"
+    corpus = tempfile.mkdtemp(prefix="particiones_", dir="tmp")
+
+    textos = {
+        "Doc1": "el hobbit cansado vive en la casa del bosque",
+        "Doc2": "los hobbits cerraron la casa y callado salieron",
+        "Doc3": "un hábito pesado de magos y trolls",
+        "Doc4": "anillo dragón montaña río tesoro",
+    }
+    for nombre, texto in textos.items():
+        Path(corpus, f"{nombre}.txt").write_text(texto, encoding="utf-8")
+
+    assert calcular_limites("abcdef", 6, 3) == ["c", "e"], "Error en los límites"
+    assert calcular_limites("ab", 2, 5) == ["b"], "Error con menos claves que particiones"
+
+    try:
+        crear_indice(corpus, test_db, particiones=3)
+        db = abrir_db(test_db)
+        indice = db.open().root().indice
+
+        with IndiceParticionado(ruta_mapa(test_db), procesos=2) as particionado:
+            print(f"  Límites: {particionado.limites}")
+            print(f"  Límites invertidos: {particionado.limites_invertidos}")
+            assert len(particionado.archivos) == 3, "Error: deberían ser 3 particiones"
+            assert sum(particionado.terminos_por_particion) == len(indice.indice)
+
+            # Exacto y prefijo van a una sola partición
+            particionado.buscar_exacto("Montaña")
+            assert sum(particionado.visitas) == 1, "Error: el exacto debe ir a una partición"
+            assert particionado.buscar_exacto("casa") == ["Doc1", "Doc2"], "Error en exacto"
+            assert particionado.buscar_exacto("inexistente") == [], "Error en exacto ausente"
+            assert len(particionado.particiones_prefijo("hob")) == 1, "Error al enrutar"
+
+            # El prefijo vacío abarca todas las particiones y conserva el orden
+            todos = particionado.buscar_prefijo("")
+            assert list(todos) == list(indice.indice.keys()), "Error en el orden de la unión"
+
+            consultas = [
+                ("buscar_prefijo", "ca"),
+                ("buscar_sufijo", "ado"),
+                ("buscar_sufijo", "s"),
+                ("buscar_comodin", "h?bbit*"),
+                ("buscar_comodin", "*a*"),
+                ("buscar_comodin", "*ll*o"),
+                ("buscar_comodin", "casa"),
+                ("buscar_comodin_medio", "ca*do"),
+                ("buscar_comodin_medio", "c*s"),
+            ]
+            for metodo, patron in consultas:
+                esperado = getattr(indice, metodo)(patron)
+                obtenido = getattr(particionado, metodo)(patron)
+                assert obtenido == esperado, f"Error en {metodo}('{patron}')"
+                assert list(obtenido) == list(esperado), f"Error de orden en {metodo}('{patron}')"
+                por_ids = getattr(particionado, metodo)(patron, ids=True)
+                assert {t: list(d) for t, d in por_ids.items()} == {
+                    t: list(d) for t, d in getattr(indice, metodo)(patron, ids=True).items()
+                }, f"Error con ids en {metodo}('{patron}')"
+            print(f"  comodin '*ll*o' → {particionado.buscar_comodin('*ll*o')}")
+            print(f"  Consultas por partición: {particionado.visitas}")
+
+            stats = particionado.obtener_estadisticas()
+            assert stats["total_documentos"] == 4 and stats["particiones"] == 3
+
+        db.close()
+
+        # Volver a particionar con menos archivos borra los sobrantes
+        crear_indice(corpus, test_db, incremental=True, particiones=2)
+        assert not os.path.exists(ruta_particion(test_db, 2)), "Error: quedó una partición vieja"
+        with IndiceParticionado(ruta_mapa(test_db), procesos=1) as particionado:
+            assert len(particionado.archivos) == 2
+            assert list(particionado.buscar_comodin("*a*")) == [termino for termino in todos if "a" in termino]
+
+        # Un cambio en la base deja viejo el mapa: abrirlo falla en vez de responder mal
+        db = abrir_db(test_db, solo_lectura=False)
+        conexion = db.open()
+        conexion.root().indice.agregar_documento("Doc5", "zafiro escondido en la cueva")
+        transaction.commit()
+        conexion.close()
+        db.close()
+        try:
+            IndiceParticionado(ruta_mapa(test_db), procesos=1)
+            assert False, "Error: debería rechazar particiones desactualizadas"
+        except ParticionesDesactualizadas as error:
+            print(f"  Particiones viejas rechazadas: {error}")
+
+        # Volver a indexar sin --particiones reparte de nuevo en la misma cantidad
+        crear_indice(corpus, test_db, incremental=True)
+        with IndiceParticionado(ruta_mapa(test_db), procesos=1) as particionado:
+            assert len(particionado.archivos) == 2, "Error: debería conservar 2 particiones"
+            assert particionado.buscar_exacto("zafiro") == ["Doc5"], "Error: falta el documento nuevo"
+
+        print("✅ Test de índice particionado pasó correctamente\n")
+
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+        for numero in range(3):
+            for ext in ["", ".index", ".tmp", ".lock"]:
+                for ruta in (test_db + ext, ruta_particion(test_db, numero) + ext):
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+        if os.path.exists(ruta_mapa(test_db)):
+            os.remove(ruta_mapa(test_db))
+
+
 def main():
     """Ejecuta todos los tests."""
     print("\n" + "=" * 60)
@@ -221,6 +1826,31 @@ def main():
         test_indice_basico()
         test_persistencia()
         test_corpus_real()
+        test_migracion_postings()
+        test_indexacion_paralela()
+        test_carga_masiva()
+        test_indexacion_incremental()
+        test_tokenizador()
+        test_ingesta_por_bloques()
+        test_indice_posicional()
+        test_permuterm()
+        test_kgramas()
+        test_plan_comodin()
+        test_busqueda_booleana()
+        test_paginacion()
+        test_autocompletado()
+        test_cache_resultados()
+        test_busqueda_en_lote()
+        test_resultados_por_doc_id()
+        test_busqueda_difusa()
+        test_conteos()
+        test_busqueda_rango()
+        test_busqueda_regex()
+        test_instantanea()
+        test_vocabulario_comprimido()
+        test_cache_zodb()
+        test_servidor()
+        test_particiones()
 
         print("\n" + "=" * 60)
         print("✅ TODOS LOS TESTS PASARON EXITOSAMENTE")
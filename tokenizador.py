@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tokenización y normalización de términos.
+
+El tokenizador por defecto reproduce la normalización histórica del índice
+(minúsculas, sin puntuación, palabras separadas por espacios) pero procesa
+el documento completo de una sola pasada en lugar de aplicar una regex por
+palabra. Para otra normalización basta con heredar de `Tokenizador`.
+
+Opcionalmente pliega acentos y diacríticos (NFKD y sin marcas combinantes:
+"canción" -> "cancion") y descarta los términos fuera de un rango de
+largos. `terminos_por_palabra` conserva la tokenización anterior, una regex
+por palabra, para comparar velocidad y vocabulario (ver
+`python benchmark.py tokenizador`).
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Pattern, Set
+
+# Caracteres que no forman parte de un término ni lo separan
+_NO_PALABRA_NI_ESPACIO = re.compile(r"[^\w\s]")
+# Caracteres que no forman parte de un término
+_NO_PALABRA = re.compile(r"[^\w]")
+
+
+@lru_cache(maxsize=None)
+def _regex_patron(comodines: str) -> Pattern:
+    """Regex que elimina todo lo que no es palabra ni uno de los comodines."""
+    return re.compile(f"[^\\w{re.escape(comodines)}]")
+
+
+@lru_cache(maxsize=100_000)
+def plegar_acentos(texto: str) -> str:
+    """Quita acentos y diacríticos: descompone con NFKD y descarta las marcas combinantes."""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def terminos_por_palabra(contenido: str) -> Set[str]:
+    """Tokenización anterior: separar por espacios y una regex por palabra."""
+    terminos = set()
+    for palabra in contenido.split():
+        termino = re.sub(r"[^\w]", "", palabra.lower())
+        if termino:
+            terminos.add(termino)
+    return terminos
+
+
+class Tokenizador:
+    """Tokenizador por defecto: minúsculas, sin puntuación, separado por espacios."""
+
+    # Atributos de clase: los tokenizadores guardados antes de existir las opciones
+    plegar_acentos = False
+    largo_minimo = 1
+    largo_maximo = 0
+
+    def __init__(self, plegar_acentos: bool = False, largo_minimo: int = 1, largo_maximo: int = 0):
+        """
+        Args:
+            plegar_acentos: Quitar acentos y diacríticos ("canción" -> "cancion")
+            largo_minimo: Descartar los términos de menos caracteres
+            largo_maximo: Descartar los términos de más caracteres (0 = sin límite)
+
+        Raises:
+            ValueError: Si los largos no forman un rango válido
+        """
+        if largo_minimo < 1 or largo_maximo < 0 or 0 < largo_maximo < largo_minimo:
+            raise ValueError("Largos de término inválidos")
+        self.plegar_acentos = plegar_acentos
+        self.largo_minimo = largo_minimo
+        self.largo_maximo = largo_maximo
+
+    def __eq__(self, otro) -> bool:
+        # Dos tokenizadores iguales producen el mismo vocabulario
+        return type(otro) is type(self) and self._opciones == otro._opciones
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._opciones))
+
+    @property
+    def _opciones(self) -> tuple:
+        return self.plegar_acentos, self.largo_minimo, self.largo_maximo
+
+    @property
+    def _con_opciones(self) -> bool:
+        return self.plegar_acentos or self.largo_minimo > 1 or self.largo_maximo > 0
+
+    def _plegar(self, termino: str) -> str:
+        """Pliega los acentos de un término ya normalizado, si está activado."""
+        if not self.plegar_acentos:
+            return termino
+        # El plegado puede dejar caracteres que no son de palabra (ej: "½" -> "1⁄2")
+        return _NO_PALABRA.sub("", plegar_acentos(termino))
+
+    def _filtrar(self, palabras: Iterable[str]) -> Iterator[str]:
+        """Pliega acentos y descarta los términos vacíos o fuera del rango de largos."""
+        minimo = self.largo_minimo
+        maximo = self.largo_maximo or float("inf")
+        for palabra in palabras:
+            termino = self._plegar(palabra)
+            if minimo <= len(termino) <= maximo:
+                yield termino
+
+    def normalizar(self, termino: str) -> str:
+        """Normaliza un término: lowercase y sin puntuación (y sin acentos si se pliegan)."""
+        return self._plegar(_NO_PALABRA.sub("", termino.lower()))
+
+    def normalizar_patron(self, patron: str, comodines: str = "*?") -> str:
+        """
+        Normaliza un patrón de búsqueda preservando los comodines indicados.
+
+        Args:
+            patron: Patrón ingresado por el usuario
+            comodines: Caracteres comodín que no deben eliminarse
+
+        Returns:
+            Patrón en minúsculas, sin puntuación salvo los comodines
+        """
+        regex = _regex_patron(comodines)
+        patron = regex.sub("", patron.lower())
+        return regex.sub("", plegar_acentos(patron)) if self.plegar_acentos else patron
+
+    def tokens(self, contenido: str) -> List[str]:
+        """
+        Tokeniza un texto y devuelve la secuencia de términos, con repeticiones.
+
+        La posición de cada término en la lista es su posición en el documento.
+
+        Args:
+            contenido: Texto a tokenizar
+
+        Returns:
+            Lista de términos normalizados en orden de aparición
+        """
+        palabras = _NO_PALABRA_NI_ESPACIO.sub("", contenido.lower()).split()
+        return list(self._filtrar(palabras)) if self._con_opciones else palabras
+
+    def terminos(self, contenido: str) -> Set[str]:
+        """
+        Tokeniza un texto completo y devuelve sus términos únicos.
+
+        Equivale a separar por espacios y normalizar cada palabra, pero la
+        puntuación se elimina del texto entero con una sola sustitución.
+
+        Args:
+            contenido: Texto a tokenizar
+
+        Returns:
+            Conjunto de términos únicos no vacíos
+        """
+        palabras = set(_NO_PALABRA_NI_ESPACIO.sub("", contenido.lower()).split())
+        # Con opciones se pliega y se filtra cada palabra distinta, no cada aparición
+        return set(self._filtrar(palabras)) if self._con_opciones else palabras
+
+    def _fragmentos_completos(self, bloques: Iterable[str]) -> Iterator[str]:
+        """
+        Reagrupa bloques de texto en fragmentos que no cortan palabras.
+
+        La última palabra de cada bloque puede estar cortada, así que se
+        retiene y se antepone al bloque siguiente.
+        """
+        resto = ""
+
+        for bloque in bloques:
+            if not bloque:
+                continue
+
+            texto = resto + bloque
+            if texto[-1].isspace():
+                completo, resto = texto, ""
+            else:
+                # Separar la última palabra, que puede continuar en el bloque siguiente
+                partes = texto.rsplit(None, 1)
+                completo = partes[0] if len(partes) == 2 else ""
+                resto = partes[-1] if partes else ""
+
+            yield completo
+
+        yield resto
+
+    def terminos_por_bloques(self, bloques: Iterable[str]) -> Set[str]:
+        """
+        Tokeniza un texto que llega en bloques (generador, archivo mapeado, etc.).
+
+        La memoria usada depende del tamaño de bloque y del vocabulario, no
+        del tamaño del documento.
+
+        Args:
+            bloques: Iterable de fragmentos consecutivos del texto
+
+        Returns:
+            Conjunto de términos únicos no vacíos
+        """
+        terminos: Set[str] = set()
+
+        for fragmento in self._fragmentos_completos(bloques):
+            terminos |= self.terminos(fragmento)
+
+        return terminos
+
+    def tokens_por_bloques(self, bloques: Iterable[str]) -> Iterator[str]:
+        """
+        Versión por bloques de `tokens`: genera los términos en orden de aparición.
+
+        Args:
+            bloques: Iterable de fragmentos consecutivos del texto
+
+        Returns:
+            Iterador de términos normalizados
+        """
+        for fragmento in self._fragmentos_completos(bloques):
+            yield from self.tokens(fragmento)
+
+
+TOKENIZADOR_POR_DEFECTO = Tokenizador()
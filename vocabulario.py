@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Vocabularios ordenados compactos: secuencias de términos sobre un buffer.
+
+Hay dos representaciones, con la misma interfaz (`len`, acceso por
+posición, `posicion`, `rango_prefijo`, `minKey` y `keys(min=...)`, como un
+árbol B+, para que los recorridos guiados por autómatas funcionen igual):
+
+- VocabularioPlano: cada término en UTF-8 con un offset de 8 bytes.
+- VocabularioComprimido: front-coding en bloques de tamaño fijo. Dentro
+  de un bloque cada término guarda solo cuántos bytes comparte con el
+  anterior y el resto:
+
+      bloque = (varint(comunes) + varint(largo) + resto) * tamano_bloque
+
+  El primer término de cada bloque comparte 0 bytes, así que un bloque se
+  decodifica sin mirar los demás. El índice de bloques en memoria (offsets
+  y primer término de cada bloque) permite ubicar un término con una
+  búsqueda binaria sobre los bloques y decodificando uno solo.
+
+Los términos consecutivos de un vocabulario ordenado comparten prefijos
+largos (y los del vocabulario invertido, terminaciones), así que el
+front-coding ocupa una fracción de las cadenas completas. El orden de los
+bytes UTF-8 coincide con el de los códigos, así que el orden es el mismo
+que el de los árboles.
+
+El buffer puede ser un `bytes` o un `mmap` (ver instantanea.py).
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+from comodines import limite_prefijo
+from posiciones import codificar_varint, decodificar_varint
+
+TAMANO_BLOQUE = 16  # Términos por bloque de front-coding
+
+
+def codificar_plano(blobs: Iterable[bytes]) -> Tuple[bytes, array]:
+    """Concatena los blobs y devuelve (datos, offsets de inicio y fin)."""
+    offsets = array("Q", [0])
+    datos = bytearray()
+    for blob in blobs:
+        datos += blob
+        offsets.append(len(datos))
+    return bytes(datos), offsets
+
+
+def _comunes(a: bytes, b: bytes) -> int:
+    """Largo del prefijo común de dos cadenas de bytes."""
+    limite = min(len(a), len(b))
+    i = 0
+    while i < limite and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def codificar_frontal(
+    terminos: Iterable[str], tamano_bloque: int = TAMANO_BLOQUE
+) -> Tuple[bytes, array, int]:
+    """
+    Codifica términos ordenados con front-coding en bloques.
+
+    Args:
+        terminos: Términos en orden
+        tamano_bloque: Términos por bloque
+
+    Returns:
+        (datos, offsets de inicio de cada bloque y fin, cantidad de términos)
+    """
+    if tamano_bloque < 1:
+        raise ValueError("El tamaño de bloque debe ser al menos 1")
+
+    datos = bytearray()
+    offsets = array("Q")
+    anterior = b""
+    total = 0
+    for total, termino in enumerate(terminos, 1):
+        actual = termino.encode("utf-8")
+        if (total - 1) % tamano_bloque == 0:
+            offsets.append(len(datos))
+            anterior = b""
+        comunes = _comunes(anterior, actual)
+        codificar_varint(comunes, datos)
+        codificar_varint(len(actual) - comunes, datos)
+        datos += actual[comunes:]
+        anterior = actual
+    offsets.append(len(datos))
+    return bytes(datos), offsets, total
+
+
+class _Vocabulario:
+    """Búsquedas comunes a las dos representaciones (requieren len y [i])."""
+
+    def posicion(self, clave: str) -> int:
+        """Posición de la primera clave mayor o igual que `clave`."""
+        return bisect_left(self, clave)
+
+    def posicion_derecha(self, clave: str) -> int:
+        """Posición de la primera clave mayor que `clave`."""
+        return bisect_right(self, clave)
+
+    def indice_de(self, clave: str) -> Optional[int]:
+        """Posición de `clave`, o None si no está."""
+        i = self.posicion(clave)
+        if i < len(self) and self[i] == clave:
+            return i
+        return None
+
+    def __contains__(self, clave: str) -> bool:
+        return self.indice_de(clave) is not None
+
+    def rango_prefijo(self, prefijo: str) -> range:
+        """Posiciones de las claves que empiezan con `prefijo`."""
+        return range(self.posicion(prefijo), self.posicion_derecha(limite_prefijo(prefijo)))
+
+    def minKey(self, minimo: str) -> str:
+        """Menor clave mayor o igual que `minimo` (ValueError si no hay)."""
+        i = self.posicion(minimo)
+        if i == len(self):
+            raise ValueError("No hay claves mayores o iguales")
+        return self[i]
+
+    def keys(self, min: Optional[str] = None) -> Iterator[str]:
+        """Claves desde `min` (inclusive) en orden."""
+        for i in range(0 if min is None else self.posicion(min), len(self)):
+            yield self[i]
+
+
+class VocabularioPlano(_Vocabulario):
+    """Términos completos en UTF-8, con un offset por término."""
+
+    def __init__(self, buffer, inicio: int, offsets):
+        """
+        Args:
+            buffer: bytes o mmap con los términos
+            inicio: Posición de los términos en el buffer
+            offsets: Offsets de inicio de cada término y del fin (len = términos + 1)
+        """
+        self._buffer = buffer
+        self._inicio = inicio
+        self._offsets = offsets
+
+    @classmethod
+    def desde_terminos(cls, terminos: Iterable[str]) -> "VocabularioPlano":
+        """Vocabulario en memoria a partir de términos ordenados."""
+        datos, offsets = codificar_plano(termino.encode("utf-8") for termino in terminos)
+        return cls(datos, 0, offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        inicio = self._inicio + self._offsets[i]
+        return str(self._buffer[inicio : self._inicio + self._offsets[i + 1]], "utf-8")
+
+    def bytes_datos(self) -> int:
+        """Bytes de términos y offsets."""
+        return self._offsets[-1] + 8 * len(self._offsets)
+
+
+class VocabularioComprimido(_Vocabulario):
+    """Términos con front-coding en bloques de tamaño fijo (ver el módulo)."""
+
+    def __init__(self, buffer, inicio: int, offsets, total: int, tamano_bloque: int):
+        """
+        Args:
+            buffer: bytes o mmap con los bloques
+            inicio: Posición de los bloques en el buffer
+            offsets: Offsets de inicio de cada bloque y del fin (len = bloques + 1)
+            total: Cantidad de términos
+            tamano_bloque: Términos por bloque
+        """
+        self._buffer = buffer
+        self._inicio = inicio
+        self._offsets = offsets
+        self._total = total
+        self.tamano_bloque = tamano_bloque
+        self._primeros: Optional[List[str]] = None
+        self._ultimo: Tuple[int, List[str]] = (-1, [])  # Último bloque decodificado
+
+    @classmethod
+    def desde_terminos(
+        cls, terminos: Iterable[str], tamano_bloque: int = TAMANO_BLOQUE
+    ) -> "VocabularioComprimido":
+        """Vocabulario en memoria a partir de términos ordenados."""
+        datos, offsets, total = codificar_frontal(terminos, tamano_bloque)
+        return cls(datos, 0, offsets, total, tamano_bloque)
+
+    def __len__(self) -> int:
+        return self._total
+
+    @property
+    def primeros(self) -> List[str]:
+        """Primer término de cada bloque (se arma la primera vez que se usa)."""
+        if self._primeros is None:
+            primeros = []
+            for b in range(len(self._offsets) - 1):
+                _, pos = decodificar_varint(self._buffer, self._inicio + self._offsets[b])
+                largo, pos = decodificar_varint(self._buffer, pos)
+                primeros.append(str(self._buffer[pos : pos + largo], "utf-8"))
+            self._primeros = primeros
+        return self._primeros
+
+    def bloque(self, b: int) -> List[str]:
+        """Términos del bloque `b`, decodificados."""
+        if self._ultimo[0] == b:
+            return self._ultimo[1]
+
+        terminos = [str(termino, "utf-8") for termino in self._terminos_bloque(b)]
+        self._ultimo = (b, terminos)
+        return terminos
+
+    def _terminos_bloque(self, b: int) -> Iterator[bytes]:
+        """Términos del bloque `b` en UTF-8, en orden."""
+        buffer = self._buffer
+        pos = self._inicio + self._offsets[b]
+        fin = self._inicio + self._offsets[b + 1]
+        anterior = b""
+        while pos < fin:
+            # Casi siempre los dos varints ocupan un byte: evitar la llamada
+            comunes = buffer[pos]
+            if comunes < 0x80:
+                pos += 1
+            else:
+                comunes, pos = decodificar_varint(buffer, pos)
+            largo = buffer[pos]
+            if largo < 0x80:
+                pos += 1
+            else:
+                largo, pos = decodificar_varint(buffer, pos)
+            anterior = anterior[:comunes] + buffer[pos : pos + largo]
+            pos += largo
+            yield anterior
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self._total:
+            raise IndexError(i)
+        b, j = divmod(i, self.tamano_bloque)
+        return self.bloque(b)[j]
+
+    def _ubicar(self, clave: str, derecha: bool) -> int:
+        # Último bloque cuyo primer término es <= clave; se recorre solo ese,
+        # comparando en UTF-8 (mismo orden) y sin decodificar el resto
+        b = bisect_right(self.primeros, clave) - 1
+        if b < 0:
+            return 0
+        if self._ultimo[0] == b:
+            buscar = bisect_right if derecha else bisect_left
+            return b * self.tamano_bloque + buscar(self._ultimo[1], clave)
+
+        objetivo = clave.encode("utf-8")
+        j = 0
+        for termino in self._terminos_bloque(b):
+            if termino > objetivo or (termino == objetivo and not derecha):
+                break
+            j += 1
+        return b * self.tamano_bloque + j
+
+    def posicion(self, clave: str) -> int:
+        return self._ubicar(clave, False)
+
+    def indice_de(self, clave: str) -> Optional[int]:
+        # Una sola pasada por el bloque, en lugar de ubicar y después decodificar
+        b = bisect_right(self.primeros, clave) - 1
+        if b < 0:
+            return None
+        objetivo = clave.encode("utf-8")
+        for j, termino in enumerate(self._terminos_bloque(b)):
+            if termino >= objetivo:
+                return b * self.tamano_bloque + j if termino == objetivo else None
+        return None
+
+    def posicion_derecha(self, clave: str) -> int:
+        return self._ubicar(clave, True)
+
+    def keys(self, min: Optional[str] = None) -> Iterator[str]:
+        inicio = 0 if min is None else self.posicion(min)
+        b, j = divmod(inicio, self.tamano_bloque)
+        for b in range(b, len(self._offsets) - 1):
+            yield from self.bloque(b)[j:]
+            j = 0
+
+    def bytes_datos(self) -> int:
+        """Bytes de los bloques y de los offsets (sin el índice de primeros términos)."""
+        return self._offsets[-1] + 8 * len(self._offsets)